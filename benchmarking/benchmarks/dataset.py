@@ -2,6 +2,7 @@
 This module contains code used for benchmarking data saving speed of the
 database used under the QCoDeS dataset.
 """
+import json
 import shutil
 import tempfile
 import os
@@ -11,9 +12,23 @@ import numpy as np
 
 import qcodes
 from qcodes import ManualParameter
+from qcodes.dataset.data_set import DataSet, load_by_id, load_many
+from qcodes.dataset.data_set_cache import (
+    _append_shaped_parameter_data_to_existing_arrays)
+from qcodes.dataset.descriptions.dependencies import InterDependencies_
+from qcodes.dataset.descriptions.param_spec import ParamSpecBase
+from qcodes.dataset.descriptions.rundescriber import RunDescriber
 from qcodes.dataset.measurements import Measurement
 from qcodes.dataset.experiment_container import new_experiment
-from qcodes.dataset.sqlite.database import initialise_database
+from qcodes.dataset.guids import generate_guid
+from qcodes.dataset.sqlite.connection import atomic
+from qcodes.dataset.sqlite.database import connect, initialise_database
+from qcodes.dataset.sqlite.queries import (add_meta_data, create_run,
+                                           get_guids_from_run_spec,
+                                           get_metadata_from_run_id,
+                                           get_runid_from_guid,
+                                           new_experiment as
+                                           new_experiment_in_db)
 
 
 class Adding5Params:
@@ -37,10 +52,13 @@ class Adding5Params:
     # latter case asv will run the benchmark for all the combinations of the
     # values
     params = [
-        {'n_values': 10000, 'n_times': 2, 'paramtype': 'array'},
-        {'n_values': 100, 'n_times': 200, 'paramtype': 'array'},
-        {'n_values': 10000, 'n_times': 2, 'paramtype': 'numeric'},
-        {'n_values': 100, 'n_times': 200, 'paramtype': 'numeric'},
+        {'n_values': n_values, 'n_times': n_times, 'paramtype': paramtype,
+         'insert_method': insert_method, 'sqlite_profile': sqlite_profile}
+        for paramtype in ('array', 'numeric')
+        for n_values, n_times in ((10000, 2), (100, 200))
+        for insert_method, sqlite_profile in (('compound', 'default'),
+                                              ('executemany', 'default'),
+                                              ('compound', 'acquisition'))
     ]
     # we are less interested in the cpu time used and more interested in
     # the wall clock time used to insert the data so use a timer that measures
@@ -61,6 +79,9 @@ class Adding5Params:
         qcodes.config["core"]["db_location"] = os.path.join(self.tmpdir,
                                                             'temp.db')
         qcodes.config["core"]["db_debug"] = False
+        qcodes.config["dataset"]["insert_method"] = bench_param['insert_method']
+        qcodes.config["dataset"]["sqlite_profile"] = \
+            bench_param['sqlite_profile']
         initialise_database()
 
         # Create experiment
@@ -113,6 +134,8 @@ class Adding5Params:
             shutil.rmtree(self.tmpdir)
             self.tmpdir = None
 
+        qcodes.config["dataset"]["insert_method"] = 'compound'
+        qcodes.config["dataset"]["sqlite_profile"] = 'default'
         self.parameters = list()
         self.values = list()
 
@@ -129,3 +152,581 @@ class Adding5Params:
         # force writing to database so that it is written before we exit
         # the datasaver context manager
         self.datasaver.flush_data_to_database()
+
+
+class ArrayCompression:
+    """
+    This benchmark measures the trade-off between write throughput and
+    database size when compressing array type parameters. The traces mimic
+    digitizer and lock-in buffer data: a smooth signal with additive noise
+    sampled by an ADC of limited resolution.
+    """
+
+    number = 1
+    repeat = 4
+    params = ['none', 'zlib', 'zstd', 'lz4']
+    param_names = ['array_compression']
+    timer = time.perf_counter
+
+    n_points = 10000
+    n_traces = 200
+
+    def __init__(self):
+        self.parameters = list()
+        self.values = list()
+        self.experiment = None
+        self.runner = None
+        self.datasaver = None
+        self.tmpdir = None
+
+    def setup(self, array_compression):
+        self.tmpdir = tempfile.mkdtemp()
+        qcodes.config["core"]["db_location"] = os.path.join(self.tmpdir,
+                                                            'temp.db')
+        qcodes.config["core"]["db_debug"] = False
+        qcodes.config["dataset"]["array_compression"] = array_compression
+        initialise_database()
+
+        self.experiment = new_experiment("test-experiment",
+                                         sample_name="test-sample")
+        meas = Measurement(self.experiment)
+
+        t = ManualParameter('t')
+        signal = ManualParameter('signal')
+        meas.register_parameter(t, paramtype='array')
+        meas.register_parameter(signal, setpoints=[t], paramtype='array')
+        self.parameters = [t, signal]
+
+        self.runner = meas.run()
+        self.datasaver = self.runner.__enter__()
+
+        times = np.linspace(0, 1e-3, self.n_points)
+        rng = np.random.default_rng(0)
+        for _ in range(self.n_traces):
+            trace = (np.sin(2 * np.pi * 5e3 * times)
+                     + 0.1 * rng.standard_normal(self.n_points))
+            # quantize like a 12 bit ADC with a range of +-2 V
+            trace = np.round(trace / 4 * 2**12) * 4 / 2**12
+            self.values.append((times, trace))
+
+    def teardown(self, array_compression):
+        if self.runner:
+            self.runner.__exit__(None, None, None)
+            self.runner = None
+            self.datasaver = None
+
+        if self.experiment:
+            self.experiment.conn.close()
+            self.experiment = None
+
+        if self.tmpdir:
+            shutil.rmtree(self.tmpdir)
+            self.tmpdir = None
+
+        qcodes.config["dataset"]["array_compression"] = 'none'
+        self.parameters = list()
+        self.values = list()
+
+    def _write(self):
+        for times, trace in self.values:
+            self.datasaver.add_result((self.parameters[0], times),
+                                      (self.parameters[1], trace))
+        self.datasaver.flush_data_to_database()
+
+    def time_write_traces(self, array_compression):
+        """Writing noisy traces"""
+        self._write()
+
+    def track_db_size(self, array_compression):
+        """Size of the database file in MB after writing the traces"""
+        self._write()
+        self.experiment.conn.commit()
+        return os.path.getsize(qcodes.config["core"]["db_location"]) / 1e6
+
+    track_db_size.unit = 'MB'
+
+
+class CacheRefresh:
+    """
+    This benchmark measures how long it takes to merge newly read data into
+    the cache of a dataset without a known shape, as happens when a long
+    run is plotted live. No database access is involved such that the time
+    measured is spent in the cache alone.
+    """
+
+    number = 1
+    repeat = 4
+    params = [10000]
+    param_names = ['n_refreshes']
+    timer = time.perf_counter
+
+    n_points_per_refresh = 10
+
+    def setup(self, n_refreshes):
+        x = ParamSpecBase('x', 'numeric')
+        y = ParamSpecBase('y', 'numeric')
+        interdeps = InterDependencies_(dependencies={y: (x,)})
+        self.rundescriber = RunDescriber(interdeps)
+        values = np.arange(self.n_points_per_refresh, dtype=np.float64)
+        self.new_data = {'y': {'y': values, 'x': values}}
+
+    def time_incremental_refreshes(self, n_refreshes):
+        write_status = {}
+        data = {}
+        buffers = {}
+        for _ in range(n_refreshes):
+            (write_status,
+             data,
+             buffers) = _append_shaped_parameter_data_to_existing_arrays(
+                self.rundescriber, write_status, data, self.new_data, buffers
+            )
+
+
+class RunLookup:
+    """
+    This benchmark measures how long it takes to look up runs by GUID and by
+    their captured run id and counter in a database with many runs, as
+    done by ``load_by_guid``, ``load_by_run_spec`` and
+    ``extract_runs_into_db``. The runs table is filled with synthetic rows
+    directly since creating that many actual runs would take too long.
+    """
+
+    number = 1
+    repeat = 4
+    params = [1000, 150000]
+    param_names = ['n_runs']
+    timer = time.perf_counter
+
+    n_experiments = 10
+    n_lookups = 100
+
+    def setup(self, n_runs):
+        self.tmpdir = tempfile.mkdtemp()
+        self.conn = connect(os.path.join(self.tmpdir, 'temp.db'))
+        for i in range(self.n_experiments):
+            new_experiment_in_db(self.conn, name=f"experiment_{i}",
+                                 sample_name="sample",
+                                 format_string="{}-{}-{}")
+
+        runs_per_exp = n_runs // self.n_experiments
+        # generate_guid has a resolution of 1 ms, so give every run its
+        # own time to get unique GUIDs
+        start = int(time.time() * 1000)
+        self.guids = [generate_guid(timeint=start + run)
+                      for run in range(n_runs)]
+        rows = [(run // runs_per_exp + 1, 'results', run % runs_per_exp + 1,
+                 time.time(), True, '', guid, run + 1, run + 1)
+                for run, guid in enumerate(self.guids)]
+        with atomic(self.conn) as conn:
+            conn.cursor().executemany(
+                "INSERT INTO runs (exp_id, name, result_counter, "
+                "run_timestamp, is_completed, parameters, guid, "
+                "captured_run_id, captured_counter) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        rng = np.random.default_rng(0)
+        self.lookups = rng.integers(0, n_runs, self.n_lookups)
+
+    def teardown(self, n_runs):
+        self.conn.close()
+        shutil.rmtree(self.tmpdir)
+
+    def time_get_runid_from_guid(self, n_runs):
+        for run in self.lookups:
+            get_runid_from_guid(self.conn, self.guids[run])
+
+    def time_get_guids_from_run_spec(self, n_runs):
+        for run in self.lookups:
+            get_guids_from_run_spec(self.conn,
+                                    captured_run_id=int(run) + 1,
+                                    captured_counter=int(run) + 1)
+
+
+class LoadById:
+    """
+    This benchmark measures how long it takes to repeatedly load a dataset
+    with ``load_by_id`` from the database file specified in the config,
+    either opening a new connection for every load or drawing from the
+    pool of read-only connections.
+    """
+
+    number = 1
+    repeat = 4
+    params = [False, True]
+    param_names = ['pooled_read_connections']
+    timer = time.perf_counter
+
+    n_loads = 100
+
+    def setup(self, pooled_read_connections):
+        self.tmpdir = tempfile.mkdtemp()
+        qcodes.config["core"]["db_location"] = os.path.join(self.tmpdir,
+                                                            'temp.db')
+        qcodes.config["core"]["db_debug"] = False
+        qcodes.config["dataset"]["pooled_read_connections"] = \
+            pooled_read_connections
+        initialise_database()
+
+        self.experiment = new_experiment("test-experiment",
+                                         sample_name="test-sample")
+        meas = Measurement(self.experiment)
+        x = ManualParameter('x')
+        meas.register_parameter(x)
+        with meas.run() as datasaver:
+            datasaver.add_result((x, 1))
+        self.run_id = datasaver.run_id
+
+    def teardown(self, pooled_read_connections):
+        self.experiment.conn.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+        qcodes.config["dataset"]["pooled_read_connections"] = False
+
+    def time_load_by_id(self, pooled_read_connections):
+        for _ in range(self.n_loads):
+            load_by_id(self.run_id)
+
+
+class Connect:
+    """
+    This benchmark measures how long it takes to connect to an existing
+    database file that is in the latest version, as done by many helper
+    functions and the background writer.
+    """
+
+    number = 1
+    repeat = 4
+    timer = time.perf_counter
+
+    n_connects = 100
+
+    def setup(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'temp.db')
+        connect(self.path).close()
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def time_connect(self):
+        for _ in range(self.n_connects):
+            connect(self.path).close()
+
+
+class AddingWithSubscribers:
+    """
+    This benchmark measures how much the throughput of adding results
+    decreases when subscribers are subscribed to the dataset, either
+    receiving the results as tuples per result or as blocks of columns.
+    """
+
+    number = 1
+    repeat = 4
+    params = [[0, 1, 4], [False, True]]
+    param_names = ['n_subscribers', 'columnar']
+    timer = time.perf_counter
+
+    n_values = 100
+    n_times = 200
+
+    def setup(self, n_subscribers, columnar):
+        self.tmpdir = tempfile.mkdtemp()
+        qcodes.config["core"]["db_location"] = os.path.join(self.tmpdir,
+                                                            'temp.db')
+        qcodes.config["core"]["db_debug"] = False
+        initialise_database()
+
+        self.experiment = new_experiment("test-experiment",
+                                         sample_name="test-sample")
+        meas = Measurement(self.experiment)
+        x = ManualParameter('x')
+        y = ManualParameter('y')
+        meas.register_parameter(x)
+        meas.register_parameter(y, setpoints=[x])
+        self.parameters = [x, y]
+
+        self.runner = meas.run()
+        self.datasaver = self.runner.__enter__()
+        for _ in range(n_subscribers):
+            self.datasaver.dataset.subscribe(
+                lambda results, length, state: None, columnar=columnar)
+
+        self.values = [np.random.rand(self.n_values) for _ in range(2)]
+
+    def teardown(self, n_subscribers, columnar):
+        self.runner.__exit__(None, None, None)
+        self.experiment.conn.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def time_add_result(self, n_subscribers, columnar):
+        for _ in range(self.n_times):
+            self.datasaver.add_result((self.parameters[0], self.values[0]),
+                                      (self.parameters[1], self.values[1]))
+        self.datasaver.flush_data_to_database()
+
+
+class MetadataLoading:
+    """
+    This benchmark measures how long it takes to load the metadata of runs
+    in a database where many different metadata tags have been used, as
+    done for every dataset loaded.
+    """
+
+    number = 1
+    repeat = 4
+    params = [10, 300]
+    param_names = ['n_tags']
+    timer = time.perf_counter
+
+    n_runs = 100
+
+    def setup(self, n_tags):
+        self.tmpdir = tempfile.mkdtemp()
+        self.conn = connect(os.path.join(self.tmpdir, 'temp.db'))
+        exp_id = new_experiment_in_db(self.conn, name="experiment",
+                                      sample_name="sample",
+                                      format_string="{}-{}-{}")
+        self.run_ids = []
+        for run in range(self.n_runs):
+            _, run_id, _ = create_run(self.conn, exp_id, "run",
+                                      generate_guid())
+            # every run uses a few of the tags
+            add_meta_data(self.conn, run_id,
+                          {f"tag_{(run + i) % n_tags}": i for i in range(5)})
+            self.run_ids.append(run_id)
+
+    def teardown(self, n_tags):
+        self.conn.close()
+        shutil.rmtree(self.tmpdir)
+
+    def time_get_metadata_from_run_id(self, n_tags):
+        for run_id in self.run_ids:
+            get_metadata_from_run_id(self.conn, run_id)
+
+
+class ListingRuns:
+    """
+    This benchmark measures how long it takes to load all runs of a
+    database with metadata and a snapshot, as done when listing the runs,
+    either one by one with ``load_by_id`` or all at once with ``load_many``,
+    and reading the attributes shown in a listing.
+    """
+
+    number = 1
+    repeat = 4
+    params = [10, 500]
+    param_names = ['n_runs']
+    timer = time.perf_counter
+
+    def setup(self, n_runs):
+        self.tmpdir = tempfile.mkdtemp()
+        self.conn = connect(os.path.join(self.tmpdir, 'temp.db'))
+        exp_id = new_experiment_in_db(self.conn, name="experiment",
+                                      sample_name="sample",
+                                      format_string="{}-{}-{}")
+        snapshot = json.dumps({'station': {'parameters': {
+            f'param_{i}': {'value': i} for i in range(1000)}}})
+        self.run_ids = []
+        for run in range(n_runs):
+            _, run_id, _ = create_run(self.conn, exp_id, "run",
+                                      generate_guid(),
+                                      metadata={'snapshot': snapshot,
+                                                'sample_temperature': 0.01})
+            self.run_ids.append(run_id)
+
+    def teardown(self, n_runs):
+        self.conn.close()
+        shutil.rmtree(self.tmpdir)
+
+    @staticmethod
+    def _list(datasets):
+        for ds in datasets:
+            (ds.run_id, ds.name, ds.exp_name, ds.sample_name, ds.guid,
+             ds.run_timestamp_raw, ds.completed, ds.metadata)
+
+    def time_load_by_id(self, n_runs):
+        self._list(load_by_id(run_id, conn=self.conn)
+                   for run_id in self.run_ids)
+
+    def time_load_many(self, n_runs):
+        self._list(load_many(self.run_ids, conn=self.conn))
+
+
+class SnapshotStorage:
+    """
+    This benchmark measures the time to store the snapshots of consecutive
+    runs and the resulting database size for the ways of storing snapshots.
+    The synthetic station resembles a QDac, a PNA and three lock-ins with
+    about 1000 parameters in total; every run updates the timestamps of all
+    parameters and the values of a few of them.
+    """
+
+    number = 1
+    repeat = 4
+    params = ['inline', 'deduplicated', 'delta']
+    param_names = ['snapshot_storage']
+    timer = time.perf_counter
+
+    n_runs = 100
+    instruments = {'qdac': 400, 'pna': 200, 'lockin1': 150, 'lockin2': 150,
+                   'lockin3': 150}
+
+    def setup(self, snapshot_storage):
+        self.tmpdir = tempfile.mkdtemp()
+        qcodes.config["core"]["db_location"] = os.path.join(self.tmpdir,
+                                                            'temp.db')
+        qcodes.config["core"]["db_debug"] = False
+        qcodes.config["dataset"]["snapshot_storage"] = snapshot_storage
+        initialise_database()
+
+        self.experiment = new_experiment("test-experiment",
+                                         sample_name="test-sample")
+        self.datasets = [DataSet(conn=self.experiment.conn)
+                         for _ in range(self.n_runs)]
+        self.snapshots = [json.dumps({'station': self._station(run)})
+                          for run in range(self.n_runs)]
+
+    def teardown(self, snapshot_storage):
+        self.experiment.conn.close()
+        shutil.rmtree(self.tmpdir)
+        qcodes.config["dataset"]["snapshot_storage"] = 'inline'
+
+    def _station(self, run):
+        instruments = {}
+        for name, n_parameters in self.instruments.items():
+            parameters = {}
+            for i in range(n_parameters):
+                value = run * 0.01 + i if i < 5 else i * 0.5
+                parameters[f'p{i}'] = {
+                    '__class__': 'qcodes.instrument.parameter.Parameter',
+                    'full_name': f'{name}_p{i}', 'name': f'p{i}',
+                    'value': value, 'raw_value': value,
+                    'ts': f'2021-01-01 {run // 3600:02d}:'
+                          f'{run // 60 % 60:02d}:{run % 60:02d}',
+                    'unit': 'V', 'label': f'Parameter {i} of {name}',
+                    'vals': '<Numbers -10<=v<=10>', 'post_delay': 0,
+                    'inter_delay': 0, 'instrument_name': name}
+            instruments[name] = {'functions': {}, 'submodules': {},
+                                 'parameters': parameters, 'name': name}
+        return {'instruments': instruments, 'parameters': {},
+                'components': {}, 'config': None}
+
+    def _store(self):
+        for dataset, snapshot in zip(self.datasets, self.snapshots):
+            dataset.add_snapshot(snapshot)
+
+    def time_add_snapshot(self, snapshot_storage):
+        self._store()
+
+    def track_db_size(self, snapshot_storage):
+        """Size of the database file in MB after storing the snapshots"""
+        self._store()
+        self.experiment.conn.commit()
+        # move the pages written to the write-ahead log into the file
+        self.experiment.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return os.path.getsize(qcodes.config["core"]["db_location"]) / 1e6
+
+    track_db_size.unit = 'MB'
+
+
+class AddResultScalar:
+    """
+    This benchmark measures the rate of ``DataSaver.add_result`` calls with
+    a single scalar result, as in high rate 0D measurement loops, with the
+    parameter given either as parameter object or by name.
+    """
+
+    number = 1
+    repeat = 4
+    params = ['parameter', 'name']
+    param_names = ['given_as']
+    timer = time.perf_counter
+
+    n_results = 10000
+
+    def setup(self, given_as):
+        self.tmpdir = tempfile.mkdtemp()
+        qcodes.config["core"]["db_location"] = os.path.join(self.tmpdir,
+                                                            'temp.db')
+        qcodes.config["core"]["db_debug"] = False
+        initialise_database()
+
+        self.experiment = new_experiment("test-experiment",
+                                         sample_name="test-sample")
+        meas = Measurement(self.experiment)
+        parameter = ManualParameter('p')
+        meas.register_parameter(parameter)
+        self.parameter = parameter if given_as == 'parameter' else 'p'
+
+        self.runner = meas.run()
+        self.datasaver = self.runner.__enter__()
+
+    def teardown(self, given_as):
+        self.runner.__exit__(None, None, None)
+        self.experiment.conn.close()
+        shutil.rmtree(self.tmpdir)
+
+    def _add_results(self):
+        for i in range(self.n_results):
+            self.datasaver.add_result((self.parameter, i))
+
+    def time_add_result(self, given_as):
+        self._add_results()
+
+    def track_add_result_rate(self, given_as):
+        """Number of add_result calls per second"""
+        start = time.perf_counter()
+        self._add_results()
+        return self.n_results / (time.perf_counter() - start)
+
+    track_add_result_rate.unit = 'results/s'
+
+
+class AddingResultsBlock:
+    """
+    This benchmark compares adding the points of a hardware sweep, i.e.
+    arrays of setpoints and measured values, with one ``add_result`` call
+    per point and with a single ``add_results_block`` call.
+    """
+
+    number = 1
+    repeat = 4
+    params = [1000, 10000]
+    param_names = ['n_points']
+    timer = time.perf_counter
+
+    def setup(self, n_points):
+        self.tmpdir = tempfile.mkdtemp()
+        qcodes.config["core"]["db_location"] = os.path.join(self.tmpdir,
+                                                            'temp.db')
+        qcodes.config["core"]["db_debug"] = False
+        initialise_database()
+
+        self.experiment = new_experiment("test-experiment",
+                                         sample_name="test-sample")
+        meas = Measurement(self.experiment)
+        self.voltage = ManualParameter('voltage')
+        self.current = ManualParameter('current')
+        meas.register_parameter(self.voltage)
+        meas.register_parameter(self.current, setpoints=(self.voltage,))
+
+        self.voltages = np.linspace(-1, 1, n_points)
+        self.currents = np.random.default_rng(0).standard_normal(n_points)
+
+        self.runner = meas.run()
+        self.datasaver = self.runner.__enter__()
+
+    def teardown(self, n_points):
+        self.runner.__exit__(None, None, None)
+        self.experiment.conn.close()
+        shutil.rmtree(self.tmpdir)
+
+    def time_add_result_per_point(self, n_points):
+        for voltage, current in zip(self.voltages, self.currents):
+            self.datasaver.add_result((self.voltage, voltage),
+                                      (self.current, current))
+        self.datasaver.flush_data_to_database(block=True)
+
+    def time_add_results_block(self, n_points):
+        self.datasaver.add_results_block({self.voltage: self.voltages,
+                                          self.current: self.currents})
+        self.datasaver.flush_data_to_database(block=True)
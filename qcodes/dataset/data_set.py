@@ -1,17 +1,21 @@
+import atexit
 import functools
 import importlib
 import json
 import logging
+import multiprocessing
 import warnings
 import os
 import time
+import traceback
 import uuid
 from dataclasses import dataclass
+from multiprocessing.connection import Connection
 from queue import Empty, Queue
-from threading import Thread
-from typing import (Hashable, Iterator, TYPE_CHECKING, Any, Callable, Dict,
-                    List, Mapping, Optional, Sequence, Set,
-                    Sized, Tuple, Union, cast)
+from threading import Condition, Thread, current_thread
+from typing import (Hashable, Iterable, Iterator, TYPE_CHECKING, Any,
+                    Callable, Dict, List, Mapping, Optional, Sequence, Set,
+                    Sized, Tuple, Type, Union, cast)
 
 import numpy
 
@@ -29,22 +33,28 @@ from qcodes.dataset.linked_datasets.links import (Link, links_to_str,
                                                   str_to_links)
 from qcodes.dataset.sqlite.connection import (ConnectionPlus, atomic,
                                               atomic_transaction, transaction)
-from qcodes.dataset.sqlite.database import (conn_from_dbpath_or_conn, connect,
-                                            get_DB_location)
+from qcodes.dataset.sqlite.database import (checkpoint_wal_if_due,
+                                            conn_from_dbpath_or_conn, connect,
+                                            get_DB_location,
+                                            get_pooled_read_connection)
 from qcodes.dataset.sqlite.queries import (
-    add_meta_data, add_parameter, completed, create_run,
-    get_completed_timestamp_from_run_id,
-    get_experiment_name_from_experiment_id, get_guid_from_run_id,
-    get_guids_from_run_spec, get_last_experiment, get_metadata,
-    get_metadata_from_run_id, get_parameter_data, get_parent_dataset_links,
-    get_run_description, get_run_timestamp_from_run_id, get_runid_from_guid,
+    add_meta_data, add_parameter, create_parameter_tree_indices, create_run,
+    get_experiment_name_from_experiment_id, get_guids_from_run_spec,
+    get_last_experiment, get_metadata, get_metadata_from_run_id,
+    get_metadata_from_run_ids, get_parameter_data,
+    get_parameter_data_in_chunks, get_parent_dataset_links,
+    get_run_description, get_run_rows, get_runid_from_guid,
     get_sample_name_from_experiment_id, mark_run_complete,
-    remove_trigger, run_exists, set_run_timestamp, update_parent_datasets,
+    remove_trigger, set_run_timestamp, update_parent_datasets,
     update_run_description)
 from qcodes.dataset.sqlite.query_helpers import (VALUE, VALUES,
+                                                 insert_many_columns,
                                                  insert_many_values,
                                                  length, one,
                                                  select_one_where)
+from qcodes.dataset.sqlite.snapshots import (SNAPSHOT_STORAGE_MODES,
+                                             get_stored_snapshot,
+                                             store_snapshot)
 from qcodes.instrument.parameter import _BaseParameter
 from qcodes.utils.deprecate import deprecate
 
@@ -55,6 +65,13 @@ if TYPE_CHECKING:
     import pandas as pd
     import xarray as xr
 
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # shared memory is only available from python 3.8. Without it columns
+    # are pickled and sent to the writer process through a pipe.
+    shared_memory = None  # type: ignore[assignment]
+
 
 log = logging.getLogger(__name__)
 
@@ -99,10 +116,41 @@ class DataPathException(Exception):
     pass
 
 
+@dataclass
+class SubscriberStatistics:
+    """
+    Statistics of the calls of the callback of a subscriber. The latency
+    of a call is the time from the publication of the oldest result passed
+    to the callback until the callback is called. All times are in seconds.
+    """
+    n_callbacks: int = 0
+    n_results: int = 0
+    last_latency: float = 0.0
+    max_latency: float = 0.0
+    total_callback_time: float = 0.0
+    queue_length: int = 0
+    max_queue_length: int = 0
+
+
 class _Subscriber(Thread):
     """
     Class to add a subscriber to a :class:`.DataSet`. The subscriber gets called every
-    time an insert is made to the results_table.
+    time results are written to the results_table.
+
+    The results are published by the code writing them to the database (in
+    the main thread or in the background writer) once per written block, as
+    a mapping from parameter names to one dimensional numpy arrays of equal
+    length. By default the callback is called with a list of tuples of
+    values, one tuple per result holding the values of all parameters of
+    the dataset, or None where a parameter has no value. If ``columnar`` is
+    set, the callback is called with the list of published blocks instead,
+    which avoids creating python objects per result.
+
+    The thread sleeps until at least ``min_queue_length`` results have been
+    published. Calls of the callback are at least ``loop_sleep_time``
+    milliseconds and ``1/max_callback_rate`` seconds apart, results
+    published in between are passed to the next call. Statistics of the
+    calls are kept in ``stats``.
 
     The _Subscriber is not meant to be instantiated directly, but rather used
     via the 'subscribe' method of the :class:`.DataSet`.
@@ -120,7 +168,9 @@ class _Subscriber(Thread):
                  state: Optional[Any] = None,
                  loop_sleep_time: int = 0,  # in milliseconds
                  min_queue_length: int = 1,
-                 callback_kwargs: Optional[Mapping[str, Any]] = None
+                 callback_kwargs: Optional[Mapping[str, Any]] = None,
+                 columnar: bool = False,
+                 max_callback_rate: Optional[float] = None
                  ) -> None:
         super().__init__()
 
@@ -129,94 +179,264 @@ class _Subscriber(Thread):
         self.dataSet = dataSet
         self.table_name = dataSet.table_name
         self._data_set_len = len(dataSet)
+        self._parameter_names = [p.name for p in dataSet.get_parameters()]
+        self.columnar = columnar
 
         self.state = state
 
-        self.data_queue: "Queue[Any]" = Queue()
+        self._condition = Condition()
+        self._blocks: List[Tuple[float, Mapping[str, numpy.ndarray]]] = []
         self._queue_length: int = 0
         self._stop_signal: bool = False
+        self._done: bool = False
         # convert milliseconds to seconds
-        self._loop_sleep_time = loop_sleep_time / 1000
+        self._min_interval = loop_sleep_time / 1000
+        if max_callback_rate:
+            self._min_interval = max(self._min_interval,
+                                     1 / max_callback_rate)
         self.min_queue_length = min_queue_length
+        self.stats = SubscriberStatistics()
 
         if callback_kwargs is None or len(callback_kwargs) == 0:
             self.callback = callback
         else:
             self.callback = functools.partial(callback, **callback_kwargs)
 
-        self.callback_id = f"callback{self._id}"
-        self.trigger_id = f"sub{self._id}"
-
-        conn = dataSet.conn
-
-        conn.create_function(self.callback_id, -1, self._cache_data_to_queue)
-
-        parameters = dataSet.get_parameters()
-        sql_param_list = ",".join([f"NEW.{p.name}" for p in parameters])
-        sql_create_trigger_for_callback = f"""
-        CREATE TRIGGER {self.trigger_id}
-            AFTER INSERT ON '{self.table_name}'
-        BEGIN
-            SELECT {self.callback_id}({sql_param_list});
-        END;"""
-        atomic_transaction(conn, sql_create_trigger_for_callback)
-
         self.log = logging.getLogger(f"_Subscriber {self._id}")
 
-    def _cache_data_to_queue(self, *args: Any) -> None:
-        self.data_queue.put(args)
-        self._data_set_len += 1
-        self._queue_length += 1
+    def publish(self, block: Mapping[str, numpy.ndarray]) -> None:
+        """
+        Hand a block of results written to the database to the subscriber.
+        The block must not be modified afterwards since it is shared by
+        all subscribers of the dataset.
+        """
+        n_results = len(next(iter(block.values()))) if block else 0
+        with self._condition:
+            self._blocks.append((time.perf_counter(), block))
+            self._data_set_len += n_results
+            self._queue_length += n_results
+            self.stats.queue_length = self._queue_length
+            self.stats.max_queue_length = max(self.stats.max_queue_length,
+                                              self._queue_length)
+            if self._queue_length >= self.min_queue_length:
+                self._condition.notify()
 
     def run(self) -> None:
         self.log.debug("Starting subscriber")
         self._loop()
 
-    @staticmethod
-    def _exhaust_queue(queue: "Queue[Any]") -> List[Any]:
-        result_list = []
-        while True:
-            try:
-                result_list.append(queue.get(block=False))
-            except Empty:
-                break
-        return result_list
-
-    def _call_callback_on_queue_data(self) -> None:
-        result_list = self._exhaust_queue(self.data_queue)
-        self.callback(result_list, self._data_set_len, self.state)
+    def _blocks_to_rows(self, blocks: Sequence[Mapping[str, numpy.ndarray]]
+                        ) -> List[Tuple[Any, ...]]:
+        rows: List[Tuple[Any, ...]] = []
+        for block in blocks:
+            n_results = len(next(iter(block.values()))) if block else 0
+            columns = [block[name].tolist() if name in block
+                       else [None] * n_results
+                       for name in self._parameter_names]
+            rows.extend(zip(*columns))
+        return rows
+
+    def _take_blocks(self) -> List[Tuple[float, Mapping[str, numpy.ndarray]]]:
+        # must be called with the condition acquired
+        blocks, self._blocks = self._blocks, []
+        self._queue_length = 0
+        self.stats.queue_length = 0
+        return blocks
+
+    def _call_callback(
+            self,
+            blocks: Sequence[Tuple[float, Mapping[str, numpy.ndarray]]],
+            length: int
+    ) -> None:
+        start = time.perf_counter()
+        data = [block for _, block in blocks]
+        if self.columnar:
+            self.callback(data, length, self.state)
+        else:
+            self.callback(self._blocks_to_rows(data), length, self.state)
+
+        stats = self.stats
+        stats.n_callbacks += 1
+        stats.total_callback_time += time.perf_counter() - start
+        if blocks:
+            stats.n_results += sum(len(next(iter(block.values())))
+                                   for block in data if block)
+            stats.last_latency = start - blocks[0][0]
+            stats.max_latency = max(stats.max_latency, stats.last_latency)
+        self.log.debug(f"Called callback with {len(blocks)} blocks of "
+                       f"results after {stats.last_latency:.3g} s")
 
     def _loop(self) -> None:
+        last_call: Optional[float] = None
         while True:
-            if self._stop_signal:
-                self._clean_up()
-                break
-
-            if self._queue_length >= self.min_queue_length:
-                self._call_callback_on_queue_data()
-                self._queue_length = 0
-
-            time.sleep(self._loop_sleep_time)
-
-            if self.dataSet.completed:
-                self._call_callback_on_queue_data()
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: (self._stop_signal or self._done
+                             or self._queue_length >= self.min_queue_length))
+                if (not self._stop_signal and not self._done
+                        and last_call is not None):
+                    # coalesce the results published until the callback
+                    # may be called again
+                    self._condition.wait_for(
+                        lambda: self._stop_signal or self._done,
+                        timeout=last_call + self._min_interval
+                        - time.perf_counter())
+                if self._stop_signal:
+                    break
+                done = self._done
+                length = self._data_set_len
+                blocks = self._take_blocks()
+            self._call_callback(blocks, length)
+            last_call = time.perf_counter()
+            if done:
                 break
+        self._clean_up()
 
     def done_callback(self) -> None:
-        self._call_callback_on_queue_data()
+        """
+        Call the callback with the results not passed to it yet and wait for
+        the subscriber to finish. This must be called once all results of
+        the dataset have been written.
+        """
+        if self.ident is None:
+            # the thread was never started
+            with self._condition:
+                length = self._data_set_len
+                blocks = self._take_blocks()
+            self._call_callback(blocks, length)
+            return
+        with self._condition:
+            self._done = True
+            self._condition.notify()
+        if current_thread() is not self:
+            self.join()
 
     def schedule_stop(self) -> None:
         if not self._stop_signal:
             self.log.debug("Scheduling stop")
-            self._stop_signal = True
+            with self._condition:
+                self._stop_signal = True
+                self._condition.notify()
 
     def _clean_up(self) -> None:
         self.log.debug("Stopped subscriber")
 
 
+def _rows_to_columns(keys: Sequence[str],
+                     values: Sequence[Sequence[Any]]
+                     ) -> Dict[str, numpy.ndarray]:
+    """
+    Convert row wise results as passed to :func:`insert_many_values` into
+    one dimensional numpy arrays, one per key. Columns that do not form a
+    one dimensional array, e.g. because the values are arrays themselves,
+    are returned as arrays of objects.
+    """
+    columns = {}
+    for i, key in enumerate(keys):
+        column_values = [row[i] for row in values]
+        try:
+            column = numpy.array(column_values)
+        except ValueError:
+            column = None
+        if column is None or column.ndim != 1:
+            column = numpy.empty(len(column_values), dtype=object)
+            for j, value in enumerate(column_values):
+                column[j] = value
+        columns[key] = column
+    return columns
+
+
+def _publish_item(item: Mapping[str, Any]) -> None:
+    """
+    Publish the results of a written data write queue item to the
+    subscribers of its dataset, if any were subscribed when it was enqueued.
+    """
+    subscribers = item.get('subscribers')
+    if not subscribers:
+        return
+    if item.get('columnar', False):
+        block = dict(zip(item['keys'], item['values']))
+    else:
+        block = _rows_to_columns(item['keys'], item['values'])
+    for subscriber in subscribers:
+        subscriber.publish(block)
+
+
+def _get_batch_from_queue(
+        queue: "Queue[Any]"
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Wait for the next item in the data write queue and take all results
+    queued behind it. Draining stops at the first control item ('stop',
+    'finalize' or 'open') since that may only be handled once all results
+    queued before it have been written.
+
+    Returns:
+        The results taken from the queue and the control item if one was
+        taken.
+    """
+    items: List[Dict[str, Any]] = []
+    item = queue.get()
+    while True:
+        if item['keys'] in ('stop', 'finalize', 'open'):
+            return items, item
+        items.append(item)
+        try:
+            item = queue.get_nowait()
+        except Empty:
+            return items, None
+
+
+def _write_batch(conn: ConnectionPlus,
+                 items: Sequence[Dict[str, Any]],
+                 write_item: Callable[[Dict[str, Any]], None],
+                 on_written: Optional[Callable[[int], None]] = None
+                 ) -> None:
+    """
+    Write a batch of results in one transaction such that the cost of
+    committing is paid once per batch rather than once per item. If that
+    fails the results are written one by one so that only the results
+    that can not be written are lost. The first exception raised is
+    reraised once all other results have been written.
+
+    ``on_written`` is called with the index of every item once it has been
+    committed.
+    """
+    if len(items) > 1:
+        try:
+            with atomic(conn):
+                for item in items:
+                    write_item(item)
+        except RuntimeError:
+            log.warning(f"Could not write a batch of {len(items)} results "
+                        f"in one transaction. Writing them one by one.")
+        else:
+            if on_written is not None:
+                for index in range(len(items)):
+                    on_written(index)
+            return
+    first_error: Optional[Exception] = None
+    for index, item in enumerate(items):
+        try:
+            write_item(item)
+        except Exception as e:
+            if first_error is None:
+                first_error = e
+        else:
+            if on_written is not None:
+                on_written(index)
+    if first_error is not None:
+        raise first_error
+
+
 class _BackgroundWriter(Thread):
     """
     Write the results from the DataSet's dataqueue in a new thread
+
+    Errors raised while writing are logged and kept to be reraised in the
+    measurement thread by :meth:`raise_if_failed`, such that the thread
+    keeps consuming the dataqueue and adding results never blocks on a
+    full queue.
     """
 
     def __init__(self, queue: "Queue[Any]", conn: ConnectionPlus):
@@ -224,6 +444,7 @@ class _BackgroundWriter(Thread):
         self.queue = queue
         self.path = conn.path_to_dbfile
         self.keep_writing = True
+        self.errors: List[str] = []
 
     def run(self) -> None:
 
@@ -231,22 +452,66 @@ class _BackgroundWriter(Thread):
 
         while self.keep_writing:
 
-            item = self.queue.get()
-            if item['keys'] == 'stop':
-                self.keep_writing = False
-                self.conn.close()
-            elif item['keys'] == 'finalize':
-                _WRITERS[self.path].active_datasets.remove(item['values'])
-            else:
-                self.write_results(
-                    item['keys'], item['values'], item['table_name'])
-            self.queue.task_done()
+            items, control_item = _get_batch_from_queue(self.queue)
+            try:
+                if items:
+                    _write_batch(self.conn, items, self.write_item,
+                                 lambda index: _publish_item(items[index]))
+                    checkpoint_wal_if_due(self.conn)
+            except Exception:
+                self._record_error()
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+            if control_item is None:
+                continue
+            try:
+                if control_item['keys'] == 'stop':
+                    self.keep_writing = False
+                    self.conn.close()
+                elif control_item['keys'] == 'finalize':
+                    _WRITERS[self.path].active_datasets.remove(
+                        control_item['values'])
+            except Exception:
+                self._record_error()
+            finally:
+                self.queue.task_done()
+
+    def _record_error(self) -> None:
+        error = traceback.format_exc()
+        log.warning(f"Could not write results in the background "
+                    f"writer; {error}")
+        self.errors.append(error)
+
+    def write_item(self, item: Dict[str, Any]) -> None:
+        if item.get('columnar', False):
+            self.write_columns(
+                item['keys'], item['values'], item['table_name'])
+        else:
+            self.write_results(
+                item['keys'], item['values'], item['table_name'])
 
     def write_results(self, keys: Sequence[str],
                       values: Sequence[List[Any]],
                       table_name: str) -> None:
         insert_many_values(self.conn, table_name, keys, values)
 
+    def write_columns(self, keys: Sequence[str],
+                      values: Sequence[numpy.ndarray],
+                      table_name: str) -> None:
+        insert_many_columns(self.conn, table_name, keys, values)
+
+    def raise_if_failed(self) -> None:
+        """
+        Raise a RuntimeError if writing any of the results failed since the
+        last call.
+        """
+        if self.errors:
+            errors, self.errors = self.errors, []
+            raise RuntimeError("Writing results in the background writer "
+                               "failed:\n" + "\n".join(errors))
+
     def shutdown(self) -> None:
         """
         Send a termination signal to the data writing queue, wait for the
@@ -260,10 +525,313 @@ class _BackgroundWriter(Thread):
             self.join()
 
 
+@dataclass
+class _SharedColumn:
+    """
+    A column of results placed in shared memory by the measurement process
+    to be read by the writer process.
+    """
+    name: str
+    dtype: str
+    shape: Tuple[int, ...]
+
+
+def _get_dataset_config() -> Dict[str, Any]:
+    """
+    Get a plain copy of the dataset section of the config that can be sent
+    to the writer process.
+    """
+    return json.loads(json.dumps(qcodes.config['dataset']))
+
+
+def _write_in_process(path: str, pipe: Connection) -> None:
+    """
+    The main loop of the writer process. Batches of results are received
+    from the measurement process through ``pipe`` and written to the
+    database at ``path``. For each batch the indices of the results written
+    and either None or the formatted traceback of the exception raised
+    while writing are sent back.
+
+    The process is spawned and hence starts from the config files rather
+    than the config of the measurement process. The dataset section of
+    that config is sent with an 'open' message at the start of every run
+    and applied before connecting to the database. The database is closed
+    on a 'close' message once no run is written, and opened again by the
+    next message.
+    """
+    conn: Optional[ConnectionPlus] = None
+    dataset_config: Optional[Dict[str, Any]] = None
+
+    def write_item(item: Dict[str, Any]) -> None:
+        assert conn is not None
+        if item.get('columnar', False):
+            _write_shared_columns(conn, item['keys'], item['values'],
+                                  item['table_name'])
+        else:
+            insert_many_values(conn, item['table_name'],
+                               item['keys'], item['values'])
+
+    try:
+        while True:
+            message = pipe.recv()
+            if message['keys'] == 'stop':
+                pipe.send(([], None))
+                break
+            written: List[int] = []
+            try:
+                if message['keys'] == 'open':
+                    if conn is not None and \
+                            message['values'] != dataset_config:
+                        conn.close()
+                        conn = None
+                    config = message['values']
+                    section = qcodes.config['dataset']
+                    for key, value in config.items():
+                        section[key] = value
+                    dataset_config = config
+                elif message['keys'] == 'close':
+                    if conn is not None:
+                        conn.close()
+                        conn = None
+                    pipe.send((written, None))
+                    continue
+                if conn is None:
+                    conn = connect(path)
+                if message['keys'] == 'batch':
+                    _write_batch(conn, message['values'], write_item,
+                                 written.append)
+                    checkpoint_wal_if_due(conn)
+                pipe.send((written, None))
+            except Exception:
+                pipe.send((written, traceback.format_exc()))
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def _write_shared_columns(conn: ConnectionPlus,
+                          keys: Sequence[str],
+                          values: Sequence[Union[_SharedColumn,
+                                                 numpy.ndarray]],
+                          table_name: str) -> None:
+    shms = []
+    columns: List[numpy.ndarray] = []
+    try:
+        for value in values:
+            if isinstance(value, _SharedColumn):
+                shm = shared_memory.SharedMemory(name=value.name)
+                if os.name != 'nt':
+                    # the segment is owned and unlinked by the measurement
+                    # process so it should not be tracked here as well.
+                    # Shared memory is not tracked on windows.
+                    resource_tracker.unregister(
+                        shm._name, 'shared_memory')  # type: ignore[attr-defined]
+                shms.append(shm)
+                columns.append(numpy.ndarray(value.shape,
+                                             dtype=numpy.dtype(value.dtype),
+                                             buffer=shm.buf))
+            else:
+                columns.append(value)
+        insert_many_columns(conn, table_name, keys, columns)
+    finally:
+        # the arrays must be released before the shared memory is closed
+        del columns
+        for shm in shms:
+            shm.close()
+
+
+class _ProcessWriter(Thread):
+    """
+    Write the results from the DataSet's dataqueue in a separate process.
+
+    The writing itself happens in a child process such that it does not
+    compete for the GIL with the measurement. This thread only hands the
+    results over in batches and waits for them to be written, so the
+    dataqueue can be flushed and finalized in the same way as for the
+    :class:`_BackgroundWriter`. Column blocks are passed in shared memory.
+    Errors raised in the writer process are logged and kept to be reraised
+    in the measurement process by :meth:`raise_if_failed`.
+
+    Spawning a process is slow, so unlike the :class:`_BackgroundWriter`
+    the writer is not shut down after a run but kept for all runs written
+    to the database in the process.
+    """
+
+    def __init__(self, queue: "Queue[Any]", conn: ConnectionPlus):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.path = conn.path_to_dbfile
+        self.keep_writing = True
+        self.errors: List[str] = []
+        # fork is not safe in a process that may run other threads
+        context = multiprocessing.get_context('spawn')
+        self.pipe, child_pipe = context.Pipe()
+        self.process = context.Process(target=_write_in_process,
+                                       args=(self.path, child_pipe),
+                                       daemon=True)
+
+    def run(self) -> None:
+
+        self.process.start()
+
+        while self.keep_writing:
+
+            items, control_item = _get_batch_from_queue(self.queue)
+            try:
+                if items:
+                    self.write_batch(items)
+            except Exception:
+                self._record_error()
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+            if control_item is None:
+                continue
+            try:
+                if control_item['keys'] == 'stop':
+                    self.keep_writing = False
+                    self._send(control_item)
+                    self.process.join()
+                elif control_item['keys'] == 'open':
+                    self._send(control_item)
+                elif control_item['keys'] == 'finalize':
+                    active_datasets = _WRITERS[self.path].active_datasets
+                    active_datasets.remove(control_item['values'])
+                    if not active_datasets:
+                        # do not keep the database open between runs
+                        self._send({'keys': 'close', 'values': []})
+            except Exception:
+                self._record_error()
+            finally:
+                self.queue.task_done()
+
+    def _record_error(self) -> None:
+        error = traceback.format_exc()
+        log.warning(f"Could not write results in the background "
+                    f"writer process; {error}")
+        self.errors.append(error)
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        self.pipe.send(message)
+        _, error = self.pipe.recv()
+        if error is not None:
+            raise RuntimeError(error)
+
+    def write_batch(self, items: Sequence[Dict[str, Any]]) -> None:
+        shms: List[Any] = []
+        try:
+            # subscribers live in this process, the results are published
+            # to them once the writer process has written them
+            shared_items = [self._share_columns(item, shms)
+                            if item.get('columnar', False)
+                            else self._without_subscribers(item)
+                            for item in items]
+            self.pipe.send({'keys': 'batch', 'values': shared_items})
+            written, error = self.pipe.recv()
+        finally:
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+        for index in written:
+            _publish_item(items[index])
+        if error is not None:
+            raise RuntimeError(error)
+
+    @staticmethod
+    def _without_subscribers(item: Dict[str, Any]) -> Dict[str, Any]:
+        if 'subscribers' not in item:
+            return item
+        return {key: value for key, value in item.items()
+                if key != 'subscribers'}
+
+    @classmethod
+    def _share_columns(cls, item: Dict[str, Any],
+                       shms: List[Any]) -> Dict[str, Any]:
+        """
+        Copy the columns of a columnar item into shared memory. The shared
+        memory segments created are appended to ``shms``.
+        """
+        item = cls._without_subscribers(item)
+        if shared_memory is None:
+            return item
+        shared_values: List[Union[_SharedColumn, numpy.ndarray]] = []
+        for value in item['values']:
+            if value.dtype.hasobject:
+                shared_values.append(value)
+                continue
+            shm = shared_memory.SharedMemory(create=True,
+                                             size=max(value.nbytes, 1))
+            shms.append(shm)
+            shared: numpy.ndarray = numpy.ndarray(value.shape,
+                                                  dtype=value.dtype,
+                                                  buffer=shm.buf)
+            shared[...] = value
+            del shared
+            shared_values.append(_SharedColumn(name=shm.name,
+                                               dtype=value.dtype.str,
+                                               shape=value.shape))
+        return dict(item, values=shared_values)
+
+    def raise_if_failed(self) -> None:
+        """
+        Raise a RuntimeError if writing any of the results failed since the
+        last call.
+        """
+        if self.errors:
+            errors, self.errors = self.errors, []
+            raise RuntimeError("Writing results in the background writer "
+                               "process failed:\n" + "\n".join(errors))
+
+    def shutdown(self) -> None:
+        """
+        Send a termination signal to the data writing queue, wait for the
+        queue to empty, the writer process to exit and the thread to join.
+
+        If the background writing thread is not alive this will do nothing.
+        """
+        if self.is_alive():
+            self.queue.put({'keys': 'stop', 'values': []})
+            self.queue.join()
+            self.join()
+
+
+@dataclass
+class _ResultColumns:
+    """
+    A block of results for a single parameter tree (or standalone parameter)
+    kept column wise as one dimensional numpy arrays of equal length.
+    Enqueued alongside row wise results so that large numeric results
+    never have to be unrolled into one dict per point.
+    """
+    columns: Dict[str, numpy.ndarray]
+
+
+_ResultType = Union[Dict[str, VALUE], _ResultColumns]
+
+# the columns of the runs table that never change once a run is created
+_IMMUTABLE_RUN_COLUMNS = frozenset(('run_id', 'exp_id', 'name',
+                                    'result_table_name', 'result_counter',
+                                    'captured_run_id', 'captured_counter'))
+
+
+@dataclass
+class _ResultTrees:
+    """
+    The parameter trees that the parameters of a result belong to, as
+    (dependent parameter, inferred parameters, dependency parameters), and
+    the standalone parameters of the result. Computed once per set of
+    parameters by callers that add many results for the same parameters.
+    """
+    dependents: List[Tuple[ParamSpecBase, Set[ParamSpecBase],
+                           Set[ParamSpecBase]]]
+    standalones: Set[ParamSpecBase]
+
+
 @dataclass
 class _WriterStatus:
-    bg_writer: Optional[_BackgroundWriter]
-    write_in_background: Optional[bool]
+    bg_writer: Optional[Union[_BackgroundWriter, _ProcessWriter]]
+    write_in_background: Optional[Union[bool, str]]
     data_write_queue: "Queue[Any]"
     active_datasets: Set[int]
 
@@ -271,6 +839,40 @@ class _WriterStatus:
 _WRITERS: Dict[str, _WriterStatus] = {}
 
 
+def _resize_queue(queue: "Queue[Any]", maxsize: int) -> None:
+    """
+    Change the maximal size of the data write queue. The queue is shared
+    with a writer that may be kept from earlier runs, so it is resized in
+    place rather than replaced.
+    """
+    with queue.mutex:
+        queue.maxsize = maxsize
+        # wake up producers waiting for room if the queue has grown
+        queue.not_full.notify_all()
+
+
+def _shutdown_writer_processes(except_path: Optional[str] = None) -> None:
+    """
+    Shut down the writer processes kept for the databases. If
+    ``except_path`` is given, the writer process of that database and those
+    of databases that a run is still written to are kept. Otherwise, as at
+    exit, all writer processes are shut down once their results have been
+    written.
+    """
+    for path, writer_status in _WRITERS.items():
+        bg_writer = writer_status.bg_writer
+        if not isinstance(bg_writer, _ProcessWriter) or path == except_path:
+            continue
+        if except_path is not None and writer_status.active_datasets:
+            continue
+        bg_writer.shutdown()
+        writer_status.bg_writer = None
+        writer_status.write_in_background = None
+
+
+atexit.register(_shutdown_writer_processes)
+
+
 class DataSet(Sized):
 
     # the "persistent traits" are the attributes/properties of the DataSet
@@ -284,6 +886,22 @@ class DataSet(Sized):
                          'captured_run_id', 'captured_counter')
     background_sleep_time = 1e-3
 
+    def _init_state(self) -> None:
+        self._debug = False
+        self.subscribers: Dict[str, _Subscriber] = {}
+        #: In memory representation of the data in the dataset.
+        self.cache: DataSetCache = DataSetCache(self)
+        self._results: List[_ResultType] = []
+        self._run_id: int
+        self._run_row: Dict[str, Any] = {}
+        self._completed: bool = False
+        self._started: bool = False
+        # the run description, metadata and parent dataset links are only
+        # parsed or looked up once they are accessed
+        self._rundescriber: Optional[RunDescriber] = None
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._parent_dataset_links: Optional[List[Link]] = None
+
     def __init__(self, path_to_db: Optional[str] = None,
                  run_id: Optional[int] = None,
                  conn: Optional[ConnectionPlus] = None,
@@ -324,26 +942,14 @@ class DataSet(Sized):
                 Ignored if ``run_id`` is provided.
         """
         self.conn = conn_from_dbpath_or_conn(conn, path_to_db)
-
-        self._debug = False
-        self.subscribers: Dict[str, _Subscriber] = {}
-        self._parent_dataset_links: List[Link]
-        #: In memory representation of the data in the dataset.
-        self.cache: DataSetCache = DataSetCache(self)
-        self._results: List[Dict[str, VALUE]] = []
+        self._init_state()
 
         if run_id is not None:
-            if not run_exists(self.conn, run_id):
+            run_row = get_run_rows(self.conn, [run_id]).get(run_id)
+            if run_row is None:
                 raise ValueError(f"Run with run_id {run_id} does not exist in "
                                  f"the database")
-            self._run_id = run_id
-            self._completed = completed(self.conn, self.run_id)
-            run_desc = self._get_run_description_from_db()
-            self._rundescriber = run_desc
-            self._metadata = get_metadata_from_run_id(self.conn, self.run_id)
-            self._started = self.run_timestamp_raw is not None
-            self._parent_dataset_links = str_to_links(
-                get_parent_dataset_links(self.conn, self.run_id))
+            self._set_run_row(run_row)
         else:
             # Actually perform all the side effects needed for the creation
             # of a new dataset. Note that a dataset is created (in the DB)
@@ -356,15 +962,16 @@ class DataSet(Sized):
                                      "You can start a new one with:"
                                      " new_experiment(name, sample_name)")
             name = name or "dataset"
-            _, run_id, __ = create_run(self.conn, exp_id, name,
-                                       generate_guid(),
-                                       parameters=None,
-                                       values=values,
-                                       metadata=metadata)
+            counter, run_id, table_name = create_run(self.conn, exp_id, name,
+                                                     generate_guid(),
+                                                     parameters=None,
+                                                     values=values,
+                                                     metadata=metadata)
             # this is really the UUID (an ever increasing count in the db)
             self._run_id = run_id
-            self._completed = False
-            self._started = False
+            self._run_row = {'run_id': run_id, 'exp_id': exp_id,
+                             'name': name, 'result_table_name': table_name,
+                             'result_counter': counter}
 
             if isinstance(specs, InterDependencies_):
                 interdeps = specs
@@ -380,8 +987,40 @@ class DataSet(Sized):
             self._metadata = get_metadata_from_run_id(self.conn, self.run_id)
             self._parent_dataset_links = []
 
+        self._register_writer_status()
+
+    @classmethod
+    def _from_run_row(cls, conn: ConnectionPlus, run_row: Dict[str, Any],
+                      metadata: Optional[Dict[str, Any]] = None
+                      ) -> 'DataSet':
+        """
+        Create a :class:`.DataSet` of an existing run from its row of the
+        runs table as returned by
+        :func:`~qcodes.dataset.sqlite.queries.get_run_rows` without looking
+        the run up again.
+        """
+        dataset = cls.__new__(cls)
+        dataset.conn = conn
+        dataset._init_state()
+        dataset._set_run_row(run_row, metadata)
+        dataset._register_writer_status()
+        return dataset
+
+    def _set_run_row(self, run_row: Dict[str, Any],
+                     metadata: Optional[Dict[str, Any]] = None) -> None:
+        self._run_id = run_row['run_id']
+        self._run_row = run_row
+        self._completed = bool(run_row['is_completed'])
+        self._started = run_row['run_timestamp'] is not None
+        self._metadata = metadata
+
+    def _register_writer_status(self) -> None:
         if _WRITERS.get(self.path_to_db) is None:
-            queue: "Queue[Any]" = Queue()
+            # a bounded queue makes adding results block when the writer
+            # can not keep up rather than letting the queue grow without
+            # limit
+            queue: "Queue[Any]" = Queue(
+                maxsize=qcodes.config.dataset.write_queue_size)
             ws: _WriterStatus = _WriterStatus(
                 bg_writer=None,
                 write_in_background=None,
@@ -393,10 +1032,26 @@ class DataSet(Sized):
     def run_id(self) -> int:
         return self._run_id
 
+    def _get_run_column(self, column: str) -> Any:
+        """
+        Get the value of a column of the runs table for this run. The
+        values of the columns that never change for a run are taken from
+        the row the run was loaded with, all other columns are looked up in
+        the database since they may be changed, e.g. by another connection.
+        """
+        if column in _IMMUTABLE_RUN_COLUMNS:
+            value = self._run_row.get(column)
+            if value is not None:
+                return value
+        value = select_one_where(self.conn, "runs",
+                                 column, "run_id", self.run_id)
+        if column in _IMMUTABLE_RUN_COLUMNS:
+            self._run_row[column] = value
+        return value
+
     @property
     def captured_run_id(self) -> int:
-        return select_one_where(self.conn, "runs",
-                                "captured_run_id", "run_id", self.run_id)
+        return self._get_run_column("captured_run_id")
 
     @property
     def path_to_db(self) -> str:
@@ -404,17 +1059,15 @@ class DataSet(Sized):
 
     @property
     def name(self) -> str:
-        return select_one_where(self.conn, "runs",
-                                "name", "run_id", self.run_id)
+        return self._get_run_column("name")
 
     @property
     def table_name(self) -> str:
-        return select_one_where(self.conn, "runs",
-                                "result_table_name", "run_id", self.run_id)
+        return self._get_run_column("result_table_name")
 
     @property
     def guid(self) -> str:
-        return get_guid_from_run_id(self.conn, self.run_id)
+        return self._get_run_column("guid")
 
     @property
     def snapshot(self) -> Optional[Dict[str, Any]]:
@@ -428,8 +1081,11 @@ class DataSet(Sized):
     @property
     def snapshot_raw(self) -> Optional[str]:
         """Snapshot of the run as a JSON-formatted string (or None)"""
-        return select_one_where(self.conn, "runs", "snapshot",
-                                "run_id", self.run_id)
+        snapshot = select_one_where(self.conn, "runs", "snapshot",
+                                    "run_id", self.run_id)
+        if snapshot is None:
+            snapshot = get_stored_snapshot(self.conn, self.run_id)
+        return snapshot
 
     @property
     def number_of_results(self) -> int:
@@ -439,13 +1095,11 @@ class DataSet(Sized):
 
     @property
     def counter(self) -> int:
-        return select_one_where(self.conn, "runs",
-                                "result_counter", "run_id", self.run_id)
+        return self._get_run_column("result_counter")
 
     @property
     def captured_counter(self) -> int:
-        return select_one_where(self.conn, "runs",
-                                "captured_counter", "run_id", self.run_id)
+        return self._get_run_column("captured_counter")
 
     @property
     def parameters(self) -> str:
@@ -453,8 +1107,7 @@ class DataSet(Sized):
             psnames = [ps.name for ps in self.description.interdeps.paramspecs]
             return ','.join(psnames)
         else:
-            return select_one_where(self.conn, "runs",
-                                    "parameters", "run_id", self.run_id)
+            return self._get_run_column("parameters")
 
     @property
     def paramspecs(self) -> Dict[str, ParamSpec]:
@@ -466,20 +1119,29 @@ class DataSet(Sized):
         """
         Return all the parameters that explicitly depend on other parameters
         """
-        return tuple(self._rundescriber.interdeps.dependencies.keys())
+        return tuple(self.description.interdeps.dependencies.keys())
 
     @property
     def exp_id(self) -> int:
-        return select_one_where(self.conn, "runs",
-                                "exp_id", "run_id", self.run_id)
+        return self._get_run_column("exp_id")
 
     @property
     def exp_name(self) -> str:
-        return get_experiment_name_from_experiment_id(self.conn, self.exp_id)
+        exp_name = self._run_row.get("exp_name")
+        if exp_name is None:
+            exp_name = get_experiment_name_from_experiment_id(self.conn,
+                                                              self.exp_id)
+            self._run_row["exp_name"] = exp_name
+        return exp_name
 
     @property
     def sample_name(self) -> str:
-        return get_sample_name_from_experiment_id(self.conn, self.exp_id)
+        sample_name = self._run_row.get("sample_name")
+        if sample_name is None:
+            sample_name = get_sample_name_from_experiment_id(self.conn,
+                                                             self.exp_id)
+            self._run_row["sample_name"] = sample_name
+        return sample_name
 
     @property
     def run_timestamp_raw(self) -> Optional[float]:
@@ -489,14 +1151,21 @@ class DataSet(Sized):
         The run timestamp is the moment when the measurement for this run
         started.
         """
-        return get_run_timestamp_from_run_id(self.conn, self.run_id)
+        return self._get_run_column("run_timestamp")
 
     @property
     def description(self) -> RunDescriber:
+        if self._rundescriber is None:
+            desc_str = self._run_row.get("run_description")
+            if desc_str is None:
+                desc_str = get_run_description(self.conn, self.run_id)
+            self._rundescriber = serial.from_json_to_current(desc_str)
         return self._rundescriber
 
     @property
     def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = get_metadata_from_run_id(self.conn, self.run_id)
         return self._metadata
 
     @property
@@ -505,6 +1174,12 @@ class DataSet(Sized):
         Return a list of Link objects. Each Link object describes a link from
         this dataset to one of its parent datasets
         """
+        if self._parent_dataset_links is None:
+            if "parent_datasets" in self._run_row:
+                links_str = self._run_row["parent_datasets"] or "[]"
+            else:
+                links_str = get_parent_dataset_links(self.conn, self.run_id)
+            self._parent_dataset_links = str_to_links(links_str)
         return self._parent_dataset_links
 
     @parent_dataset_links.setter
@@ -590,7 +1265,7 @@ class DataSet(Sized):
 
         If the run (or the dataset) is not completed, then returns None.
         """
-        return get_completed_timestamp_from_run_id(self.conn, self.run_id)
+        return self._get_run_column("completed_timestamp")
 
     def completed_timestamp(self,
                             fmt: str = "%Y-%m-%d %H:%M:%S") -> Optional[str]:
@@ -612,13 +1287,6 @@ class DataSet(Sized):
 
         return completed_timestamp
 
-    def _get_run_description_from_db(self) -> RunDescriber:
-        """
-        Look up the run_description from the database
-        """
-        desc_str = get_run_description(self.conn, self.run_id)
-        return serial.from_json_to_current(desc_str)
-
     def toggle_debug(self) -> None:
         """
         Toggle debug mode, if debug mode is on all the queries made are
@@ -661,22 +1329,35 @@ class DataSet(Sized):
             metadata: actual metadata
         """
 
-        self._metadata[tag] = metadata
+        self.metadata[tag] = metadata
         # `add_meta_data` is not atomic by itself, hence using `atomic`
         with atomic(self.conn) as conn:
             add_meta_data(conn, self.run_id, {tag: metadata})
 
     def add_snapshot(self, snapshot: str, overwrite: bool = False) -> None:
         """
-        Adds a snapshot to this run
+        Adds a snapshot to this run. The snapshot is stored as configured by
+        ``dataset.snapshot_storage`` in the ``qcodesrc.json`` config file.
 
         Args:
             snapshot: the raw JSON dump of the snapshot
             overwrite: force overwrite an existing snapshot
         """
-        if self.snapshot is None or overwrite:
-            add_meta_data(self.conn, self.run_id, {'snapshot': snapshot})
-        elif self.snapshot is not None and not overwrite:
+        if self.snapshot_raw is None or overwrite:
+            storage = qcodes.config.dataset.snapshot_storage
+            if storage not in SNAPSHOT_STORAGE_MODES:
+                raise RuntimeError(f"Invalid snapshot_storage {storage}. "
+                                   f"Valid modes are "
+                                   f"{list(SNAPSHOT_STORAGE_MODES)}")
+            if storage == 'inline':
+                add_meta_data(self.conn, self.run_id, {'snapshot': snapshot})
+            else:
+                store_snapshot(
+                    self.conn, self.run_id, snapshot,
+                    delta=storage == 'delta',
+                    compression=qcodes.config.dataset.snapshot_compression,
+                    max_deltas=qcodes.config.dataset.snapshot_max_deltas)
+        else:
             log.warning('This dataset already has a snapshot. Use overwrite'
                         '=True to overwrite that')
 
@@ -719,7 +1400,7 @@ class DataSet(Sized):
         if value:
             mark_run_complete(self.conn, self.run_id)
 
-    def mark_started(self, start_bg_writer: bool = False) -> None:
+    def mark_started(self, start_bg_writer: Union[bool, str] = False) -> None:
         """
         Mark this :class:`.DataSet` as started. A :class:`.DataSet` that has been started can not
         have its parameters modified.
@@ -728,28 +1409,37 @@ class DataSet(Sized):
 
         Args:
             start_bg_writer: If True, the add_results method will write to the
-                database in a separate thread.
+                database in a separate thread. If "process", the data is
+                written in a separate process.
         """
+        if start_bg_writer not in (True, False, "process"):
+            raise ValueError(f"Invalid value for start_bg_writer: "
+                             f"{start_bg_writer}. Expected True, False or "
+                             f"'process'.")
         if not self._started:
             self._perform_start_actions(start_bg_writer=start_bg_writer)
             self._started = True
 
-    def _perform_start_actions(self, start_bg_writer: bool) -> None:
+    def _perform_start_actions(self, start_bg_writer: Union[bool, str]) -> None:
         """
         Perform the actions that must take place once the run has been started
         """
-        paramspecs = new_to_old(self._rundescriber.interdeps).paramspecs
+        paramspecs = new_to_old(self.description.interdeps).paramspecs
 
         for spec in paramspecs:
             add_parameter(self.conn, self.table_name, spec)
 
+        if qcodes.config.dataset.index_parameter_trees:
+            create_parameter_tree_indices(self.conn, self.table_name,
+                                          self.description.interdeps)
+
         desc_str = serial.to_json_for_storage(self.description)
 
         update_run_description(self.conn, self.run_id, desc_str)
 
         set_run_timestamp(self.conn, self.run_id)
 
-        pdl_str = links_to_str(self._parent_dataset_links)
+        pdl_str = links_to_str(self.parent_dataset_links)
         update_parent_datasets(self.conn, self.run_id, pdl_str)
 
         writer_status = self._writer_status
@@ -757,15 +1447,35 @@ class DataSet(Sized):
         write_in_background_status = writer_status.write_in_background
         if write_in_background_status is not None and write_in_background_status != start_bg_writer:
             raise RuntimeError("All datasets written to the same database must "
-                               "be written either in the background or in the "
-                               "main thread. You cannot mix.")
+                               "be written either in the background (in the "
+                               "same way) or in the main thread. You cannot "
+                               "mix.")
         if start_bg_writer:
-            writer_status.write_in_background = True
-            if writer_status.bg_writer is None:
-                writer_status.bg_writer = _BackgroundWriter(
-                    writer_status.data_write_queue, self.conn)
-            if not writer_status.bg_writer.is_alive():
-                writer_status.bg_writer.start()
+            writer_status.write_in_background = start_bg_writer
+            if not writer_status.active_datasets:
+                _resize_queue(writer_status.data_write_queue,
+                              qcodes.config.dataset.write_queue_size)
+            writer_class: Union[Type[_BackgroundWriter],
+                                Type[_ProcessWriter]]
+            if start_bg_writer == "process":
+                writer_class = _ProcessWriter
+                # only keep the writer process of the database written to
+                _shutdown_writer_processes(except_path=self.path_to_db)
+            else:
+                writer_class = _BackgroundWriter
+            bg_writer = writer_status.bg_writer
+            if bg_writer is None or not isinstance(bg_writer, writer_class):
+                if bg_writer is not None:
+                    # a writer process kept from earlier runs
+                    bg_writer.shutdown()
+                bg_writer = writer_class(writer_status.data_write_queue,
+                                         self.conn)
+                writer_status.bg_writer = bg_writer
+            if not bg_writer.is_alive():
+                bg_writer.start()
+            if isinstance(bg_writer, _ProcessWriter):
+                writer_status.data_write_queue.put(
+                    {'keys': 'open', 'values': _get_dataset_config()})
         else:
             writer_status.write_in_background = False
 
@@ -781,16 +1491,22 @@ class DataSet(Sized):
             raise RuntimeError('Can not mark DataSet as complete before it '
                                'has been marked as started.')
 
+        bg_writer = self._writer_status.bg_writer
         self._perform_completion_actions()
         self.completed = True
+        # errors from the background writer are only raised once the
+        # dataset is completed, such that the writer is always shut down.
+        self._raise_if_writer_failed(bg_writer)
 
     def _perform_completion_actions(self) -> None:
         """
         Perform the necessary clean-up
         """
+        # the results are published to the subscribers as they are
+        # written so all of them must be written before the final callback
+        self._ensure_dataset_written()
         for sub in self.subscribers.values():
             sub.done_callback()
-        self._ensure_dataset_written()
 
     def add_results(self, results: Sequence[Mapping[str, VALUE]]) -> None:
         """
@@ -813,15 +1529,75 @@ class DataSet(Sized):
         expected_keys = frozenset.union(*[frozenset(d) for d in results])
         values = [[d.get(k, None) for k in expected_keys] for d in results]
 
+        item: Dict[str, Any] = {'keys': list(expected_keys), 'values': values,
+                                "table_name": self.table_name}
+        self._write_or_enqueue(item)
+
+    def _add_result_columns(self, columns: Mapping[str, numpy.ndarray]) -> None:
+        """
+        Adds a block of results given column wise to the :class:`.DataSet`.
+        This is the columnar counterpart of :meth:`add_results` and avoids
+        creating a python object per row.
+
+        Args:
+            columns: mapping from parameter names to one dimensional numpy
+                arrays of values. All arrays must have the same length.
+        """
+        self._raise_if_not_writable()
+
+        keys = list(columns.keys())
+        values = [columns[key] for key in keys]
+
+        item: Dict[str, Any] = {'keys': keys, 'values': values,
+                                'table_name': self.table_name,
+                                'columnar': True}
+        self._write_or_enqueue(item)
+
+    def _write_or_enqueue(self, item: Dict[str, Any]) -> None:
+        """
+        Write an item of results to the database or hand it to the
+        background writer. The results are published to the subscribers of
+        the dataset once they have been written.
+        """
+        if self.subscribers:
+            item['subscribers'] = list(self.subscribers.values())
+
         writer_status = self._writer_status
 
         if writer_status.write_in_background:
-            item = {'keys': list(expected_keys), 'values': values,
-                    "table_name": self.table_name}
             writer_status.data_write_queue.put(item)
+            return
+        if item.get('columnar', False):
+            insert_many_columns(self.conn, self.table_name, item['keys'],
+                                item['values'])
         else:
-            insert_many_values(self.conn, self.table_name, list(expected_keys),
-                               values)
+            insert_many_values(self.conn, self.table_name, item['keys'],
+                               item['values'])
+        _publish_item(item)
+
+    def _add_result_blocks(self) -> None:
+        """
+        Write the enqueued results in ``self._results`` preserving their
+        order. Consecutive row wise results are added with one call to
+        :meth:`add_results` and column blocks with :meth:`_add_result_columns`.
+        Results are removed from ``self._results`` once they have been
+        handed over, so that a failure leaves only the remaining results
+        enqueued.
+        """
+        while self._results:
+            first = self._results[0]
+            if isinstance(first, _ResultColumns):
+                self._add_result_columns(first.columns)
+                del self._results[0]
+                continue
+            n_rows = 0
+            for result in self._results:
+                if isinstance(result, _ResultColumns):
+                    break
+                n_rows += 1
+            rows = cast(List[Dict[str, VALUE]], self._results[:n_rows])
+            self.add_results(rows)
+            del self._results[:n_rows]
 
     def _raise_if_not_writable(self) -> None:
         if self.pristine:
@@ -845,10 +1621,17 @@ class DataSet(Sized):
                 writer_status.active_datasets.remove(self.run_id)
         if len(writer_status.active_datasets) == 0:
             writer_status.write_in_background = None
-            if writer_status.bg_writer is not None:
+            if isinstance(writer_status.bg_writer, _BackgroundWriter):
                 writer_status.bg_writer.shutdown()
                 writer_status.bg_writer = None
 
+    @staticmethod
+    def _raise_if_writer_failed(
+            bg_writer: Optional[Union[_BackgroundWriter, _ProcessWriter]]
+    ) -> None:
+        if bg_writer is not None:
+            bg_writer.raise_if_failed()
+
     @staticmethod
     def _validate_parameters(*params: Union[str, ParamSpec, _BaseParameter]
                              ) -> List[str]:
@@ -924,12 +1707,49 @@ class DataSet(Sized):
         """
         if len(params) == 0:
             valid_param_names = [ps.name
-                                 for ps in self._rundescriber.interdeps.non_dependencies]
+                                 for ps in self.description.interdeps.non_dependencies]
         else:
             valid_param_names = self._validate_parameters(*params)
         return get_parameter_data(self.conn, self.table_name,
                                   valid_param_names, start, end)
 
+    def iter_parameter_data(
+            self,
+            *params: Union[str, ParamSpec, _BaseParameter],
+            chunk_rows: int = 100000) -> Iterator[ParameterData]:
+        """
+        Iterate over the values stored in the :class:`.DataSet` for the
+        specified parameters and their dependencies in chunks of at most
+        ``chunk_rows`` results per parameter. This allows processing runs
+        that are too large to be loaded into memory in one go.
+
+        Each chunk has the same structure as the output of
+        :py:meth:`get_parameter_data` but, unlike that method, the data is
+        never reshaped according to the shape recorded in the metadata of
+        the dataset. Parameters with no data left are omitted from the
+        remaining chunks.
+
+        Args:
+            *params: string parameter names, QCoDeS Parameter objects, and
+                ParamSpec objects. If no parameters are supplied data for
+                all parameters that are not a dependency of another
+                parameter will be returned.
+            chunk_rows: The maximal number of results per parameter in each
+                chunk.
+
+        Returns:
+            Iterator of dictionaries from requested parameters to Dict of
+            parameter names to numpy arrays containing the data points of
+            type numeric, array or string.
+        """
+        if len(params) == 0:
+            valid_param_names = [ps.name
+                                 for ps in self.description.interdeps.non_dependencies]
+        else:
+            valid_param_names = self._validate_parameters(*params)
+        return get_parameter_data_in_chunks(self.conn, self.table_name,
+                                            valid_param_names, chunk_rows)
+
     @staticmethod
     def _parameter_data_identical(param_dict_a: Dict[str, numpy.ndarray],
                                   param_dict_b: Dict[str, numpy.ndarray]) -> bool:
@@ -1009,6 +1829,35 @@ class DataSet(Sized):
         dfs_dict = self._load_to_dataframe_dict(datadict)
         return dfs_dict
 
+    def iter_pandas_dataframe_dict(
+            self,
+            *params: Union[str, ParamSpec, _BaseParameter],
+            chunk_rows: int = 100000) -> Iterator[Dict[str, "pd.DataFrame"]]:
+        """
+        Iterate over the values stored in the :class:`.DataSet` for the
+        specified parameters and their dependencies as dicts of
+        :py:class:`pandas.DataFrame` s in chunks of at most ``chunk_rows``
+        results per parameter. See :py:meth:`iter_parameter_data` and
+        :py:meth:`to_pandas_dataframe_dict` for details.
+
+        Args:
+            *params: string parameter names, QCoDeS Parameter objects, and
+                ParamSpec objects. If no parameters are supplied data for
+                all parameters that are not a dependency of another
+                parameter will be returned.
+            chunk_rows: The maximal number of results per parameter in each
+                chunk.
+
+        Returns:
+            Iterator of dictionaries from requested parameter names to
+            :py:class:`pandas.DataFrame` s with the requested parameter as
+            a column and a indexed by a :py:class:`pandas.MultiIndex` formed
+            by the dependencies.
+        """
+        for datadict in self.iter_parameter_data(*params,
+                                                 chunk_rows=chunk_rows):
+            yield self._load_to_dataframe_dict(datadict)
+
     @deprecate(reason='This method will be removed due to inconcise naming, please '
                'use the renamed method to_pandas_dataframe_dict',
                alternative='to_pandas_dataframe_dict')
@@ -1162,7 +2011,10 @@ class DataSet(Sized):
 
                 dataarray_dict = ds.to_xarray_dataarray_dict()
         """
-        return self._load_to_xarray_dataarray_dict(*params, start=start, end=end)
+        datadict = self.get_parameter_data(*params,
+                                           start=start,
+                                           end=end)
+        return self._load_to_xarray_dataarray_dict(datadict)
 
     def to_xarray_dataset(self, *params: Union[str,
                                                ParamSpec,
@@ -1204,15 +2056,15 @@ class DataSet(Sized):
         """
         import xarray as xr
 
-        if not self._same_setpoints(self.get_parameter_data(*params,
-                                                            start=start,
-                                                            end=end)):
+        datadict = self.get_parameter_data(*params,
+                                           start=start,
+                                           end=end)
+        if not self._same_setpoints(datadict):
             warnings.warn(
                 'Independent parameter setpoints are not equal. \
                 Check concatenated output carefully.')
 
-        data_xrdarray_dict = self._load_to_xarray_dataarray_dict(
-            *params, start=start, end=end)
+        data_xrdarray_dict = self._load_to_xarray_dataarray_dict(datadict)
 
         # Casting Hashable for the key type until python/mypy#1114
         # and python/typing#445 are resolved.
@@ -1274,33 +2126,81 @@ class DataSet(Sized):
             dfs[name] = self._data_to_dataframe(subdict, index)
         return dfs
 
-    def _load_to_xarray_dataarray_dict(self,
-                                       *params: Union[str,
-                                                      ParamSpec,
-                                                      _BaseParameter],
-                                       start: Optional[int] = None,
-                                       end: Optional[int] = None) -> \
+    def _load_to_xarray_dataarray_dict(self, datadict: ParameterData) -> \
             Dict[str, "xr.DataArray"]:
         import xarray as xr
-        datadict = self.get_parameter_data(*params,
-                                           start=start,
-                                           end=end)
 
         data_xrdarray_dict: Dict[str, xr.DataArray] = {}
 
         for name, subdict in datadict.items():
-            index = self._generate_pandas_index(subdict)
-            xrdarray: xr.DataArray = self._data_to_dataframe(
-                subdict, index).to_xarray()[name]
+            xrdarray = self._data_to_gridded_xarray_dataarray(name, subdict)
+            if xrdarray is None:
+                index = self._generate_pandas_index(subdict)
+                xrdarray = self._data_to_dataframe(
+                    subdict, index).to_xarray()[name]
             paramspec_dict = self.paramspecs[name]._to_dict()
             xrdarray.attrs.update(paramspec_dict.items())
             data_xrdarray_dict[name] = xrdarray
 
         return data_xrdarray_dict
 
+    def _data_to_gridded_xarray_dataarray(
+            self,
+            name: str,
+            data: Dict[str, numpy.ndarray]) -> Optional["xr.DataArray"]:
+        """
+        Create a :py:class:`xr.DataArray` directly from data that has been
+        reshaped to the shape registered for the parameter, if the setpoints
+        form a regular grid. That is, if the n'th setpoint only varies along
+        the n'th axis and takes unique values along it. The coordinates are
+        sorted in the same way as when unstacking a
+        :py:class:`pandas.MultiIndex`, which is what this avoids.
+
+        Returns:
+            The data array or None if the data does not form a regular grid,
+            in which case the data must be converted via pandas.
+        """
+        import xarray as xr
+
+        shapes = self.description.shapes
+        if shapes is None or name not in shapes:
+            return None
+        shape = tuple(shapes[name])
+        setpoint_names = [key for key in data.keys() if key != name]
+        if (len(shape) == 0 or len(setpoint_names) != len(shape)
+                or any(values.shape != shape for values in data.values())):
+            return None
+
+        dependent_data = data[name]
+        coords = []
+        for axis, setpoint_name in enumerate(setpoint_names):
+            setpoints = data[setpoint_name]
+            if setpoints.dtype.kind not in 'iuf':
+                return None
+            index: Tuple[Union[slice, int], ...] = tuple(
+                slice(None) if i == axis else 0 for i in range(len(shape)))
+            coord = setpoints[index]
+            coord_shape = tuple(n if i == axis else 1
+                                for i, n in enumerate(shape))
+            if not numpy.array_equal(setpoints,
+                                     numpy.broadcast_to(
+                                         coord.reshape(coord_shape), shape)):
+                return None
+            order = numpy.argsort(coord, kind='stable')
+            coord = coord[order]
+            if (not numpy.all(numpy.isfinite(coord))
+                    or numpy.any(coord[1:] == coord[:-1])):
+                return None
+            if numpy.any(order != numpy.arange(len(order))):
+                dependent_data = numpy.take(dependent_data, order, axis=axis)
+            coords.append((setpoint_name, coord))
+
+        return xr.DataArray(dependent_data, coords=coords, name=name)
+
     def write_data_to_text_file(self, path: str,
                                 single_file: bool = False,
-                                single_file_name: Optional[str] = None) -> None:
+                                single_file_name: Optional[str] = None,
+                                chunk_rows: Optional[int] = None) -> None:
         """
         An auxiliary function to export data to a text file. When the data with more
         than one dependent variables, say "y(x)" and "z(x)", is concatenated to a single file
@@ -1327,6 +2227,10 @@ class DataSet(Sized):
             single_file: If true, merges the data of same length of multiple
                          dependent parameters to a single file.
             single_file_name: User defined name for the data to be concatenated.
+            chunk_rows: If given, the data is loaded and written in chunks of
+                at most this many results per parameter such that runs that
+                do not fit into memory can be exported. See
+                :py:meth:`iter_pandas_dataframe_dict`.
 
         Raises:
             DataLengthException: If the data of multiple parameters have not same
@@ -1335,38 +2239,107 @@ class DataSet(Sized):
                                in a single file but no filename provided.
         """
         import pandas as pd
-        dfdict = self.to_pandas_dataframe_dict()
-        dfs_to_save = list()
-        for parametername, df in dfdict.items():
-            if not single_file:
-                dst = os.path.join(path, f'{parametername}.dat')
-                df.to_csv(path_or_buf=dst, header=False, sep='\t')
-            else:
-                dfs_to_save.append(df)
-        if single_file:
-            df_length = len(dfs_to_save[0])
-            if any(len(df) != df_length for df in dfs_to_save):
-                raise DataLengthException("You cannot concatenate data " +
-                                          "with different length to a " +
-                                          "single file.")
-            if single_file_name == None:
-                raise DataPathException("Please provide the desired file name " +
-                                        "for the concatenated data.")
-            else:
-                dst = os.path.join(path, f'{single_file_name}.dat')
-                df_to_save = pd.concat(dfs_to_save, axis=1)
-                df_to_save.to_csv(path_or_buf=dst, header=False, sep='\t')
+        dfdicts: Iterable[Dict[str, "pd.DataFrame"]]
+        if chunk_rows is None:
+            dfdicts = (self.to_pandas_dataframe_dict(),)
+        else:
+            dfdicts = self.iter_pandas_dataframe_dict(chunk_rows=chunk_rows)
+        parameternames: Optional[List[str]] = None
+        for dfdict in dfdicts:
+            # the first chunk creates the files, later chunks are appended
+            mode = 'w' if parameternames is None else 'a'
+            if parameternames is None:
+                parameternames = list(dfdict.keys())
+            dfs_to_save = list()
+            for parametername, df in dfdict.items():
+                if not single_file:
+                    dst = os.path.join(path, f'{parametername}.dat')
+                    df.to_csv(path_or_buf=dst, header=False, sep='\t',
+                              mode=mode)
+                else:
+                    dfs_to_save.append(df)
+            if single_file:
+                df_length = len(dfs_to_save[0])
+                if (list(dfdict.keys()) != parameternames
+                        or any(len(df) != df_length for df in dfs_to_save)):
+                    raise DataLengthException("You cannot concatenate data " +
+                                              "with different length to a " +
+                                              "single file.")
+                if single_file_name == None:
+                    raise DataPathException("Please provide the desired file name " +
+                                            "for the concatenated data.")
+                else:
+                    dst = os.path.join(path, f'{single_file_name}.dat')
+                    df_to_save = pd.concat(dfs_to_save, axis=1)
+                    df_to_save.to_csv(path_or_buf=dst, header=False, sep='\t',
+                                      mode=mode)
+
+    def export(self, format: str, path: str,
+               chunk_rows: int = 100000) -> str:
+        """
+        Export the data, run description, snapshot and metadata of the run
+        to a NetCDF4 or HDF5 file. The data is copied from the database one
+        parameter tree at a time in chunks of at most ``chunk_rows`` results
+        such that runs that do not fit into memory can be exported. Use
+        :func:`~qcodes.dataset.hdf5_export.load_from_hdf5` to load the
+        exported run.
+
+        Args:
+            format: either 'netcdf' or 'hdf5'
+            path: path of the file to write. If this is an existing
+                directory, the file is written into it with a name made from
+                the captured run id and the GUID of the run.
+            chunk_rows: the maximal number of results of a parameter tree
+                read from the database at a time
+
+        Returns:
+            The path of the written file
+        """
+        from qcodes.dataset.hdf5_export import export_to_hdf5
+        return export_to_hdf5(self, path, export_format=format,
+                              chunk_rows=chunk_rows)
 
     def subscribe(self,
                   callback: Callable[[Any, int, Optional[Any]], None],
                   min_wait: int = 0,
                   min_count: int = 1,
                   state: Optional[Any] = None,
-                  callback_kwargs: Optional[Mapping[str, Any]] = None
+                  callback_kwargs: Optional[Mapping[str, Any]] = None,
+                  columnar: bool = False,
+                  max_callback_rate: Optional[float] = None
                   ) -> str:
+        """
+        Subscribe a callback to the results written to this
+        :class:`.DataSet`. The callback is called from a separate thread as
+        ``callback(results, length, state)`` where ``length`` is the number
+        of results of the dataset.
+
+        Args:
+            callback: the callback to call
+            min_wait: the minimal time in milliseconds between two calls
+                of the callback
+            min_count: the minimal number of new results to call the
+                callback for
+            state: object passed to every call of the callback
+            callback_kwargs: keyword arguments passed to the callback
+            columnar: if False, ``results`` is a list of tuples with the
+                values of all parameters of the dataset, one per result.
+                If True, ``results`` is a list of the blocks of results as
+                written, each a mapping from parameter names to one
+                dimensional numpy arrays of equal length.
+            max_callback_rate: the maximal number of calls of the callback
+                per second. Defaults to ``subscription.max_callback_rate``
+                from the config.
+
+        Returns:
+            The id of the subscriber
+        """
+        if max_callback_rate is None:
+            max_callback_rate = qcodes.config.subscription.max_callback_rate
         subscriber_id = uuid.uuid4().hex
         subscriber = _Subscriber(self, subscriber_id, callback, state,
-                                 min_wait, min_count, callback_kwargs)
+                                 min_wait, min_count, callback_kwargs,
+                                 columnar, max_callback_rate)
         self.subscribers[subscriber_id] = subscriber
         subscriber.start()
         return subscriber_id
@@ -1407,16 +2380,15 @@ class DataSet(Sized):
         """
         Remove subscriber with the provided uuid
         """
-        with atomic(self.conn) as conn:
-            sub = self.subscribers[uuid]
-            remove_trigger(conn, sub.trigger_id)
-            sub.schedule_stop()
-            sub.join()
-            del self.subscribers[uuid]
+        sub = self.subscribers.pop(uuid)
+        sub.schedule_stop()
+        sub.join()
 
     def unsubscribe_all(self) -> None:
         """
-        Remove all subscribers
+        Remove all subscribers. This also removes all triggers from the
+        database, which were used to notify subscribers by earlier versions
+        of QCoDeS.
         """
         sql = "select * from sqlite_master where type = 'trigger';"
         triggers = atomic_transaction(self.conn, sql).fetchall()
@@ -1428,7 +2400,10 @@ class DataSet(Sized):
                 sub.join()
             self.subscribers.clear()
 
-    def get_metadata(self, tag: str) -> str:
+    def get_metadata(self, tag: str) -> Optional[str]:
+        if tag == 'snapshot':
+            # the snapshot may be kept in the snapshot store
+            return self.snapshot_raw
         return get_metadata(self.conn, tag, self.table_name)
 
     def __len__(self) -> int:
@@ -1446,8 +2421,26 @@ class DataSet(Sized):
 
         return "\n".join(out)
 
+    def _get_result_trees(
+            self, params: Iterable[ParamSpecBase]) -> _ResultTrees:
+        """
+        Get the parameter trees that the given parameters of a result belong
+        to
+        """
+        interdeps = self.description.interdeps
+        params = set(params)
+
+        dependents = []
+        for toplevel_param in set(interdeps.dependencies).intersection(params):
+            inff_params = set(interdeps.inferences.get(toplevel_param, ()))
+            deps_params = set(interdeps.dependencies.get(toplevel_param, ()))
+            dependents.append((toplevel_param, inff_params, deps_params))
+        standalones = set(interdeps.standalones).intersection(params)
+        return _ResultTrees(dependents=dependents, standalones=standalones)
+
     def _enqueue_results(
-            self, result_dict: Mapping[ParamSpecBase, numpy.ndarray]) -> None:
+            self, result_dict: Mapping[ParamSpecBase, numpy.ndarray],
+            trees: Optional[_ResultTrees] = None) -> None:
         """
         Enqueue the results into self._results
 
@@ -1457,40 +2450,39 @@ class DataSet(Sized):
         tree.
 
         Deal with 'numeric' type parameters. If a 'numeric' top level parameter
-        has non-scalar shape, it must be unrolled into a list of dicts of
-        single values (database).
+        has non-scalar shape, it is enqueued column wise as a block of flat
+        numpy arrays (one per parameter in the tree) rather than unrolled
+        into a list of dicts of single values.
+
+        The parameter trees of the results are looked up unless they are
+        given as ``trees``.
         """
         self._raise_if_not_writable()
-        interdeps = self._rundescriber.interdeps
+        if trees is None:
+            trees = self._get_result_trees(result_dict)
 
-        toplevel_params = (set(interdeps.dependencies)
-                           .intersection(set(result_dict)))
-        for toplevel_param in toplevel_params:
-            inff_params = set(interdeps.inferences.get(toplevel_param, ()))
-            deps_params = set(interdeps.dependencies.get(toplevel_param, ()))
+        for toplevel_param, inff_params, deps_params in trees.dependents:
             all_params = (inff_params
                           .union(deps_params)
                           .union({toplevel_param}))
-            res_dict: Dict[str, VALUE] = {}  # the dict to append to _results
+            res_list: List[_ResultType]
             if toplevel_param.type == 'array':
-                res_list = self._finalize_res_dict_array(
-                    result_dict, all_params)
+                res_list = list(self._finalize_res_dict_array(
+                    result_dict, all_params))
             elif toplevel_param.type in ('numeric', 'text', 'complex'):
                 res_list = self._finalize_res_dict_numeric_text_or_complex(
                     result_dict, toplevel_param,
                     inff_params, deps_params)
             else:
-                res_dict = {ps.name: result_dict[ps] for ps in all_params}
+                res_dict: Dict[str, VALUE] = {ps.name: result_dict[ps]
+                                              for ps in all_params}
                 res_list = [res_dict]
             self._results += res_list
 
         # Finally, handle standalone parameters
 
-        standalones = (set(interdeps.standalones)
-                       .intersection(set(result_dict)))
-
-        if standalones:
-            stdln_dict = {st: result_dict[st] for st in standalones}
+        if trees.standalones:
+            stdln_dict = {st: result_dict[st] for st in trees.standalones}
             self._results += self._finalize_res_dict_standalones(stdln_dict)
 
     @staticmethod
@@ -1530,15 +2522,16 @@ class DataSet(Sized):
             result_dict: Mapping[ParamSpecBase, numpy.ndarray],
             toplevel_param: ParamSpecBase,
             inff_params: Set[ParamSpecBase],
-            deps_params: Set[ParamSpecBase]) -> List[Dict[str, VALUE]]:
+            deps_params: Set[ParamSpecBase]) -> List[_ResultType]:
         """
-        Make a res_dict in the format expected by DataSet.add_results out
-        of the results for a 'numeric' or text type parameter. This includes
-        replicating and unrolling values as needed and also handling the corner
-        case of np.array(1) kind of values
+        Make the results in the format expected by the database writer out
+        of the results for a 'numeric' or text type parameter. A single
+        value is returned as a res_dict. Non-scalar values are raveled and
+        returned as one block of columns, replicating scalar setpoints as
+        needed. This also handles the corner case of np.array(1) kind of
+        values
         """
 
-        res_list: List[Dict[str, VALUE]] = []
         all_params = inff_params.union(deps_params).union({toplevel_param})
 
         t_map = {'numeric': float, 'text': str, 'complex': complex}
@@ -1546,60 +2539,46 @@ class DataSet(Sized):
         toplevel_shape = result_dict[toplevel_param].shape
         if toplevel_shape == ():
             # In the case of a single value, life is reasonably simple
-            res_list = [{ps.name: t_map[ps.type](result_dict[ps])
-                         for ps in all_params}]
-        else:
-            # We first massage all values into np.arrays of the same
-            # shape
-            flat_results: Dict[str, numpy.ndarray] = {}
-
-            toplevel_val = result_dict[toplevel_param]
-            flat_results[toplevel_param.name] = toplevel_val.ravel()
-            N = len(flat_results[toplevel_param.name])
-            for dep in deps_params:
-                if result_dict[dep].shape == ():
-                    flat_results[dep.name] = numpy.repeat(result_dict[dep], N)
-                else:
-                    flat_results[dep.name] = result_dict[dep].ravel()
-            for inff in inff_params:
-                if numpy.shape(result_dict[inff]) == ():
-                    flat_results[inff.name] = numpy.repeat(result_dict[dep], N)
-                else:
-                    flat_results[inff.name] = result_dict[inff].ravel()
-
-            # And then put everything into the list
-
-            res_list = [{p.name: flat_results[p.name][ind] for p in all_params}
-                        for ind in range(N)]
+            return [{ps.name: t_map[ps.type](result_dict[ps])
+                     for ps in all_params}]
+
+        # We massage all values into flat np.arrays of the same
+        # length. Scalars are broadcast which does not copy the data
+        flat_results: Dict[str, numpy.ndarray] = {}
+
+        toplevel_val = result_dict[toplevel_param]
+        flat_results[toplevel_param.name] = toplevel_val.ravel()
+        N = len(flat_results[toplevel_param.name])
+        for param in deps_params.union(inff_params):
+            if numpy.shape(result_dict[param]) == ():
+                flat_results[param.name] = numpy.broadcast_to(
+                    result_dict[param], (N,))
+            else:
+                flat_results[param.name] = numpy.ravel(result_dict[param])
 
-        return res_list
+        return [_ResultColumns(columns=flat_results)]
 
     @staticmethod
     def _finalize_res_dict_standalones(
             result_dict: Mapping[ParamSpecBase, numpy.ndarray]
-    ) -> List[Dict[str, VALUE]]:
+    ) -> List[_ResultType]:
         """
         Massage all standalone parameters into the correct shape
         """
-        res_list: List[Dict[str, VALUE]] = []
+        res_list: List[_ResultType] = []
         for param, value in result_dict.items():
-            if param.type == 'text':
-                if value.shape:
-                    res_list += [{param.name: str(val)} for val in value]
-                else:
-                    res_list += [{param.name: str(value)}]
-            elif param.type == 'numeric':
-                if value.shape:
-                    res_list += [{param.name: number} for number in value]
-                else:
-                    res_list += [{param.name: float(value)}]
-            elif param.type == 'complex':
+            if param.type in ('text', 'numeric', 'complex'):
                 if value.shape:
-                    res_list += [{param.name: number} for number in value]
+                    res_list.append(
+                        _ResultColumns(columns={param.name: value.ravel()}))
+                elif param.type == 'text':
+                    res_list.append({param.name: str(value)})
+                elif param.type == 'numeric':
+                    res_list.append({param.name: float(value)})
                 else:
-                    res_list += [{param.name: complex(value)}]
+                    res_list.append({param.name: complex(value)})
             else:
-                res_list += [{param.name: value}]
+                res_list.append({param.name: value})
 
         return res_list
 
@@ -1618,13 +2597,12 @@ class DataSet(Sized):
         writer_status = self._writer_status
         if len(self._results) > 0:
             try:
-
-                self.add_results(self._results)
+                self._add_result_blocks()
                 if writer_status.write_in_background:
                     log.debug(f"Succesfully enqueued result for write thread")
                 else:
                     log.debug(f'Successfully wrote result to disk')
-                self._results = []
+                    checkpoint_wal_if_due(self.conn)
             except Exception as e:
                 if writer_status.write_in_background:
                     log.warning(f"Could not enqueue result; {e}")
@@ -1639,6 +2617,17 @@ class DataSet(Sized):
 
 
 # public api
+def _connect_for_loading() -> ConnectionPlus:
+    """
+    Connect to the DB file specified in the config for loading a dataset.
+    If ``dataset.pooled_read_connections`` is enabled in the config a pooled
+    read-only connection is used, see :func:`.get_pooled_read_connection`.
+    """
+    if qcodes.config.dataset.pooled_read_connections:
+        return get_pooled_read_connection(get_DB_location())
+    return connect(get_DB_location())
+
+
 def load_by_id(run_id: int, conn: Optional[ConnectionPlus] = None) -> DataSet:
     """
     Load a dataset by run id
@@ -1660,12 +2649,44 @@ def load_by_id(run_id: int, conn: Optional[ConnectionPlus] = None) -> DataSet:
     if run_id is None:
         raise ValueError('run_id has to be a positive integer, not None.')
 
-    conn = conn or connect(get_DB_location())
+    conn = conn or _connect_for_loading()
 
     d = DataSet(conn=conn, run_id=run_id)
     return d
 
 
+def load_many(run_ids: Iterable[int],
+              conn: Optional[ConnectionPlus] = None) -> List[DataSet]:
+    """
+    Load many datasets by run id. The runs and their metadata are looked up
+    with a fixed number of queries per chunk of run ids rather than several
+    queries per run, which makes listing a large number of runs faster than
+    calling :func:`.load_by_id` for each of them.
+
+    If no connection is provided, lookup is performed in the database file that
+    is specified in the config.
+
+    Args:
+        run_ids: run ids of the datasets
+        conn: connection to the database to load from
+
+    Returns:
+        list of :class:`.DataSet` with the given run ids, in the same order
+    """
+    run_ids = list(run_ids)
+    conn = conn or _connect_for_loading()
+
+    run_rows = get_run_rows(conn, run_ids)
+    missing = [run_id for run_id in run_ids if run_id not in run_rows]
+    if missing:
+        raise ValueError(f"Runs with run_ids {missing} do not exist in the "
+                         f"database")
+    metadata = get_metadata_from_run_ids(conn, run_ids)
+    return [DataSet._from_run_row(conn, dict(run_rows[run_id]),
+                                  dict(metadata[run_id]))
+            for run_id in run_ids]
+
+
 def load_by_run_spec(*,
                      captured_run_id: Optional[int] = None,
                      captured_counter: Optional[int] = None,
@@ -1702,7 +2723,7 @@ def load_by_run_spec(*,
     Returns:
         :class:`.DataSet` matching the provided specification.
     """
-    conn = conn or connect(get_DB_location())
+    conn = conn or _connect_for_loading()
     guids = get_guids_from_run_spec(conn,
                                     captured_run_id=captured_run_id,
                                     captured_counter=captured_counter,
@@ -1742,7 +2763,7 @@ def load_by_guid(guid: str, conn: Optional[ConnectionPlus] = None) -> DataSet:
         NameError: if no run with the given GUID exists in the database
         RuntimeError: if several runs with the given GUID are found
     """
-    conn = conn or connect(get_DB_location())
+    conn = conn or _connect_for_loading()
 
     # this function raises a RuntimeError if more than one run matches the GUID
     run_id = get_runid_from_guid(conn, guid)
@@ -1773,7 +2794,7 @@ def load_by_counter(counter: int, exp_id: int,
     Returns:
         :class:`.DataSet` of the given counter in the given experiment
     """
-    conn = conn or connect(get_DB_location())
+    conn = conn or _connect_for_loading()
     sql = """
     SELECT run_id
     FROM
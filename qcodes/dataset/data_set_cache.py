@@ -6,7 +6,8 @@ import numpy as np
 
 from qcodes.dataset.descriptions.rundescriber import RunDescriber
 from qcodes.dataset.sqlite.queries import (
-    load_new_data_for_rundescriber, completed)
+    _load_new_data_for_rundescriber_by_rowid, load_new_data_for_rundescriber,
+    completed)
 from qcodes.dataset.sqlite.connection import ConnectionPlus
 
 if TYPE_CHECKING:
@@ -30,10 +31,13 @@ class DataSetCache:
     def __init__(self, dataset: 'DataSet'):
         self._dataset = dataset
         self._data: ParameterData = {}
-        #: number of rows read per parameter tree (by the name of the dependent parameter)
+        #: rowid of the last row read per parameter tree (by the name of the dependent parameter)
         self._read_status: Dict[str, int] = {}
         #: number of rows written per parameter tree (by the name of the dependent parameter)
         self._write_status: Dict[str, Optional[int]] = {}
+        #: backing buffers of the unshaped data per parameter tree. The
+        #: arrays in the cached data are views into these.
+        self._buffers: Dict[str, Dict[str, np.ndarray]] = {}
         self._loaded_from_completed_ds = False
 
     @property
@@ -58,13 +62,15 @@ class DataSetCache:
 
         (self._write_status,
          self._read_status,
-         self._data) = load_new_data_from_db_and_append(
+         self._data,
+         self._buffers) = _load_new_data_from_db_and_append(
             self._dataset.conn,
             self._dataset.table_name,
             self.rundescriber,
             self._write_status,
             self._read_status,
-            self._data
+            self._data,
+            self._buffers
         )
 
     def data(self) -> 'ParameterData':
@@ -144,6 +150,45 @@ def load_new_data_from_db_and_append(
     return updated_write_status, updated_read_status, merged_data
 
 
+def _load_new_data_from_db_and_append(
+            conn: ConnectionPlus,
+            table_name: str,
+            rundescriber: RunDescriber,
+            write_status: Dict[str, Optional[int]],
+            read_status: Dict[str, int],
+            existing_data: Mapping[str, Mapping[str, np.ndarray]],
+            buffers: Mapping[str, Mapping[str, np.ndarray]]
+    ) -> Tuple[Dict[str, Optional[int]],
+               Dict[str, int],
+               Dict[str, Dict[str, np.ndarray]],
+               Dict[str, Dict[str, np.ndarray]]]:
+    """
+    Like :func:`load_new_data_from_db_and_append` but ``read_status`` maps
+    the dependent parameter names to the rowid of the last row read and the
+    unshaped data is appended into the backing ``buffers`` of the existing
+    arrays.
+
+    Returns:
+        Updated write and read status, the updated ``data`` and the
+        updated backing buffers.
+    """
+    new_data, updated_read_status = _load_new_data_for_rundescriber_by_rowid(
+        conn, table_name, rundescriber, read_status
+    )
+
+    (updated_write_status,
+     merged_data,
+     updated_buffers) = _append_shaped_parameter_data_to_existing_arrays(
+        rundescriber,
+        write_status,
+        existing_data,
+        new_data,
+        buffers
+    )
+    return (updated_write_status, updated_read_status, merged_data,
+            updated_buffers)
+
+
 def append_shaped_parameter_data_to_existing_arrays(
         rundescriber: RunDescriber,
         write_status: Dict[str, Optional[int]],
@@ -168,9 +213,46 @@ def append_shaped_parameter_data_to_existing_arrays(
     Returns:
         Updated write and read status, and the updated ``data``
     """
+    (updated_write_status,
+     merged_data,
+     _) = _append_shaped_parameter_data_to_existing_arrays(
+        rundescriber,
+        write_status,
+        existing_data,
+        new_data
+    )
+    return updated_write_status, merged_data
+
+
+def _append_shaped_parameter_data_to_existing_arrays(
+        rundescriber: RunDescriber,
+        write_status: Dict[str, Optional[int]],
+        existing_data: Mapping[str, Mapping[str, np.ndarray]],
+        new_data: Mapping[str, Mapping[str, np.ndarray]],
+        buffers: Optional[Mapping[str, Mapping[str, np.ndarray]]] = None,
+) -> Tuple[Dict[str, Optional[int]],
+           Dict[str, Dict[str, np.ndarray]],
+           Dict[str, Dict[str, np.ndarray]]]:
+    """
+    Like :func:`append_shaped_parameter_data_to_existing_arrays` but the
+    unshaped data is appended into the unused rows of the backing buffers
+    of the existing arrays, see :func:`_append_to_buffer`.
+
+    Args:
+        buffers: Mapping from dependent parameter name to mapping from
+          parameter name to the backing buffers of the unshaped arrays in
+          ``existing_data``.
+
+    Returns:
+        Updated write status, the updated ``data`` and the updated backing
+        buffers.
+    """
     parameters = tuple(ps.name for ps in
                        rundescriber.interdeps.non_dependencies)
     merged_data = {}
+    merged_buffers = {}
+    if buffers is None:
+        buffers = {}
 
     updated_write_status = copy(write_status)
 
@@ -187,22 +269,30 @@ def append_shaped_parameter_data_to_existing_arrays(
             shape = None
 
         (merged_data[meas_parameter],
-         updated_write_status[meas_parameter]) = _merge_data(
+         updated_write_status[meas_parameter],
+         merged_buffers[meas_parameter]) = _merge_data(
             existing_data_1_tree,
             new_data_1_tree,
             shape,
-            single_tree_write_status=write_status.get(meas_parameter)
+            single_tree_write_status=write_status.get(meas_parameter),
+            buffers=buffers.get(meas_parameter, {})
         )
-    return updated_write_status, merged_data
+    return updated_write_status, merged_data, merged_buffers
 
 
 def _merge_data(existing_data: Mapping[str, np.ndarray],
                 new_data: Mapping[str, np.ndarray],
                 shape: Optional[Tuple[int, ...]],
-                single_tree_write_status: Optional[int]
-                ) -> Tuple[Dict[str, np.ndarray], Optional[int]]:
+                single_tree_write_status: Optional[int],
+                buffers: Optional[Mapping[str, np.ndarray]] = None
+                ) -> Tuple[Dict[str, np.ndarray],
+                           Optional[int],
+                           Dict[str, np.ndarray]]:
 
     subtree_merged_data = {}
+    subtree_merged_buffers = {}
+    if buffers is None:
+        buffers = {}
     subtree_parameters = set(existing_data.keys()) | set(new_data.keys())
     new_write_status: Optional[int] = None
     for subtree_param in subtree_parameters:
@@ -210,12 +300,16 @@ def _merge_data(existing_data: Mapping[str, np.ndarray],
         new_values = new_data.get(subtree_param)
         if existing_values is not None and new_values is not None:
             (subtree_merged_data[subtree_param],
-             new_write_status) = _insert_into_data_dict(
+             new_write_status,
+             buffer) = _insert_into_data_dict(
                 existing_values,
                 new_values,
                 single_tree_write_status,
-                shape=shape
+                shape=shape,
+                buffer=buffers.get(subtree_param)
             )
+            if buffer is not None:
+                subtree_merged_buffers[subtree_param] = buffer
         elif new_values is not None:
             (subtree_merged_data[subtree_param],
              new_write_status) = _create_new_data_dict(
@@ -225,8 +319,11 @@ def _merge_data(existing_data: Mapping[str, np.ndarray],
         elif existing_values is not None:
             subtree_merged_data[subtree_param] = existing_values
             new_write_status = single_tree_write_status
+            buffer = buffers.get(subtree_param)
+            if buffer is not None:
+                subtree_merged_buffers[subtree_param] = buffer
 
-    return subtree_merged_data, new_write_status
+    return subtree_merged_data, new_write_status, subtree_merged_buffers
 
 
 def _create_new_data_dict(new_values: np.ndarray,
@@ -249,10 +346,13 @@ def _insert_into_data_dict(
         existing_values: np.ndarray,
         new_values: np.ndarray,
         write_status: Optional[int],
-        shape: Optional[Tuple[int, ...]]
-) -> Tuple[np.ndarray, Optional[int]]:
+        shape: Optional[Tuple[int, ...]],
+        buffer: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, Optional[int], Optional[np.ndarray]]:
     if shape is None or write_status is None:
-        return np.append(existing_values, new_values, axis=0), None
+        values, buffer = _append_to_buffer(existing_values, new_values,
+                                           buffer)
+        return values, None, buffer
     else:
         if existing_values.dtype.kind in ('U', 'S'):
             # string type arrays may be too small for the new data
@@ -268,7 +368,70 @@ def _insert_into_data_dict(
                         f"be flattened into a 1D array")
             return (np.append(existing_values.flatten(),
                               new_values.flatten(), axis=0),
-                    new_write_status)
+                    new_write_status,
+                    None)
         else:
             existing_values.ravel()[write_status:new_write_status] = new_values.ravel()
-            return existing_values, new_write_status
+            return existing_values, new_write_status, None
+
+
+def _append_to_buffer(
+        existing_values: np.ndarray,
+        new_values: np.ndarray,
+        buffer: Optional[np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Append ``new_values`` to ``existing_values`` along the first axis.
+    ``existing_values`` is expected to be a view of the first rows of
+    ``buffer``. The new values are written into the unused rows of the
+    buffer such that the existing values are not copied. If the buffer is
+    too small, or its dtype can not hold the new values, a new buffer
+    with twice the capacity (and for strings twice the itemsize) is
+    allocated. This makes appending amortized O(len(new_values)).
+
+    Returns:
+        A view of the merged values and the buffer backing it.
+    """
+    if (existing_values.shape[1:] != new_values.shape[1:]
+            or existing_values.ndim == 0):
+        # let numpy deal with (or raise for) arrays that can not be
+        # stacked along the first axis
+        values = np.append(existing_values, new_values, axis=0)
+        return values, values
+
+    n_existing = existing_values.shape[0]
+    n_total = n_existing + new_values.shape[0]
+    if not _is_view_of_first_rows(existing_values, buffer):
+        buffer = None
+
+    dtype = np.result_type(existing_values, new_values)
+    if buffer is not None and buffer.dtype != dtype:
+        if buffer.dtype.kind == dtype.kind and dtype.kind in ('U', 'S'):
+            # widen strings geometrically too to avoid a copy of the
+            # buffer every time a slightly longer string is read
+            bytes_per_char = 4 if dtype.kind == 'U' else 1
+            n_chars = max(dtype.itemsize,
+                          2 * buffer.dtype.itemsize) // bytes_per_char
+            dtype = np.dtype(f'{dtype.kind}{n_chars}')
+        buffer = None
+    elif buffer is not None and buffer.shape[0] < n_total:
+        dtype = buffer.dtype
+        buffer = None
+
+    if buffer is None:
+        capacity = max(2 * n_total, 16)
+        buffer = np.empty((capacity,) + existing_values.shape[1:],
+                          dtype=dtype)
+        buffer[:n_existing] = existing_values
+    buffer[n_existing:n_total] = new_values
+    return buffer[:n_total], buffer
+
+
+def _is_view_of_first_rows(values: np.ndarray,
+                           buffer: Optional[np.ndarray]) -> bool:
+    return (buffer is not None
+            and values.base is buffer
+            and values.dtype == buffer.dtype
+            and values.shape[1:] == buffer.shape[1:]
+            and values.__array_interface__['data'][0]
+            == buffer.__array_interface__['data'][0])
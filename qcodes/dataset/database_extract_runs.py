@@ -1,10 +1,20 @@
+import logging
+import multiprocessing
 import os
-from typing import Optional, Union
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from queue import Empty
+from typing import (Any, Dict, Iterator, List, Optional, Sequence, Set,
+                    Tuple, Union)
 from warnings import warn
 
 import numpy as np
+from tqdm import tqdm
 
 from qcodes.dataset.data_set import DataSet
+from qcodes.dataset.descriptions.versioning import serialization as serial
 from qcodes.dataset.descriptions.versioning.converters import new_to_old
 from qcodes.dataset.linked_datasets.links import links_to_str
 from qcodes.dataset.sqlite.connection import ConnectionPlus, atomic
@@ -19,16 +29,31 @@ from qcodes.dataset.sqlite.queries import (add_meta_data, create_run,
 from qcodes.dataset.sqlite.query_helpers import (select_many_where,
                                                  sql_placeholder_string)
 
+log = logging.getLogger(__name__)
+
+# the schema name under which the source DB is attached to the target DB
+_SOURCE_SCHEMA = 'extract_source'
+# number of rows per executemany if the source DB can not be attached
+_COPY_BATCH_SIZE = 10000
+_EXP_ATTR_NAMES = ('name', 'sample_name', 'start_time', 'end_time',
+                   'format_string')
+
 
 def extract_runs_into_db(source_db_path: str,
                          target_db_path: str, *run_ids: int,
                          upgrade_source_db: bool = False,
-                         upgrade_target_db: bool = False) -> None:
+                         upgrade_target_db: bool = False,
+                         show_progress: bool = False) -> None:
     """
     Extract a selection of runs into another DB file. All runs must come from
     the same experiment. They will be added to an experiment with the same name
     and ``sample_name`` in the target db. If such an experiment does not exist, it
-    will be created.
+    will be created. All runs are inserted in a single transaction.
+
+    The source DB file is attached to the connection to the target DB such
+    that the results of each run are copied with a single
+    ``INSERT INTO ... SELECT`` statement inside of SQLite. If the source
+    DB can not be attached, the results are copied in batches instead.
 
     Args:
         source_db_path: Path to the source DB file
@@ -39,6 +64,7 @@ def extract_runs_into_db(source_db_path: str,
           not the newest, should it be upgraded?
         upgrade_target_db: If the target DB is found to be in a version that is
           not the newest, should it be upgraded?
+        show_progress: Whether to show a progress bar of the copied runs
     """
     # Check for versions
     (s_v, new_v) = get_db_version_and_newest_available_version(source_db_path)
@@ -79,26 +105,25 @@ def extract_runs_into_db(source_db_path: str,
     # Fetch the attributes of the runs' experiment
     # hopefully, this is enough to uniquely identify the experiment
 
-    exp_attr_names = ['name', 'sample_name', 'start_time', 'end_time',
-                      'format_string']
-
     exp_attr_vals = select_many_where(source_conn,
                                       'experiments',
-                                      *exp_attr_names,
+                                      *_EXP_ATTR_NAMES,
                                       where_column='exp_id',
                                       where_value=source_exp_ids[0])
 
-    exp_attrs = dict(zip(exp_attr_names, exp_attr_vals))
+    exp_attrs = dict(zip(_EXP_ATTR_NAMES, exp_attr_vals))
 
     # Massage the target DB file to accomodate the runs
     # (create new experiment if needed)
 
     target_conn = connect(target_db_path)
+    source_schema: Optional[str] = None
 
     # this function raises if the target DB file has several experiments
     # matching both the name and sample_name
 
     try:
+        source_schema = _attach_source_db(target_conn, source_db_path)
         with atomic(target_conn) as target_conn:
 
             target_exp_id = _create_exp_if_needed(target_conn,
@@ -109,16 +134,287 @@ def extract_runs_into_db(source_db_path: str,
                                                   exp_attrs['end_time'])
 
             # Finally insert the runs
-            for run_id in run_ids:
+            pbar = tqdm(run_ids, file=sys.stdout, disable=not show_progress)
+            pbar.set_description("Extracting runs")
+            for run_id in pbar:
                 _extract_single_dataset_into_db(DataSet(run_id=run_id,
                                                         conn=source_conn),
                                                 target_conn,
-                                                target_exp_id)
+                                                target_exp_id,
+                                                source_schema=source_schema)
     finally:
+        if source_schema is not None:
+            target_conn.execute(f"DETACH DATABASE {source_schema}")
         source_conn.close()
         target_conn.close()
 
 
+def _attach_source_db(target_conn: ConnectionPlus,
+                      source_db_path: str) -> Optional[str]:
+    """
+    Attach the source DB file to the connection to the target DB. Returns
+    the name of the schema of the source DB or None if it could not be
+    attached.
+    """
+    try:
+        target_conn.execute(f"ATTACH DATABASE ? AS {_SOURCE_SCHEMA}",
+                            (source_db_path,))
+    except sqlite3.OperationalError as e:
+        log.warning(f"Could not attach source DB {source_db_path} to the "
+                    f"target DB, falling back to copying the results in "
+                    f"batches: {e}")
+        return None
+    return _SOURCE_SCHEMA
+
+
+def merge_databases(sources: Sequence[str],
+                    target: str,
+                    workers: int = 1,
+                    chunk_rows: int = 10000,
+                    upgrade_source_dbs: bool = False,
+                    upgrade_target_db: bool = False,
+                    show_progress: bool = False) -> None:
+    """
+    Merge all completed runs of several DB files into one DB file. The
+    source DB files are read in parallel by up to ``workers`` processes
+    which stream the runs and their results to the calling process, which
+    is the only one writing to the target DB file. All runs are inserted in
+    a single transaction.
+
+    Runs are identified by their GUID. Runs that already exist in the
+    target DB, or in more than one source DB, are only inserted once. Just
+    like for :func:`extract_runs_into_db` the runs are added to
+    experiments with the same name and ``sample_name`` as in the source DB
+    file and keep their ``captured_run_id`` and ``captured_counter``.
+    Incomplete runs are skipped with a warning.
+
+    Args:
+        sources: Paths to the source DB files
+        target: Path to the target DB file. The target DB file will be
+          created if it does not exist.
+        workers: Number of processes reading the source DB files. If 1, the
+          source DB files are read one after the other in the calling
+          process.
+        chunk_rows: The number of results sent from the reading to the
+          writing process at a time
+        upgrade_source_dbs: If a source DB is found to be in a version that
+          is not the newest, should it be upgraded?
+        upgrade_target_db: If the target DB is found to be in a version that
+          is not the newest, should it be upgraded?
+        show_progress: Whether to show a progress bar of the merged source
+          DB files
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be a positive integer, got {workers}")
+
+    for source in sources:
+        (s_v, new_v) = get_db_version_and_newest_available_version(source)
+        if s_v < new_v and not upgrade_source_dbs:
+            warn(f'Source DB {source} version is {s_v}, but this function '
+                 f'needs it to be in version {new_v}. Run this function '
+                 'again with upgrade_source_dbs=True to auto-upgrade the '
+                 'source DB files.')
+            return
+
+    if os.path.exists(target):
+        (t_v, new_v) = get_db_version_and_newest_available_version(target)
+        if t_v < new_v and not upgrade_target_db:
+            warn(f'Target DB version is {t_v}, but this function needs it to '
+                 f'be in version {new_v}. Run this function again with '
+                 'upgrade_target_db=True to auto-upgrade the target DB file.')
+            return
+
+    target_conn = connect(target)
+    try:
+        with atomic(target_conn) as target_conn:
+            writer = _MergeWriter(target_conn)
+            pbar = tqdm(total=len(sources), file=sys.stdout,
+                        disable=not show_progress)
+            pbar.set_description("Merging databases")
+            if workers == 1:
+                for source in sources:
+                    for message in _read_runs_for_merge(
+                            source, writer.existing_guids, chunk_rows):
+                        writer.handle(message)
+                    pbar.update()
+            else:
+                _merge_in_parallel(sources, writer, workers, chunk_rows,
+                                   pbar)
+            pbar.close()
+    finally:
+        target_conn.close()
+
+
+def _merge_in_parallel(sources: Sequence[str], writer: '_MergeWriter',
+                       workers: int, chunk_rows: int, pbar: tqdm) -> None:
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        # bound the queue such that the readers can not get arbitrarily
+        # far ahead of the writer
+        queue = manager.Queue(maxsize=4 * workers)
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=context) as executor:
+            futures = [executor.submit(_merge_worker, source, queue,
+                                       writer.existing_guids, chunk_rows)
+                       for source in sources]
+            try:
+                n_done = 0
+                while n_done < len(sources):
+                    try:
+                        message = queue.get(timeout=1)
+                    except Empty:
+                        # a worker process that died can not report that it
+                        # is done, so re-raise its error instead of waiting
+                        for future in futures:
+                            if future.done():
+                                future.result()
+                        continue
+                    if message[0] == 'done':
+                        n_done += 1
+                        pbar.update()
+                    else:
+                        writer.handle(message)
+                for future in futures:
+                    # re-raise any exception raised while reading a source
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                # unblock the workers waiting for space in the queue such
+                # that the executor can shut down
+                manager.shutdown()
+                raise
+
+
+def _merge_worker(source: str, queue: Any, skip_guids: Set[str],
+                  chunk_rows: int) -> None:
+    try:
+        for message in _read_runs_for_merge(source, skip_guids, chunk_rows):
+            queue.put(message)
+    finally:
+        queue.put(('done', source))
+
+
+def _read_runs_for_merge(source: str, skip_guids: Set[str],
+                         chunk_rows: int) -> Iterator[Tuple[Any, ...]]:
+    """
+    Read the runs of a source DB for :func:`merge_databases`. Yields
+    messages of the form
+
+    - ``('run', source, guid, run_info, exp_attrs, column_names)`` before
+      the results of a run,
+    - ``('rows', source, guid, rows)`` for up to ``chunk_rows`` results of
+      the run and
+    - ``('end', source, guid)`` after the results of the run or
+    - ``('incomplete', source, guid, run_id)`` for runs that are skipped.
+    """
+    source_conn = connect(source)
+    # The results are read without the converters of ``connect`` such that
+    # they are copied byte for byte. Converting them would e.g. re-encode
+    # arrays with the array format of the target DB and turn NaN stored as
+    # 'nan' into a float that is inserted as NULL.
+    raw_conn = sqlite3.connect(source)
+    try:
+        cursor = source_conn.execute("SELECT run_id FROM runs ORDER BY run_id")
+        run_ids = [row[0] for row in cursor.fetchall()]
+        for run_id in run_ids:
+            dataset = DataSet(run_id=run_id, conn=source_conn)
+            guid = dataset.guid
+            if guid in skip_guids:
+                continue
+            if not dataset.completed:
+                yield ('incomplete', source, guid, run_id)
+                continue
+            exp_attr_vals = select_many_where(source_conn,
+                                              'experiments',
+                                              *_EXP_ATTR_NAMES,
+                                              where_column='exp_id',
+                                              where_value=dataset.exp_id)
+            exp_attrs = dict(zip(_EXP_ATTR_NAMES, exp_attr_vals))
+
+            data_cursor = raw_conn.cursor()
+            data_cursor.execute(f'SELECT * FROM "{dataset.table_name}" '
+                                f'ORDER BY id')
+            # the first column is "id"
+            column_names = [desc[0] for desc in data_cursor.description[1:]]
+            yield ('run', source, guid, _RunInfo.from_dataset(dataset),
+                   exp_attrs, column_names)
+            while True:
+                rows = data_cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield ('rows', source, guid, [row[1:] for row in rows])
+            yield ('end', source, guid)
+    finally:
+        raw_conn.close()
+        source_conn.close()
+
+
+class _MergeWriter:
+    """
+    Insert the runs read by :func:`_read_runs_for_merge` into the target DB.
+    Messages of different runs may be interleaved, so the state of the runs
+    being inserted is kept per source DB and GUID.
+    """
+
+    def __init__(self, target_conn: ConnectionPlus):
+        self._conn = target_conn
+        cursor = target_conn.execute("SELECT guid FROM runs")
+        self.existing_guids: Set[str] = {row[0] for row in cursor}
+        self._exp_ids: Dict[Tuple[Any, ...], int] = {}
+        # maps (source, guid) to the run_id and insert statement in the
+        # target DB or to None if the run is a duplicate
+        self._runs: Dict[Tuple[str, str], Optional[Tuple[int, str]]] = {}
+        self._run_infos: Dict[Tuple[str, str], _RunInfo] = {}
+
+    def handle(self, message: Tuple[Any, ...]) -> None:
+        kind, source, guid = message[:3]
+        key = (source, guid)
+        if kind == 'run':
+            self._start_run(key, *message[3:])
+            return
+        if kind == 'incomplete':
+            warn(f'Skipping the incomplete run with GUID {guid} and '
+                 f'run_id {message[3]} in {source}.')
+            return
+        run = self._runs[key]
+        if run is None:
+            if kind == 'end':
+                del self._runs[key]
+            return
+        target_run_id, insert_query = run
+        if kind == 'rows':
+            self._conn.cursor().executemany(insert_query, message[3])
+        elif kind == 'end':
+            _complete_run_from_info(self._conn, target_run_id,
+                                    self._run_infos.pop(key))
+            del self._runs[key]
+
+    def _start_run(self, key: Tuple[str, str], run_info: '_RunInfo',
+                   exp_attrs: Dict[str, Any], column_names: List[str]) -> None:
+        if get_runid_from_guid(self._conn, run_info.guid) != -1:
+            self._runs[key] = None
+            return
+        exp_key = tuple(exp_attrs[name] for name in _EXP_ATTR_NAMES)
+        if exp_key not in self._exp_ids:
+            self._exp_ids[exp_key] = _create_exp_if_needed(
+                self._conn,
+                exp_attrs['name'],
+                exp_attrs['sample_name'],
+                exp_attrs['format_string'],
+                exp_attrs['start_time'],
+                exp_attrs['end_time'])
+        target_run_id, target_table_name = _create_run_from_info(
+            self._conn, self._exp_ids[exp_key], run_info)
+        insert_query = f"""
+                       INSERT INTO "{target_table_name}"
+                       ({','.join(column_names)})
+                       values {sql_placeholder_string(len(column_names))}
+                       """
+        self._runs[key] = (target_run_id, insert_query)
+        self._run_infos[key] = run_info
+
+
 def _create_exp_if_needed(target_conn: ConnectionPlus,
                           exp_name: str,
                           sample_name: str,
@@ -158,7 +454,9 @@ def _create_exp_if_needed(target_conn: ConnectionPlus,
 
 def _extract_single_dataset_into_db(dataset: DataSet,
                                     target_conn: ConnectionPlus,
-                                    target_exp_id: int) -> None:
+                                    target_exp_id: int,
+                                    source_schema: Optional[str] = None
+                                    ) -> None:
     """
     NB: This function should only be called from within
     meth:`extract_runs_into_db`
@@ -173,6 +471,8 @@ def _extract_single_dataset_into_db(dataset: DataSet,
         target_conn: connection to the DB. Must be atomically guarded
         target_exp_id: The ``exp_id`` of the (target DB) experiment in which to
           insert the run
+        source_schema: The name under which the DB of the dataset is
+          attached to ``target_conn``, if it is
     """
 
     if not dataset.completed:
@@ -187,71 +487,151 @@ def _extract_single_dataset_into_db(dataset: DataSet,
     if run_id != -1:
         return
 
-    if dataset.parameters is not None:
-        param_names = dataset.parameters.split(',')
-    else:
-        param_names = []
+    run_info = _RunInfo.from_dataset(dataset)
+    target_run_id, target_table_name = _create_run_from_info(target_conn,
+                                                             target_exp_id,
+                                                             run_info)
+    _populate_results_table(source_conn,
+                            target_conn,
+                            dataset.table_name,
+                            target_table_name,
+                            source_schema=source_schema)
+    _complete_run_from_info(target_conn, target_run_id, run_info)
+
+
+@dataclass
+class _RunInfo:
+    """
+    Everything but the results needed to recreate a completed run in
+    another DB. This is sent from the processes reading the source DBs to
+    the process writing the target DB in :func:`merge_databases`.
+    """
+    name: str
+    guid: str
+    param_names: List[str]
+    run_description: str
+    metadata: Dict[str, Any]
+    snapshot_raw: Optional[str]
+    captured_run_id: int
+    captured_counter: int
+    parent_dataset_links: str
+    run_timestamp_raw: Optional[float]
+    completed_timestamp_raw: Optional[float]
+
+    @classmethod
+    def from_dataset(cls, dataset: DataSet) -> '_RunInfo':
+        if dataset.parameters is not None:
+            param_names = dataset.parameters.split(',')
+        else:
+            param_names = []
+        return cls(
+            name=dataset.name,
+            guid=dataset.guid,
+            param_names=param_names,
+            run_description=serial.to_json_for_storage(dataset.description),
+            metadata=dataset.metadata,
+            snapshot_raw=dataset.snapshot_raw,
+            captured_run_id=dataset.captured_run_id,
+            captured_counter=dataset.captured_counter,
+            parent_dataset_links=links_to_str(dataset.parent_dataset_links),
+            run_timestamp_raw=dataset.run_timestamp_raw,
+            completed_timestamp_raw=dataset.completed_timestamp_raw)
+
+
+def _create_run_from_info(target_conn: ConnectionPlus,
+                          target_exp_id: int,
+                          run_info: _RunInfo) -> Tuple[int, str]:
+    """
+    Create the run described by ``run_info`` in the target DB. Returns the
+    ``run_id`` and the name of the results table of the created run.
+    """
+    description = serial.from_json_to_current(run_info.run_description)
     parspecs_dict = {
-        p.name: p for p in new_to_old(dataset.description.interdeps).paramspecs
+        p.name: p for p in new_to_old(description.interdeps).paramspecs
     }
-    parspecs = [parspecs_dict[p] for p in param_names]
-
-    metadata = dataset.metadata
-    snapshot_raw = dataset.snapshot_raw
-    captured_run_id = dataset.captured_run_id
-    captured_counter = dataset.captured_counter
-    parent_dataset_links = links_to_str(dataset.parent_dataset_links)
+    parspecs = [parspecs_dict[p] for p in run_info.param_names]
 
     _, target_run_id, target_table_name = create_run(
             target_conn,
             target_exp_id,
-            name=dataset.name,
-            guid=dataset.guid,
+            name=run_info.name,
+            guid=run_info.guid,
             parameters=parspecs,
-            metadata=metadata,
-            captured_run_id=captured_run_id,
-            captured_counter=captured_counter,
-            parent_dataset_links=parent_dataset_links)
+            metadata=run_info.metadata,
+            captured_run_id=run_info.captured_run_id,
+            captured_counter=run_info.captured_counter,
+            parent_dataset_links=run_info.parent_dataset_links)
+    return target_run_id, target_table_name
 
-    _populate_results_table(source_conn,
-                            target_conn,
-                            dataset.table_name,
-                            target_table_name)
+
+def _complete_run_from_info(target_conn: ConnectionPlus,
+                            target_run_id: int,
+                            run_info: _RunInfo) -> None:
+    """
+    Mark a run created with :func:`_create_run_from_info` as completed once
+    its results have been inserted.
+    """
     mark_run_complete(target_conn, target_run_id)
     _rewrite_timestamps(target_conn,
                         target_run_id,
-                        dataset.run_timestamp_raw,
-                        dataset.completed_timestamp_raw)
+                        run_info.run_timestamp_raw,
+                        run_info.completed_timestamp_raw)
 
-    if snapshot_raw is not None:
-        add_meta_data(target_conn, target_run_id, {'snapshot': snapshot_raw})
+    if run_info.snapshot_raw is not None:
+        add_meta_data(target_conn, target_run_id,
+                      {'snapshot': run_info.snapshot_raw})
 
 
 def _populate_results_table(source_conn: ConnectionPlus,
                             target_conn: ConnectionPlus,
                             source_table_name: str,
-                            target_table_name: str) -> None:
+                            target_table_name: str,
+                            source_schema: Optional[str] = None) -> None:
     """
-    Copy over all the entries of the results table
+    Copy over all the entries of the results table. If the source DB is
+    attached to the target connection as ``source_schema`` the entries are
+    copied by SQLite in one statement, otherwise they are read from the
+    source and inserted into the target in batches.
     """
-    get_data_query = f"""
-                     SELECT *
-                     FROM "{source_table_name}"
-                     """
-
     source_cursor = source_conn.cursor()
+    source_cursor.execute(f'SELECT * FROM "{source_table_name}" LIMIT 0')
+    # the first column is "id"
+    column_names = ','.join(desc[0] for desc in source_cursor.description[1:])
+    if not column_names:
+        # a run without any parameters has no results to copy
+        return
+
     target_cursor = target_conn.cursor()
+    if source_schema is not None:
+        copy_data_query = f"""
+                          INSERT INTO "{target_table_name}"
+                          ({column_names})
+                          SELECT {column_names}
+                          FROM {source_schema}."{source_table_name}"
+                          ORDER BY id
+                          """
+        target_cursor.execute(copy_data_query)
+        return
 
-    for row in source_cursor.execute(get_data_query):
-        column_names = ','.join(row.keys()[1:])  # the first key is "id"
-        values = tuple(val for val in row[1:])
-        value_placeholders = sql_placeholder_string(len(values))
-        insert_data_query = f"""
-                             INSERT INTO "{target_table_name}"
-                             ({column_names})
-                             values {value_placeholders}
-                             """
-        target_cursor.execute(insert_data_query, values)
+    get_data_query = f"""
+                     SELECT {column_names}
+                     FROM "{source_table_name}"
+                     ORDER BY id
+                     """
+    value_placeholders = sql_placeholder_string(
+        len(source_cursor.description) - 1)
+    insert_data_query = f"""
+                         INSERT INTO "{target_table_name}"
+                         ({column_names})
+                         values {value_placeholders}
+                         """
+    source_cursor.execute(get_data_query)
+    while True:
+        rows = source_cursor.fetchmany(_COPY_BATCH_SIZE)
+        if not rows:
+            break
+        target_cursor.executemany(insert_data_query,
+                                  [tuple(row) for row in rows])
 
 
 def _rewrite_timestamps(target_conn: ConnectionPlus, target_run_id: int,
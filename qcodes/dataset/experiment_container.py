@@ -4,10 +4,10 @@ import logging
 
 import qcodes
 from qcodes.dataset.data_set import (DataSet, load_by_id, load_by_counter,
-                                     new_data_set, SPECS)
+                                     load_many, new_data_set, SPECS)
 from qcodes.dataset.sqlite.connection import transaction, ConnectionPlus
 from qcodes.dataset.sqlite.queries import new_experiment as ne, \
-    finish_experiment, get_run_counter, get_runs, get_last_run, \
+    finish_experiment, get_run_counter, get_last_run, \
     get_last_experiment, get_experiments, \
     get_experiment_name_from_experiment_id, get_runid_from_expid_and_counter, \
     get_sample_name_from_experiment_id
@@ -140,8 +140,11 @@ class Experiment(Sized):
 
     def data_sets(self) -> List[DataSet]:
         """Get all the datasets of this experiment"""
-        runs = get_runs(self.conn, self.exp_id)
-        return [load_by_id(run['run_id'], conn=self.conn) for run in runs]
+        cursor = transaction(self.conn,
+                             "SELECT run_id FROM runs WHERE exp_id = ?",
+                             self.exp_id)
+        run_ids = [row['run_id'] for row in cursor.fetchall()]
+        return load_many(run_ids, conn=self.conn)
 
     def last_data_set(self) -> DataSet:
         """Get the last dataset of this experiment"""
@@ -0,0 +1,302 @@
+"""
+Export of runs to NetCDF4/HDF5 files and loading of exported runs.
+
+The data is copied from the database one parameter tree at a time in chunks
+of a bounded number of results, such that runs that do not fit into memory
+can be exported. Every parameter tree is stored in a group named after the
+dependent parameter holding one dataset per parameter of the tree, with the
+results along the first axis. The run description, snapshot, metadata and
+the identifiers of the run are stored as attributes of the root group.
+
+Numeric and complex data are stored in contiguous (i.e. neither chunked nor
+compressed) datasets so that they can be memory-mapped when loading.
+
+NetCDF4 files are HDF5 files as well. For the 'netcdf' format every axis of
+the data is in addition registered as a dimension (scale) and complex data,
+which NetCDF4 has no type for, is stored as two datasets ``<name>_real`` and
+``<name>_imag`` such that the files can be opened with NetCDF4 readers.
+Complex data is read into memory rather than memory-mapped from these files.
+"""
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+import h5py
+import numpy as np
+
+from qcodes.dataset.descriptions.rundescriber import RunDescriber
+from qcodes.dataset.descriptions.versioning import serialization as serial
+from qcodes.dataset.sqlite.queries import (
+    _get_paramspecs_for_one_param_tree, _iter_parameter_tree_chunks,
+    get_number_of_results_in_param_tree)
+
+if TYPE_CHECKING:
+    from qcodes.dataset.data_set import DataSet
+
+EXPORT_FORMATS = ('netcdf', 'hdf5')
+_FILE_EXTENSIONS = {'netcdf': 'nc', 'hdf5': 'h5'}
+_COMPLEX_PARTS = ('real', 'imag')
+_EXPORT_VERSION = 1
+_STRING_DTYPE = h5py.special_dtype(vlen=str)
+_RUN_ATTRIBUTES = ('run_id', 'captured_run_id', 'captured_counter', 'guid',
+                   'name', 'exp_name', 'sample_name', 'run_timestamp_raw',
+                   'completed_timestamp_raw')
+
+
+def export_to_hdf5(dataset: 'DataSet',
+                   path: str,
+                   export_format: str = 'hdf5',
+                   chunk_rows: int = 100000) -> str:
+    """
+    Export a dataset to a NetCDF4 or HDF5 file. For the 'netcdf' format
+    every axis of the data is registered as a dimension and complex data is
+    split into its real and imaginary parts such that the file can be
+    opened with NetCDF4 readers, one group per parameter tree.
+
+    Args:
+        dataset: the dataset to export
+        path: path of the file to write. If this is an existing directory,
+            the file is written into it with a name made from the captured
+            run id and the GUID of the run.
+        export_format: either 'netcdf' or 'hdf5'
+        chunk_rows: the maximal number of results of a parameter tree read
+            from the database at a time
+
+    Returns:
+        The path of the written file
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {export_format!r}, "
+                         f"expected one of {EXPORT_FORMATS}")
+    if chunk_rows < 1:
+        raise ValueError(f"chunk_rows must be a positive integer, "
+                         f"got {chunk_rows}")
+    if os.path.isdir(path):
+        extension = _FILE_EXTENSIONS[export_format]
+        path = os.path.join(
+            path, f"qcodes_{dataset.captured_run_id}_{dataset.guid}.{extension}")
+
+    rundescriber = dataset.description
+    interdeps = rundescriber.interdeps
+    netcdf = export_format == 'netcdf'
+    # NetCDF4 readers expect the creation order of groups and datasets to
+    # be tracked
+    with h5py.File(path, 'w', track_order=netcdf) as file:
+        file.attrs['qcodes_export_version'] = _EXPORT_VERSION
+        file.attrs['export_format'] = export_format
+        for attribute in _RUN_ATTRIBUTES:
+            value = getattr(dataset, attribute)
+            if value is not None:
+                file.attrs[attribute] = value
+        file.attrs['run_description'] = serial.to_json_for_storage(
+            rundescriber)
+        if dataset.snapshot_raw is not None:
+            file.attrs['snapshot'] = dataset.snapshot_raw
+        file.attrs['metadata'] = json.dumps(dataset.metadata)
+
+        for paramspec in interdeps.non_dependencies:
+            output_param = paramspec.name
+            group = file.create_group(output_param)
+            n_rows = get_number_of_results_in_param_tree(
+                dataset.conn, dataset.table_name, output_param)
+            if n_rows == 0:
+                continue
+            paramspecs = _get_paramspecs_for_one_param_tree(interdeps,
+                                                            output_param)
+
+            # the number of results is counted once such that results that
+            # are added while exporting an ongoing run are left out. Those
+            # follow the counted results, so the chunks are cut off once
+            # the counted results have been written.
+            offset = 0
+            for chunk in _iter_parameter_tree_chunks(
+                    dataset.conn, dataset.table_name, rundescriber,
+                    output_param, chunk_rows):
+                n_chunk = min(len(chunk[output_param]), n_rows - offset)
+                for name, values in chunk.items():
+                    for dset_name, part in _split_data(name, values, netcdf):
+                        if offset == 0:
+                            _create_dataset(group, dset_name, part, n_rows,
+                                            chunk_rows)
+                        _write_chunk(group[dset_name], part[:n_chunk],
+                                     offset)
+                offset += n_chunk
+                if offset == n_rows:
+                    break
+
+            for ps in paramspecs:
+                for dset_name in _dataset_names(group, ps.name):
+                    dset = group[dset_name]
+                    dset.attrs.update(ps._to_dict().items())
+                    if netcdf:
+                        _attach_dimensions(group, dset, output_param)
+    return path
+
+
+def _split_data(name: str, values: np.ndarray, netcdf: bool
+                ) -> List[Tuple[str, np.ndarray]]:
+    """
+    The datasets to store the values of a parameter in: one dataset named
+    after the parameter, or for complex values in NetCDF4 files one for the
+    real and one for the imaginary part.
+    """
+    if netcdf and values.dtype.kind == 'c':
+        return [(f"{name}_{part}", getattr(values, part))
+                for part in _COMPLEX_PARTS]
+    return [(name, values)]
+
+
+def _dataset_names(group: h5py.Group, name: str) -> List[str]:
+    if name in group:
+        return [name]
+    return [f"{name}_{part}" for part in _COMPLEX_PARTS
+            if f"{name}_{part}" in group]
+
+
+def _attach_dimensions(group: h5py.Group, dset: h5py.Dataset,
+                       output_param: str) -> None:
+    """
+    Attach a dimension scale to every axis of the dataset. The axes are
+    shared by all datasets of the parameter tree, unless the datasets
+    differ in size along an axis other than the results axis.
+    """
+    for axis, size in enumerate(dset.shape):
+        if axis == 0:
+            dim_name = f"{output_param}_index"
+        else:
+            dim_name = f"{output_param}_dim_{axis}"
+            if dim_name in group and group[dim_name].shape != (size,):
+                dim_name = f"{dset.name.split('/')[-1]}_dim_{axis}"
+        if dim_name not in group:
+            _make_scale(group.create_dataset(dim_name, data=np.arange(size)))
+        dset.dims[axis].attach_scale(group[dim_name])
+
+
+def _make_scale(dset: h5py.Dataset) -> None:
+    # h5py < 2.9 has no Dataset.make_scale
+    if hasattr(dset, 'make_scale'):
+        dset.make_scale()
+    else:
+        h5py.h5ds.set_scale(dset.id)
+
+
+def _create_dataset(group: h5py.Group, name: str, values: np.ndarray,
+                    n_rows: int, chunk_rows: int) -> None:
+    shape = (n_rows,) + values.shape[1:]
+    if values.dtype.kind in 'US':
+        group.create_dataset(name, shape=shape, dtype=_STRING_DTYPE,
+                             chunks=(min(n_rows, chunk_rows),) + shape[1:])
+    elif values.dtype.kind in 'biufc':
+        group.create_dataset(name, shape=shape, dtype=values.dtype)
+    else:
+        raise ValueError(f"Can not export the data of {name}, it does not "
+                         f"form a regular array of numbers or strings.")
+
+
+def _write_chunk(dset: h5py.Dataset, values: np.ndarray, offset: int) -> None:
+    if values.shape[1:] != dset.shape[1:]:
+        raise ValueError(f"Can not export the data of {dset.name}, the "
+                         f"shape of the results varies from "
+                         f"{dset.shape[1:]} to {values.shape[1:]}.")
+    if values.dtype.kind in 'US':
+        values = values.astype(object)
+    dset[offset:offset + len(values)] = values
+
+
+class ExportedRun:
+    """
+    A run loaded from a file written by :func:`export_to_hdf5`. The
+    attributes mirror those of the exported
+    :class:`~qcodes.dataset.data_set.DataSet`.
+    """
+
+    def __init__(self, path: str, memory_map: bool = True):
+        self.path = path
+        self.memory_map = memory_map
+        with h5py.File(path, 'r') as file:
+            attrs = dict(file.attrs)
+            self._parameter_trees: List[str] = list(file.keys())
+
+        for attribute in _RUN_ATTRIBUTES:
+            value = attrs.get(attribute)
+            if isinstance(value, np.generic):
+                value = value.item()
+            setattr(self, attribute, value)
+        self.description: RunDescriber = serial.from_json_to_current(
+            attrs['run_description'])
+        self.snapshot_raw: Optional[str] = attrs.get('snapshot')
+        self.metadata: Dict[str, Any] = json.loads(attrs['metadata'])
+
+    @property
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Snapshot of the run as dictionary (or None)"""
+        if self.snapshot_raw is not None:
+            return json.loads(self.snapshot_raw)
+        return None
+
+    def get_parameter_data(self, *params: str
+                           ) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Get the data of the given parameter trees (all if none are given) in
+        the same structure as
+        :meth:`~qcodes.dataset.data_set.DataSet.get_parameter_data`.
+        Numeric data is memory-mapped from the file if ``memory_map`` was
+        set when loading, strings are always read into memory.
+        """
+        trees = params if params else self._parameter_trees
+        shapes = self.description.shapes or {}
+        output: Dict[str, Dict[str, np.ndarray]] = {}
+        with h5py.File(self.path, 'r') as file:
+            for tree in trees:
+                if tree not in self._parameter_trees:
+                    raise ValueError(f"Unknown parameter tree {tree}, "
+                                     f"expected one of "
+                                     f"{self._parameter_trees}")
+                output[tree] = {}
+                group = file[tree]
+                shape = shapes.get(tree)
+                for ps in _get_paramspecs_for_one_param_tree(
+                        self.description.interdeps, tree):
+                    if ps.name in group:
+                        values = self._read_dataset(group[ps.name])
+                    elif f"{ps.name}_real" in group:
+                        values = (group[f"{ps.name}_real"][()]
+                                  + 1j * group[f"{ps.name}_imag"][()])
+                    else:
+                        continue
+                    if (shape is not None
+                            and values.size == np.prod(shape)):
+                        values = values.reshape(shape)
+                    output[tree][ps.name] = values
+        return output
+
+    def _read_dataset(self, dset: h5py.Dataset) -> np.ndarray:
+        if dset.dtype.kind == 'O':
+            values = dset[()]
+            return np.array([value.decode('utf-8')
+                             if isinstance(value, bytes) else value
+                             for value in values.ravel()]
+                            ).reshape(values.shape)
+        offset = dset.id.get_offset()
+        if self.memory_map and offset is not None:
+            return np.memmap(self.path, mode='r', dtype=dset.dtype,
+                             offset=offset, shape=dset.shape)
+        return dset[()]
+
+
+def load_from_hdf5(path: Union[str, 'os.PathLike[str]'],
+                   memory_map: bool = True) -> ExportedRun:
+    """
+    Load a run exported with
+    :meth:`~qcodes.dataset.data_set.DataSet.export` to either NetCDF4 or
+    HDF5.
+
+    Args:
+        path: path of the exported file
+        memory_map: whether numeric data should be memory-mapped rather than
+            read into memory
+
+    Returns:
+        The exported run
+    """
+    return ExportedRun(os.fspath(path), memory_map=memory_map)
@@ -11,21 +11,23 @@ import logging
 import traceback as tb_module
 import warnings
 from copy import deepcopy
+from dataclasses import dataclass
 from inspect import signature
 from numbers import Number
 from time import perf_counter
 from types import TracebackType
-from typing import (Any, Callable, Dict, List, Mapping, MutableMapping,
-                    MutableSequence, Optional, Sequence, Tuple, Type, TypeVar,
-                    Union, cast)
+from typing import (Any, Callable, Dict, Iterable, List, Mapping,
+                    MutableMapping, MutableSequence, Optional, Sequence, Tuple,
+                    Type, TypeVar, Union, cast)
 
 import numpy as np
 
 import qcodes as qc
 import qcodes.utils.validators as vals
 from qcodes import Station
-from qcodes.dataset.data_set import (VALUE, DataSet, load_by_guid, res_type,
-                                     setpoints_type, values_type)
+from qcodes.dataset.data_set import (VALUE, DataSet, _ResultTrees,
+                                     load_by_guid, res_type, setpoints_type,
+                                     values_type)
 from qcodes.dataset.descriptions.dependencies import (DependencyError,
                                                       InferenceError,
                                                       InterDependencies_)
@@ -54,6 +56,22 @@ class ParameterTypeError(Exception):
     pass
 
 
+@dataclass
+class _ResultPlan:
+    """
+    The work of :meth:`DataSaver.add_result` that only depends on the
+    parameters of a result and not on their values, done and validated
+    once for a sequence of parameters. Results of parameters that have to
+    be unpacked (array, multi and parameters with setpoints) have no plan.
+    """
+    paramspecs: Tuple[ParamSpecBase, ...]
+    # positions and parameters that have an Arrays validator
+    array_parameters: Tuple[Tuple[int, _BaseParameter], ...]
+    # whether any of the parameters has setpoints to check the shapes of
+    has_setpoints: bool
+    trees: _ResultTrees
+
+
 class DataSaver:
     """
     The class used by the :class:`Runner` context manager to handle the
@@ -93,6 +111,9 @@ class DataSaver:
         self._results: List[Dict[str, VALUE]] = []
         self._last_save_time = perf_counter()
         self._known_dependencies: Dict[str, List[str]] = {}
+        self._result_plan_key: Optional[Tuple[Union[_BaseParameter, str],
+                                              ...]] = None
+        self._result_plan: Optional[_ResultPlan] = None
         self.parent_datasets: List[DataSet] = []
 
         for link in self._dataset.parent_dataset_links:
@@ -128,7 +149,145 @@ class DataSaver:
             ParameterTypeError: If a parameter is given a value not matching
                 its type.
         """
+        # Consecutive results are usually added for the same parameters.
+        # The parameters are then resolved and validated once, see
+        # _compile_result_plan, until the parameters change.
+        key = tuple(partial_result[0] for partial_result in res_tuple)
+        if key != self._result_plan_key:
+            self._result_plan = self._compile_result_plan(key)
+            self._result_plan_key = key
+
+        if self._result_plan is not None:
+            self._add_result_with_plan(self._result_plan, res_tuple)
+        else:
+            self._add_result_without_plan(res_tuple)
+
+        if perf_counter() - self._last_save_time > self.write_period:
+            self.flush_data_to_database()
+            self._last_save_time = perf_counter()
+
+    def add_results_block(
+            self,
+            block: Mapping[Union[_BaseParameter, str], values_type]) -> None:
+        """
+        Add a block of results collected beforehand, e.g. the buffer of a
+        hardware sweep, with one call instead of one call to
+        :meth:`add_result` per point. The block is validated once and the
+        values are handed to the dataset column wise.
+
+            >>> datasaver.add_results_block({v1: v1_sweep, c1: c1_buffer})
+
+        The values of the parameters of a parameter tree must be arrays of
+        the same shape with one value per point, except that setpoints and
+        inferred parameters can be scalars, which are then used for every
+        point. Only 'numeric', 'text' and 'complex' parameters are
+        supported; results of 'array' parameters, which are arrays for every
+        point, have to be added with :meth:`add_result`.
+
+        Args:
+            block: mapping from the parameters, or their names, to their
+                values at all points of the block
+
+        Raises:
+            ValueError: If a parameter is not registered in the parent
+                Measurement object or is of 'array' type.
+            ValueError: If required parameters are missing or the shapes of
+                the values of a parameter tree do not match.
+            ValueError: If a parameter is given values not matching its
+                type.
+        """
+        results_dict: Dict[ParamSpecBase, np.ndarray] = {}
+        for parameter, values in block.items():
+            try:
+                paramspec = self._interdeps._id_to_paramspec[str(parameter)]
+            except KeyError:
+                raise ValueError('Can not add result for parameter '
+                                 f'{parameter}, no such parameter registered '
+                                 'with this measurement.')
+            if paramspec.type == 'array':
+                raise ValueError(f"Can not add a block of results for "
+                                 f"parameter {paramspec.name} of type "
+                                 f"'array', use add_result instead.")
+            results_dict[paramspec] = np.asarray(values)
+
+        self._validate_result_deps(results_dict)
+        self._validate_result_types(results_dict)
+        trees = self.dataset._get_result_trees(results_dict)
+        for toplevel_param, inff_params, deps_params in trees.dependents:
+            required_shape = results_dict[toplevel_param].shape
+            for param in deps_params.union(inff_params):
+                shape = results_dict[param].shape
+                if shape not in [(), required_shape]:
+                    raise ValueError(f'Incompatible shapes. Parameter '
+                                     f"{toplevel_param.name} has shape "
+                                     f"{required_shape}, but "
+                                     f"{param.name} has shape {shape}.")
+
+        self.dataset._enqueue_results(results_dict, trees)
+
+        if perf_counter() - self._last_save_time > self.write_period:
+            self.flush_data_to_database()
+            self._last_save_time = perf_counter()
+
+    def _compile_result_plan(
+            self, parameters: Sequence[Union[_BaseParameter, str]]
+    ) -> Optional[_ResultPlan]:
+        """
+        Make the plan for adding results of the given parameters, or return
+        None if the results have to be unpacked. Raises the errors of
+        ``add_result`` for unknown parameters and missing dependencies.
+        """
+        paramspecs = []
+        array_parameters = []
+        for index, parameter in enumerate(parameters):
+            if isinstance(parameter, (ArrayParameter, MultiParameter,
+                                      ParameterWithSetpoints)):
+                return None
+            if (isinstance(parameter, _BaseParameter)
+                    and isinstance(parameter.vals, vals.Arrays)):
+                array_parameters.append((index, parameter))
+            try:
+                paramspec = self._interdeps._id_to_paramspec[str(parameter)]
+            except KeyError:
+                raise ValueError('Can not add result for parameter '
+                                 f'{parameter}, no such parameter registered '
+                                 'with this measurement.')
+            paramspecs.append(paramspec)
+
+        if len(set(paramspecs)) != len(paramspecs):
+            # the same parameter is given more than once, the last value wins
+            return None
+
+        self._validate_result_deps(paramspecs)
+        has_setpoints = any(paramspec in self._interdeps.dependencies
+                            for paramspec in paramspecs)
+        return _ResultPlan(
+            paramspecs=tuple(paramspecs),
+            array_parameters=tuple(array_parameters),
+            has_setpoints=has_setpoints,
+            trees=self.dataset._get_result_trees(paramspecs))
+
+    def _add_result_with_plan(self, plan: _ResultPlan,
+                              res_tuple: Sequence[res_type]) -> None:
+        for index, parameter in plan.array_parameters:
+            self._validate_array_parameter_data(parameter,
+                                                res_tuple[index][1])
 
+        results_dict: Dict[ParamSpecBase, np.ndarray] = {}
+        scalar = True
+        for paramspec, partial_result in zip(plan.paramspecs, res_tuple):
+            value = np.array(partial_result[1])
+            scalar = scalar and value.ndim == 0
+            results_dict[paramspec] = value
+
+        # scalar values always have compatible shapes
+        if plan.has_setpoints and not scalar:
+            self._validate_result_shapes(results_dict)
+        self._validate_result_types(results_dict)
+
+        self.dataset._enqueue_results(results_dict, plan.trees)
+
+    def _add_result_without_plan(self, res_tuple: Sequence[res_type]) -> None:
         # we iterate through the input twice. First we find any array and
         # multiparameters that need to be unbundled and collect the names
         # of all parameters. This also allows users to call
@@ -146,17 +305,7 @@ class DataSaver:
 
             if (isinstance(parameter, _BaseParameter) and
                     isinstance(parameter.vals, vals.Arrays)):
-                if not isinstance(data, np.ndarray):
-                    raise TypeError(
-                        f"Expected data for Parameter with Array validator "
-                        f"to be a numpy array but got: {type(data)}")
-
-                if (parameter.vals.shape is not None
-                        and data.shape != parameter.vals.shape):
-                    raise TypeError(
-                        f"Expected data with shape {parameter.vals.shape}, "
-                        f"but got {data.shape} for parameter: {parameter.full_name}"
-                    )
+                self._validate_array_parameter_data(parameter, data)
 
             if isinstance(parameter, ArrayParameter):
                 results_dict.update(
@@ -181,9 +330,25 @@ class DataSaver:
 
         self.dataset._enqueue_results(results_dict)
 
-        if perf_counter() - self._last_save_time > self.write_period:
-            self.flush_data_to_database()
-            self._last_save_time = perf_counter()
+    @staticmethod
+    def _validate_array_parameter_data(parameter: _BaseParameter,
+                                       data: values_type) -> None:
+        """
+        Validate that the data of a parameter with an Arrays validator is a
+        numpy array of the shape of the validator
+        """
+        validator = cast(vals.Arrays, parameter.vals)
+        if not isinstance(data, np.ndarray):
+            raise TypeError(
+                f"Expected data for Parameter with Array validator "
+                f"to be a numpy array but got: {type(data)}")
+
+        if (validator.shape is not None
+                and data.shape != validator.shape):
+            raise TypeError(
+                f"Expected data with shape {validator.shape}, "
+                f"but got {data.shape} for parameter: {parameter.full_name}"
+            )
 
     def _conditionally_expand_parameter_with_setpoints(
             self, data: values_type, parameter: ParameterWithSetpoints,
@@ -350,14 +515,14 @@ class DataSaver:
         return result_dict
 
     def _validate_result_deps(
-            self, results_dict: Mapping[ParamSpecBase, values_type]) -> None:
+            self, parameters: Iterable[ParamSpecBase]) -> None:
         """
-        Validate that the dependencies of the ``results_dict`` are met,
-        meaning that (some) values for all required setpoints and inferences
-        are present
+        Validate that the dependencies of the parameters of a result (e.g.
+        the keys of a results dict) are met, meaning that (some) values for
+        all required setpoints and inferences are present
         """
         try:
-            self._interdeps.validate_subset(list(results_dict.keys()))
+            self._interdeps.validate_subset(list(parameters))
         except (DependencyError, InferenceError) as err:
             raise ValueError('Can not add result, some required parameters '
                              'are missing.') from err
@@ -449,7 +614,7 @@ class Runner:
             subscribers: Optional[Sequence[SubscriberType]] = None,
             parent_datasets: Sequence[Dict[Any, Any]] = (),
             extra_log_info: str = '',
-            write_in_background: bool = False,
+            write_in_background: Union[bool, str] = False,
             shapes: Optional[Shapes] = None) -> None:
 
         self.write_period = self._calculate_write_period(write_in_background,
@@ -473,7 +638,7 @@ class Runner:
 
     @staticmethod
     def _calculate_write_period(
-            write_in_background: bool,
+            write_in_background: Union[bool, str],
             write_period: Optional[float]
     ) -> float:
         write_period_changed_from_default = (
@@ -1102,7 +1267,8 @@ class Measurement:
                                              shapes=shapes)
         self._shapes = shapes
 
-    def run(self, write_in_background: Optional[bool] = None) -> Runner:
+    def run(self,
+            write_in_background: Optional[Union[bool, str]] = None) -> Runner:
         """
         Returns the context manager for the experimental run
 
@@ -1111,6 +1277,13 @@ class Measurement:
                 within the context manager with ``DataSaver.add_result``
                 will be stored in background, without blocking the
                 main thread that is executing the context manager.
+                If "process", the results are written by a separate
+                process such that writing does not compete for the GIL
+                with the measurement. Errors raised while writing are
+                logged and reraised when the run ends. As the writer
+                process is started with the ``spawn`` method of
+                :mod:`multiprocessing`, scripts using this must guard their
+                entry point with ``if __name__ == "__main__":``.
                 By default the setting for write in background will be
                 read from the ``qcodesrc.json`` config file.
         """
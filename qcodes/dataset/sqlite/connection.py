@@ -6,7 +6,7 @@ performing nested atomic transactions on an SQLite database.
 import logging
 import sqlite3
 from contextlib import contextmanager
-from typing import Union, Any, Iterator
+from typing import Union, Any, Dict, Iterator, Optional, Tuple
 
 import wrapt
 
@@ -29,9 +29,19 @@ class ConnectionPlus(wrapt.ObjectProxy):
             currently in the middle of an atomic block of transactions, thus
             allowing to nest `atomic` context managers
         path_to_dbfile: Path to the database file of the connection.
+        insert_statement_cache: Cache of the SQL text of insert statements
+            by table name, columns and number of rows inserted.
+        last_wal_checkpoint: The (monotonic) time of the last explicit WAL
+            checkpoint made through this connection, if any.
+        has_run_metadata_table: Whether the database stores metadata in the
+            run_metadata table (version 11 and later). None until it is
+            first looked up.
     """
     atomic_in_progress: bool = False
     path_to_dbfile = ''
+    insert_statement_cache: Dict[Tuple[str, Tuple[str, ...], int], str] = {}
+    last_wal_checkpoint: Optional[float] = None
+    has_run_metadata_table: Optional[bool] = None
 
     def __init__(self, sqlite3_connection: sqlite3.Connection):
         super().__init__(sqlite3_connection)
@@ -41,6 +51,7 @@ class ConnectionPlus(wrapt.ObjectProxy):
                              '`ConnectionPlus` object which is not allowed.')
 
         self.path_to_dbfile = path_to_dbfile(sqlite3_connection)
+        self.insert_statement_cache = {}
 
 
 def make_connection_plus_from(conn: Union[sqlite3.Connection, ConnectionPlus]
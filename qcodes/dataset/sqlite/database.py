@@ -3,16 +3,37 @@ This module provides means of connecting to a QCoDeS database file and
 initialising it. Note that connecting/initialisation take into account
 database version and possibly perform database upgrades.
 """
+import atexit
 import io
+import os
+import pathlib
 import sqlite3
+import struct
 import sys
+import threading
+import time
+import warnings
+import zlib
 from contextlib import contextmanager
+from functools import lru_cache, partial
 from os.path import expanduser, normpath
-from typing import Union, Iterator, Tuple, Optional
+from typing import Any, Callable, Dict, Union, Iterator, Tuple, Optional
 
 import numpy as np
 from numpy import ndarray
 
+_HAS_ZSTANDARD = True
+try:
+    import zstandard
+except ImportError:
+    _HAS_ZSTANDARD = False
+
+_HAS_LZ4 = True
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    _HAS_LZ4 = False
+
 from qcodes.dataset.sqlite.connection import ConnectionPlus
 from qcodes.dataset.sqlite.db_upgrades import (
     _latest_available_version,
@@ -25,7 +46,6 @@ from qcodes.utils.types import (
     numpy_ints, numpy_floats, complex_types, complex_type_union
 )
 
-
 # utility function to allow sqlite/numpy type
 def _adapt_array(arr: ndarray) -> sqlite3.Binary:
     """
@@ -38,16 +58,196 @@ def _adapt_array(arr: ndarray) -> sqlite3.Binary:
     return sqlite3.Binary(out.read())
 
 
+# The binary array format consists of a small fixed header followed by the
+# variable length dtype string and shape and then the array data in C
+# order:
+#   magic (4 bytes), format version (uint8), codec (uint8),
+#   length of dtype string (uint8), ndim (uint8),
+#   dtype string (ascii, e.g. '<f8'), shape (ndim x little endian uint64)
+# The codec identifies how the array data is compressed, see
+# _ARRAY_CODECS. A codec of 0 means that the data is stored uncompressed.
+_BINARY_ARRAY_MAGIC = b'QCAR'
+_BINARY_ARRAY_VERSION = 1
+_BINARY_ARRAY_HEADER = struct.Struct('<4sBBBB')
+_NPY_MAGIC_PREFIX = b'\x93NUMPY'
+
+# name: codec id as stored in the header. The ids must never change since
+# they are written to the database.
+_ARRAY_CODECS: Dict[str, int] = {
+    'none': 0,
+    'zlib': 1,
+    'zstd': 2,
+    'lz4': 3,
+}
+
+# codec id: whether the codec can be used in this environment. zlib is part
+# of the standard library and hence always available.
+_ARRAY_CODECS_AVAILABLE: Dict[int, bool] = {
+    0: True,
+    1: True,
+    2: _HAS_ZSTANDARD,
+    3: _HAS_LZ4,
+}
+
+
+def _compress(data: bytes, codec: int) -> bytes:
+    # Fast compression levels are used since the ratio achieved on noisy
+    # measurement data hardly improves with higher levels.
+    if codec == 1:
+        return zlib.compress(data, 1)
+    if codec == 2:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == 3:
+        return lz4_frame.compress(data)
+    return data
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == 1:
+        return zlib.decompress(data)
+    if codec == 2:
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 3:
+        return lz4_frame.decompress(data)
+    return data
+
+
+def _adapt_array_binary(arr: ndarray, codec: int = 0) -> sqlite3.Binary:
+    """
+    Adapt a numpy array to the compact QCoDeS binary array format,
+    optionally compressing the array data with the given codec. Arrays
+    that cannot be represented by a plain dtype string (object and
+    structured arrays) are stored in the ``.npy`` format instead.
+    """
+    dtype = arr.dtype
+    if dtype.hasobject or dtype.names is not None:
+        return _adapt_array(arr)
+    dtype_str = dtype.str.encode('ascii')
+    header = (_BINARY_ARRAY_HEADER.pack(_BINARY_ARRAY_MAGIC,
+                                        _BINARY_ARRAY_VERSION,
+                                        codec,
+                                        len(dtype_str),
+                                        arr.ndim)
+              + dtype_str
+              + struct.pack(f'<{arr.ndim}Q', *arr.shape))
+    return sqlite3.Binary(header + _compress(arr.tobytes(), codec))
+
+
+@lru_cache(maxsize=256)
+def _parse_binary_array_header(header: bytes) -> Tuple["np.dtype[Any]",
+                                                       Tuple[int, ...]]:
+    _, version, codec, dtype_len, ndim = _BINARY_ARRAY_HEADER.unpack_from(
+        header)
+    if (version != _BINARY_ARRAY_VERSION
+            or not _ARRAY_CODECS_AVAILABLE.get(codec, False)):
+        raise RuntimeError(f'Cannot read array stored with binary format '
+                           f'version {version} and codec {codec}. Please '
+                           f'upgrade QCoDeS or install the package '
+                           f'providing the codec.')
+    offset = _BINARY_ARRAY_HEADER.size
+    dtype = np.dtype(header[offset:offset + dtype_len].decode('ascii'))
+    shape = struct.unpack_from(f'<{ndim}Q', header, offset + dtype_len)
+    return dtype, shape
+
+
+@lru_cache(maxsize=256)
+def _parse_npy_header(header: bytes) -> Tuple["np.dtype[Any]",
+                                              Tuple[int, ...], bool]:
+    out = io.BytesIO(header)
+    version = np.lib.format.read_magic(out)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(out)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(out)
+    return dtype, shape, fortran_order
+
+
+def _array_from_buffer(text: bytes, dtype: "np.dtype[Any]",
+                       shape: Tuple[int, ...], offset: int,
+                       fortran_order: bool = False) -> ndarray:
+    """
+    Wrap the array data in ``text`` starting at ``offset`` without copying.
+    Note that the returned array is read-only since it is backed by
+    ``text``.
+    """
+    if dtype.itemsize == 0:
+        return np.zeros(shape, dtype=dtype)
+    array = np.frombuffer(text, dtype=dtype, offset=offset)
+    if fortran_order:
+        return array.reshape(shape, order='F')
+    return array.reshape(shape)
+
+
 def _convert_array(text: bytes) -> ndarray:
+    """
+    Convert a blob from an 'array' column to a numpy array. Both the
+    binary array format and the ``.npy`` format are supported. The headers
+    of a run typically repeat from row to row, so parsing them is cached
+    and the array data is wrapped with ``np.frombuffer``.
+    """
+    if text[:len(_BINARY_ARRAY_MAGIC)] == _BINARY_ARRAY_MAGIC:
+        dtype_len, ndim = text[6], text[7]
+        header_len = _BINARY_ARRAY_HEADER.size + dtype_len + 8 * ndim
+        dtype, shape = _parse_binary_array_header(bytes(text[:header_len]))
+        codec = text[5]
+        if codec != 0:
+            return _array_from_buffer(
+                _decompress(text[header_len:], codec), dtype, shape, 0)
+        return _array_from_buffer(text, dtype, shape, header_len)
+
+    if text[:len(_NPY_MAGIC_PREFIX)] == _NPY_MAGIC_PREFIX and text[6] in (1, 2):
+        if text[6] == 1:
+            header_len = 10 + struct.unpack_from('<H', text, 8)[0]
+        else:
+            header_len = 12 + struct.unpack_from('<I', text, 8)[0]
+        dtype, shape, fortran_order = _parse_npy_header(
+            bytes(text[:header_len]))
+        if not dtype.hasobject:
+            return _array_from_buffer(text, dtype, shape, header_len,
+                                      fortran_order=fortran_order)
+
     out = io.BytesIO(text)
     out.seek(0)
     return np.load(out)
 
 
 def _convert_complex(text: bytes) -> complex_type_union:
-    out = io.BytesIO(text)
-    out.seek(0)
-    return np.load(out)[0]
+    return _convert_array(text)[0]
+
+
+_ARRAY_ADAPTERS: Dict[str, Callable[[ndarray], sqlite3.Binary]] = {
+    'npy': _adapt_array,
+    'binary': _adapt_array_binary,
+}
+
+
+def _get_array_adapter() -> Callable[[ndarray], sqlite3.Binary]:
+    """
+    Return the adapter used to write 'array' columns as configured by
+    ``dataset.array_format`` and ``dataset.array_compression`` in the
+    ``qcodesrc.json`` config file. Compressed arrays are always written in
+    the binary array format. If the requested codec is not installed,
+    zlib is used instead.
+    """
+    compression = qcodes.config["dataset"]["array_compression"]
+    if compression != "none":
+        try:
+            codec = _ARRAY_CODECS[compression]
+        except KeyError:
+            raise RuntimeError(f"Invalid array_compression {compression}. "
+                               f"Valid codecs are {list(_ARRAY_CODECS)}")
+        if not _ARRAY_CODECS_AVAILABLE[codec]:
+            warnings.warn(f"Array compression codec {compression} is not "
+                          f"available, falling back to zlib.")
+            codec = _ARRAY_CODECS['zlib']
+        return partial(_adapt_array_binary, codec=codec)
+
+    array_format = qcodes.config["dataset"]["array_format"]
+    try:
+        return _ARRAY_ADAPTERS[array_format]
+    except KeyError:
+        raise RuntimeError(f"Invalid array_format {array_format}. Valid "
+                           f"formats are {list(_ARRAY_ADAPTERS)}")
 
 
 this_session_default_encoding = sys.getdefaultencoding()
@@ -130,13 +330,7 @@ def connect(name: str, debug: bool = False,
             `ConnectionPlus`, not `sqlite3.Connection`
 
     """
-    # register numpy->binary(TEXT) adapter
-    # the typing here is ignored due to what we think is a flaw in typeshed
-    # see https://github.com/python/typeshed/issues/2429
-    sqlite3.register_adapter(np.ndarray, _adapt_array)
-    # register binary(TEXT) -> numpy converter
-    # for some reasons mypy complains about this
-    sqlite3.register_converter("array", _convert_array)
+    _register_adapters_and_converters()
 
     sqlite3_conn = sqlite3.connect(name, detect_types=sqlite3.PARSE_DECLTYPES,
                                    check_same_thread=True)
@@ -153,6 +347,52 @@ def connect(name: str, debug: bool = False,
     # sqlite3 options
     conn.row_factory = sqlite3.Row
 
+    if debug:
+        conn.set_trace_callback(print)
+
+    # this must happen before the tables of a new DB file are created for
+    # the page size of the profile to take effect
+    apply_sqlite_profile(conn)
+
+    # A DB that is already in the requested version has all tables. Version
+    # 0 is also the version of a new (empty) file so it is always
+    # initialised.
+    target_version = latest_supported_version if version == -1 else version
+    if db_version == 0 or db_version < target_version:
+        init_db(conn)
+        perform_db_upgrade(conn, version=version)
+    return conn
+
+
+# the array format and compression the registered array adapter writes
+_registered_array_adapter_config: Optional[Tuple[str, str]] = None
+
+
+def _register_adapters_and_converters() -> None:
+    """
+    Register the numpy/sqlite type adapters and converters that we need.
+    The registrations are global to the process so they are only made
+    once, except for the array adapter which is registered again if the
+    array format or compression in the config has changed.
+    """
+    global _registered_array_adapter_config
+    array_adapter_config = (qcodes.config["dataset"]["array_format"],
+                            qcodes.config["dataset"]["array_compression"])
+    if array_adapter_config != _registered_array_adapter_config:
+        # register numpy->binary(TEXT) adapter
+        # the typing here is ignored due to what we think is a flaw in
+        # typeshed see https://github.com/python/typeshed/issues/2429
+        sqlite3.register_adapter(np.ndarray, _get_array_adapter())
+        _registered_array_adapter_config = array_adapter_config
+    _register_static_adapters_and_converters()
+
+
+@lru_cache(maxsize=None)
+def _register_static_adapters_and_converters() -> None:
+    # register binary(TEXT) -> numpy converter
+    # for some reasons mypy complains about this
+    sqlite3.register_converter("array", _convert_array)
+
     # Make sure numpy ints and floats types are inserted properly
     for numpy_int in numpy_ints:
         sqlite3.register_adapter(numpy_int, int)
@@ -166,14 +406,244 @@ def connect(name: str, debug: bool = False,
         sqlite3.register_adapter(complex_type, _adapt_complex)
     sqlite3.register_converter("complex", _convert_complex)
 
+
+class _ReadConnectionPool(threading.local):
+    """
+    The pooled read-only connections of a thread by path of the DB file,
+    together with the device and inode of the file they were opened to.
+    """
+
+    def __init__(self) -> None:
+        self.connections: Dict[str, Tuple[Tuple[int, int],
+                                          '_PooledConnectionPlus']] = {}
+
+
+_read_connection_pool = _ReadConnectionPool()
+
+
+class _PooledConnectionPlus(ConnectionPlus):
+    """
+    A pooled read-only connection. It is shared by all datasets loaded from
+    the same DB file in the same thread, so closing it through one of them
+    only releases it back to the pool rather than closing it for all. Use
+    :func:`close_pooled_read_connections` to close it.
+    """
+
+    def close(self) -> None:
+        pass
+
+    def _close_pooled(self) -> None:
+        self.__wrapped__.close()
+
+
+def _file_id(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+
+def get_pooled_read_connection(path_to_db: str) -> ConnectionPlus:
+    """
+    Get a read-only connection to a DB file from a pool of connections. The
+    pool holds one connection per DB file and thread such that repeated
+    loading of datasets does not need to open a new connection and
+    initialise and upgrade the DB every time. Like any other SQLite
+    connection, a pooled connection can only be used in the thread that
+    opened it. The DB is only initialised or upgraded when a pooled
+    connection is opened to a DB file that is not in the latest version.
+    If the DB file has been deleted or replaced since the pooled connection
+    was opened, a new connection is opened to the current file.
+
+    Note that a pooled connection is shared by all datasets loaded from the
+    same DB file in the same thread. Writing to the DB through it raises an
+    :class:`sqlite3.OperationalError`. Closing it releases it back to the
+    pool rather than closing it, see :func:`close_pooled_read_connections`
+    for closing the pooled connections.
+
+    Args:
+        path_to_db: the path of the DB file. If the file does not exist, a
+            new regular connection is returned which creates the DB.
+
+    Returns:
+        A read-only connection to the DB file
+    """
+    if path_to_db == ':memory:' or not os.path.isfile(path_to_db):
+        return connect(path_to_db, get_DB_debug())
+
+    path = os.path.abspath(path_to_db)
+    file_id = _file_id(path)
+    pool = _read_connection_pool.connections
+    pooled = pool.get(path)
+    if pooled is not None:
+        pooled_file_id, conn = pooled
+        if pooled_file_id == file_id:
+            return conn
+        # the DB file has been replaced
+        del pool[path]
+        conn._close_pooled()
+    conn = _connect_read_only(path, get_DB_debug())
+    pool[path] = (file_id, conn)
+    return conn
+
+
+def close_pooled_read_connections(path_to_db: Optional[str] = None) -> None:
+    """
+    Close the pooled read-only connections of the calling thread, see
+    :func:`get_pooled_read_connection`. Datasets loaded through them can no
+    longer be read from. The connections of the main thread are closed at
+    exit, those of other threads when the thread ends.
+
+    Args:
+        path_to_db: the path of the DB file whose pooled connection to
+            close. If None, all pooled connections of the thread are closed.
+    """
+    pool = _read_connection_pool.connections
+    if path_to_db is None:
+        paths = list(pool)
+    else:
+        paths = [os.path.abspath(path_to_db)]
+    for path in paths:
+        pooled = pool.pop(path, None)
+        if pooled is not None:
+            pooled[1]._close_pooled()
+
+
+atexit.register(close_pooled_read_connections)
+
+
+def _connect_read_only(path: str, debug: bool) -> '_PooledConnectionPlus':
+    _register_adapters_and_converters()
+    uri = f"{pathlib.Path(path).as_uri()}?mode=ro"
+
+    sqlite3_conn = sqlite3.connect(uri, uri=True,
+                                   detect_types=sqlite3.PARSE_DECLTYPES)
+    if get_user_version(ConnectionPlus(sqlite3_conn)) != \
+            _latest_available_version():
+        sqlite3_conn.close()
+        # initialising or upgrading the DB needs a writable connection
+        connect(path, debug).close()
+        sqlite3_conn = sqlite3.connect(uri, uri=True,
+                                       detect_types=sqlite3.PARSE_DECLTYPES)
+    sqlite3_conn.row_factory = sqlite3.Row
+    conn = _PooledConnectionPlus(sqlite3_conn)
     if debug:
         conn.set_trace_callback(print)
-
-    init_db(conn)
-    perform_db_upgrade(conn, version=version)
+    apply_sqlite_profile(conn, read_only=True)
     return conn
 
 
+# the settings of an SQLite profile that are applied as pragmas, in the
+# order in which they are applied
+_PROFILE_PRAGMAS = ('page_size', 'cache_size', 'mmap_size', 'temp_store',
+                    'synchronous', 'journal_size_limit', 'wal_autocheckpoint')
+# the pragmas that only affect writing
+_WRITE_PRAGMAS = ('page_size', 'synchronous', 'journal_size_limit',
+                  'wal_autocheckpoint')
+# the valid values of the settings that are keywords, all other settings
+# are integers. All settings are interpolated into pragmas.
+_PROFILE_KEYWORDS = {
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'wal_checkpoint_mode': ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')}
+_PROFILE_INTEGERS = ('page_size', 'cache_size', 'mmap_size',
+                     'journal_size_limit', 'wal_autocheckpoint',
+                     'wal_checkpoint_interval')
+
+
+def get_sqlite_profile() -> Dict[str, Union[int, str]]:
+    """
+    Get the SQLite performance profile selected with
+    ``dataset.sqlite_profile`` from the profiles in
+    ``dataset.sqlite_profiles`` in the ``qcodesrc.json`` config file.
+    """
+    name = qcodes.config["dataset"]["sqlite_profile"]
+    profiles = qcodes.config["dataset"]["sqlite_profiles"]
+    try:
+        profile = profiles[name]
+    except KeyError:
+        raise RuntimeError(f"Invalid sqlite_profile {name}. Valid profiles "
+                           f"are {list(profiles)}")
+    _validate_sqlite_profile(name, profile)
+    return profile
+
+
+def _validate_sqlite_profile(name: str,
+                             profile: Dict[str, Union[int, str]]) -> None:
+    """
+    Check the settings of an SQLite profile, which the config may have been
+    changed to without validation against the schema, before they are
+    interpolated into pragmas.
+    """
+    for setting, value in profile.items():
+        if setting in _PROFILE_KEYWORDS:
+            valid = value in _PROFILE_KEYWORDS[setting]
+        elif setting in _PROFILE_INTEGERS:
+            valid = (isinstance(value, int) and not isinstance(value, bool)
+                     and (setting != 'wal_checkpoint_interval'
+                          or value >= 0))
+        else:
+            raise RuntimeError(f"Invalid setting {setting} in sqlite_profile "
+                               f"{name}. Valid settings are "
+                               f"{list(_PROFILE_KEYWORDS)} and "
+                               f"{list(_PROFILE_INTEGERS)}")
+        if not valid:
+            raise RuntimeError(f"Invalid value {value!r} of {setting} in "
+                               f"sqlite_profile {name}")
+
+
+def apply_sqlite_profile(conn: ConnectionPlus,
+                         read_only: bool = False) -> None:
+    """
+    Apply the settings of the SQLite performance profile in the config (see
+    :func:`get_sqlite_profile`) to a connection. ``page_size`` only has an
+    effect on new DB files and ``synchronous`` is only applied if the DB is
+    in WAL journal mode, where ``NORMAL`` is still safe against corruption.
+    See https://www.sqlite.org/pragma.html for the meaning of the settings.
+
+    Args:
+        conn: Connection to the database.
+        read_only: If True, only the settings that affect reading are
+            applied.
+    """
+    profile = get_sqlite_profile()
+    cursor = conn.cursor()
+    for pragma in _PROFILE_PRAGMAS:
+        if pragma not in profile:
+            continue
+        if read_only and pragma in _WRITE_PRAGMAS:
+            continue
+        if pragma == 'synchronous':
+            cursor.execute("PRAGMA journal_mode")
+            if cursor.fetchone()[0].upper() != 'WAL':
+                continue
+        cursor.execute(f"PRAGMA {pragma} = {profile[pragma]}")
+
+
+def checkpoint_wal_if_due(conn: ConnectionPlus) -> None:
+    """
+    Make a checkpoint of the WAL file if the ``wal_checkpoint_interval``
+    (in seconds) of the SQLite performance profile in the config has passed
+    since the last checkpoint made through this connection. This is meant
+    to be called by writers after writing such that the WAL file does not
+    keep growing during long runs while being read, e.g. for live plotting,
+    as the automatic checkpoints may not complete then. The checkpoint mode
+    is taken from ``wal_checkpoint_mode`` of the profile. Nothing is done
+    inside of a transaction.
+    """
+    profile = get_sqlite_profile()
+    interval = int(profile.get('wal_checkpoint_interval', 0))
+    if not interval or conn.in_transaction:
+        return
+    now = time.monotonic()
+    if conn.last_wal_checkpoint is None:
+        conn.last_wal_checkpoint = now
+        return
+    if now - conn.last_wal_checkpoint < interval:
+        return
+    mode = str(profile.get('wal_checkpoint_mode', 'PASSIVE'))
+    conn.execute(f"PRAGMA wal_checkpoint({mode})")
+    conn.last_wal_checkpoint = now
+
+
 def get_db_version_and_newest_available_version(path_to_db: str) -> Tuple[int,
                                                                           int]:
     """
@@ -241,6 +711,8 @@ def set_journal_mode(conn: ConnectionPlus, journal_mode: str) -> None:
     query = f"PRAGMA journal_mode={journal_mode};"
     cursor = conn.cursor()
     cursor.execute(query)
+    # some settings of the profile depend on the journal mode
+    apply_sqlite_profile(conn)
 
 
 def initialise_or_create_database_at(db_file_with_abs_path: str,
@@ -347,3 +347,86 @@ def perform_db_upgrade_8_to_9(conn: ConnectionPlus) -> None:
                 transaction(connection, _IX_runs_captured_run_id)
     else:
         raise RuntimeError(f"found {n_run_tables} runs tables expected 1")
+
+
+@upgrader
+def perform_db_upgrade_9_to_10(conn: ConnectionPlus) -> None:
+    """
+    Perform the upgrade from version 9 to version 10.
+
+    Add indices on the runs table for captured_counter
+    """
+
+    sql = "SELECT name FROM sqlite_master WHERE type='table' AND name='runs'"
+    cur = atomic_transaction(conn, sql)
+    n_run_tables = len(cur.fetchall())
+
+    pbar = tqdm(range(1), file=sys.stdout)
+    pbar.set_description("Upgrading database; v9 -> v10")
+
+    if n_run_tables == 1:
+        _IX_runs_captured_counter = """
+                                CREATE INDEX
+                                IF NOT EXISTS IX_runs_captured_counter
+                                ON runs (captured_counter DESC)
+                                """
+        with atomic(conn) as connection:
+            # iterate through the pbar for the sake of the side effect; it
+            # prints that the database is being upgraded
+            for _ in pbar:
+                transaction(connection, _IX_runs_captured_counter)
+    else:
+        raise RuntimeError(f"found {n_run_tables} runs tables expected 1")
+
+
+@upgrader
+def perform_db_upgrade_10_to_11(conn: ConnectionPlus) -> None:
+    """
+    Perform the upgrade from version 10 to version 11.
+
+    Store metadata in a run_metadata table with one row per run and tag
+    rather than in one column of the runs table per tag.
+    """
+    from qcodes.dataset.sqlite.db_upgrades.upgrade_10_to_11 import \
+        upgrade_10_to_11
+    upgrade_10_to_11(conn)
+
+
+@upgrader
+def perform_db_upgrade_11_to_12(conn: ConnectionPlus) -> None:
+    """
+    Perform the upgrade from version 11 to version 12.
+
+    Add the snapshot_blobs and run_snapshots tables of the snapshot store,
+    see :mod:`qcodes.dataset.sqlite.snapshots`.
+    """
+    _snapshot_blobs_schema = """
+                             CREATE TABLE IF NOT EXISTS snapshot_blobs (
+                                 hash TEXT PRIMARY KEY,
+                                 base_hash TEXT,
+                                 n_delta INTEGER NOT NULL,
+                                 codec INTEGER NOT NULL,
+                                 data BLOB NOT NULL
+                             );
+                             """
+    _run_snapshots_schema = """
+                            CREATE TABLE IF NOT EXISTS run_snapshots (
+                                run_id INTEGER PRIMARY KEY,
+                                hash TEXT NOT NULL,
+                                FOREIGN KEY(run_id)
+                                REFERENCES
+                                    runs(run_id),
+                                FOREIGN KEY(hash)
+                                REFERENCES
+                                    snapshot_blobs(hash)
+                            );
+                            """
+    pbar = tqdm(range(1), file=sys.stdout)
+    pbar.set_description("Upgrading database; v11 -> v12")
+
+    with atomic(conn) as connection:
+        # iterate through the pbar for the sake of the side effect; it
+        # prints that the database is being upgraded
+        for _ in pbar:
+            transaction(connection, _snapshot_blobs_schema)
+            transaction(connection, _run_snapshots_schema)
@@ -0,0 +1,105 @@
+import sys
+
+from tqdm import tqdm
+
+from qcodes.dataset.sqlite.connection import ConnectionPlus, atomic, \
+    transaction
+
+# the standard columns of the "runs" table in version 10, all other columns
+# hold metadata
+_V10_RUNS_TABLE_COLUMNS = ("run_id", "exp_id", "name", "result_table_name",
+                           "result_counter", "run_timestamp",
+                           "completed_timestamp", "is_completed",
+                           "parameters", "guid", "run_description",
+                           "snapshot", "parent_datasets", "captured_run_id",
+                           "captured_counter")
+
+_run_metadata_table_schema = """
+CREATE TABLE IF NOT EXISTS run_metadata (
+    run_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    value,
+    PRIMARY KEY (run_id, tag),
+    FOREIGN KEY(run_id)
+    REFERENCES
+        runs(run_id)
+);
+"""
+
+_IX_run_metadata_tag_value = """
+CREATE INDEX IF NOT EXISTS IX_run_metadata_tag_value
+ON run_metadata (tag, value);
+"""
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _create_runs_with_metadata_view(conn: ConnectionPlus) -> None:
+    """
+    Create the runs_with_metadata view as of version 11, i.e. the columns of
+    the runs table followed by one column per metadata tag. Tags which only
+    differ in case from a column or another tag are left out.
+    """
+    cursor = conn.cursor()
+    tags = [row['tag'] for row in cursor.execute(
+        "SELECT DISTINCT tag FROM run_metadata ORDER BY tag")]
+    run_columns = [row['name'] for row in cursor.execute(
+        "PRAGMA table_info(runs)")]
+
+    tag_names = {tag.lower() for tag in tags}
+    run_columns = [column for column in run_columns
+                   if column in _V10_RUNS_TABLE_COLUMNS
+                   or column.lower() not in tag_names]
+    columns = [f"runs.{_quote_identifier(column)}" for column in run_columns]
+    taken = {column.lower() for column in run_columns}
+    for tag in tags:
+        if tag.lower() in taken:
+            continue
+        taken.add(tag.lower())
+        columns.append(f"(SELECT value FROM run_metadata "
+                       f"WHERE run_metadata.run_id = runs.run_id "
+                       f"AND run_metadata.tag = {_quote_literal(tag)}) "
+                       f"AS {_quote_identifier(tag)}")
+
+    transaction(conn, "DROP VIEW IF EXISTS runs_with_metadata")
+    transaction(conn, f"CREATE VIEW runs_with_metadata AS "
+                      f"SELECT {', '.join(columns)} FROM runs")
+
+
+def upgrade_10_to_11(conn: ConnectionPlus) -> None:
+    """
+    Perform the upgrade from version 10 to version 11.
+
+    Add the run_metadata table holding one row per run and metadata tag and
+    copy the values of the metadata columns of the runs table into it. The
+    metadata columns are left in place for readers of earlier versions. The
+    runs_with_metadata view is added which presents the metadata as one
+    column per tag like the runs table did.
+    """
+    with atomic(conn) as conn:
+        pbar = tqdm(range(1), file=sys.stdout)
+        pbar.set_description("Upgrading database; v10 -> v11")
+        # iterate through the pbar for the sake of the side effect; it
+        # prints that the database is being upgraded
+        for _ in pbar:
+            transaction(conn, _run_metadata_table_schema)
+            transaction(conn, _IX_run_metadata_tag_value)
+
+            columns = transaction(conn, "PRAGMA table_info(runs)").fetchall()
+            tags = [column['name'] for column in columns
+                    if column['name'] not in _V10_RUNS_TABLE_COLUMNS]
+            for tag in tags:
+                quoted_tag = '"' + tag.replace('"', '""') + '"'
+                transaction(conn,
+                            f"INSERT INTO run_metadata (run_id, tag, value) "
+                            f"SELECT run_id, ?, {quoted_tag} FROM runs "
+                            f"WHERE {quoted_tag} IS NOT NULL",
+                            tag)
+
+            _create_runs_with_metadata_view(conn)
@@ -10,3 +10,5 @@ def get_user_version(conn: ConnectionPlus) -> int:
 
 def set_user_version(conn: ConnectionPlus, version: int) -> None:
     atomic_transaction(conn, f'PRAGMA user_version({version})')
+    # the layout of the database may have changed with its version
+    conn.has_run_metadata_table = None
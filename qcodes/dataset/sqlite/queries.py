@@ -7,8 +7,8 @@ import sqlite3
 import time
 import unicodedata
 import warnings
-from typing import (Any, Callable, Dict, List, Mapping, Optional, Sequence,
-                    Tuple, Union, cast)
+from typing import (Any, Callable, Dict, Iterator, List, Mapping, Optional,
+                    Sequence, Tuple, Union, cast)
 from copy import copy
 import numpy as np
 from numpy import VisibleDeprecationWarning
@@ -23,6 +23,7 @@ from qcodes.dataset.descriptions.versioning.converters import old_to_new
 from qcodes.dataset.guids import generate_guid, parse_guid
 from qcodes.dataset.sqlite.connection import (ConnectionPlus, atomic,
                                               atomic_transaction, transaction)
+from qcodes.dataset.sqlite.db_upgrades.version import get_user_version
 from qcodes.dataset.sqlite.query_helpers import (VALUES, insert_column,
                                                  insert_values,
                                                  is_column_in_table, many,
@@ -31,6 +32,7 @@ from qcodes.dataset.sqlite.query_helpers import (VALUES, insert_column,
                                                  select_one_where,
                                                  sql_placeholder_string,
                                                  update_where)
+from qcodes.dataset.sqlite.settings import SQLiteSettings
 from qcodes.utils.deprecate import deprecate
 
 log = logging.getLogger(__name__)
@@ -47,6 +49,11 @@ RUNS_TABLE_COLUMNS = ["run_id", "exp_id", "name", "result_table_name",
                       "run_description", "snapshot", "parent_datasets",
                       "captured_run_id", "captured_counter"]
 
+# the columns of the "runs" table that are loaded along with a run, the
+# snapshot is left out as it can be large and is rarely needed
+_LOADED_RUNS_TABLE_COLUMNS = [column for column in RUNS_TABLE_COLUMNS
+                              if column != "snapshot"]
+
 
 def is_run_id_in_database(conn: ConnectionPlus,
                           *run_ids: int) -> Dict[int, bool]:
@@ -187,6 +194,123 @@ def get_parameter_data(conn: ConnectionPlus,
     return output
 
 
+def get_parameter_data_in_chunks(
+        conn: ConnectionPlus,
+        table_name: str,
+        columns: Sequence[str] = (),
+        chunk_rows: int = 100000
+) -> Iterator[Dict[str, Dict[str, np.ndarray]]]:
+    """
+    Get data for one or more parameters and its dependencies in chunks of
+    at most ``chunk_rows`` results per parameter. Each chunk has the same
+    structure as the output of :func:`get_parameter_data` but the data is
+    never reshaped according to the shapes registered in the run
+    description. Parameters that have no more data are left out of the
+    remaining chunks. The iteration stops when no data is left for any of
+    the parameters.
+
+    Args:
+        conn: database connection
+        table_name: name of the table
+        columns: list of columns. If no columns are provided, all parameters
+            are returned.
+        chunk_rows: the maximal number of results (rows) per parameter in
+            each chunk
+    """
+    if chunk_rows < 1:
+        raise ValueError(f"chunk_rows must be a positive integer, "
+                         f"got {chunk_rows}")
+    rundescriber = get_rundescriber_from_result_table_name(conn, table_name)
+
+    if len(columns) == 0:
+        columns = [ps.name for ps in rundescriber.interdeps.non_dependencies]
+
+    iterators = {output_param: _iter_parameter_tree_chunks(conn,
+                                                          table_name,
+                                                          rundescriber,
+                                                          output_param,
+                                                          chunk_rows)
+                 for output_param in columns}
+    while iterators:
+        chunk = {}
+        for output_param, iterator in list(iterators.items()):
+            try:
+                chunk[output_param] = next(iterator)
+            except StopIteration:
+                del iterators[output_param]
+        if chunk:
+            yield chunk
+
+
+def _iter_parameter_tree_chunks(
+        conn: ConnectionPlus,
+        table_name: str,
+        rundescriber: RunDescriber,
+        output_param: str,
+        chunk_rows: int
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Iterate over the data of one parameter tree in chunks of at most
+    ``chunk_rows`` results, in the order the results were added. Each chunk
+    is selected by the range of rowids following the last rowid read rather
+    than by an OFFSET, such that sqlite seeks directly to the rows of the
+    chunk and reading all chunks takes time linear in the number of rows.
+    """
+    last_rowid = 0
+    while True:
+        chunk_end = _get_last_rowid_of_chunk(conn, table_name, output_param,
+                                             last_rowid, chunk_rows)
+        if chunk_end is None:
+            return
+        data, _ = get_parameter_data_for_one_paramtree(
+            conn,
+            table_name,
+            rundescriber,
+            output_param,
+            None,
+            None,
+            rowid_range=(last_rowid + 1, chunk_end))
+        yield data
+        last_rowid = chunk_end
+
+
+def _get_last_rowid_of_chunk(conn: ConnectionPlus,
+                             table_name: str,
+                             output_param: str,
+                             last_rowid: int,
+                             chunk_rows: int) -> Optional[int]:
+    """
+    Get the rowid of the last of the (at most) ``chunk_rows`` results of
+    the parameter tree of ``output_param`` following ``last_rowid``, or
+    None if there are no more results.
+    """
+    sql = f"""
+          SELECT MAX(rowid)
+          FROM (SELECT rowid
+                FROM "{table_name}"
+                WHERE {output_param} IS NOT NULL AND rowid > {last_rowid}
+                ORDER BY rowid
+                LIMIT {chunk_rows})
+          """
+    return one(atomic_transaction(conn, sql), 0)
+
+
+def get_number_of_results_in_param_tree(conn: ConnectionPlus,
+                                        table_name: str,
+                                        output_param: str) -> int:
+    """
+    Get the number of results (rows) stored for the parameter tree of
+    ``output_param``.
+    """
+    where = _get_where_for_one_param_tree(output_param, None)
+    sql = f"""
+          SELECT COUNT(*)
+          FROM "{table_name}"
+          WHERE {where}
+          """
+    return one(atomic_transaction(conn, sql), 0)
+
+
 def get_shaped_parameter_data_for_one_paramtree(
         conn: ConnectionPlus,
         table_name: str,
@@ -255,11 +379,24 @@ def get_parameter_data_for_one_paramtree(
         rundescriber: RunDescriber,
         output_param: str,
         start: Optional[int],
-        end: Optional[int]
+        end: Optional[int],
+        rowid_range: Optional[Tuple[int, int]] = None
 ) -> Tuple[Dict[str, np.ndarray], int]:
     interdeps = rundescriber.interdeps
+    paramspecs = _get_paramspecs_for_one_param_tree(interdeps, output_param)
+    try:
+        return _get_columns_for_one_param_tree(conn, table_name, paramspecs,
+                                               start, end,
+                                               rowid_range=rowid_range)
+    except _NonUniformColumnError:
+        # The data does not fit into regular numpy arrays (e.g. arrays of
+        # different length or mixed types in a column), so fall back to
+        # building the arrays from the rows as numpy sees fit.
+        pass
+
     data, paramspecs, n_rows = _get_data_for_one_param_tree(
-        conn, table_name, interdeps, output_param, start, end
+        conn, table_name, interdeps, output_param, start, end,
+        rowid_range=rowid_range
     )
     if not paramspecs[0].name == output_param:
         raise ValueError("output_param should always be the first "
@@ -272,35 +409,204 @@ def get_parameter_data_for_one_paramtree(
     res_t = map(list, zip(*data))
 
     for paramspec, column_data in zip(paramspecs, res_t):
+        param_data[paramspec.name] = _column_data_to_array(paramspec,
+                                                           column_data)
+    return param_data, n_rows
+
+
+def _column_data_to_array(paramspec: ParamSpecBase,
+                          column_data: Sequence[Any]) -> np.ndarray:
+    try:
+        if paramspec.type == "numeric":
+            # there is no reliable way to
+            # tell the difference between a float and and int loaded
+            # from sqlite numeric columns so always fall back to float
+            dtype: Optional[type] = np.float64
+        else:
+            dtype = None
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "ignore",
+                category=VisibleDeprecationWarning,
+                message="Creating an ndarray from ragged nested sequences"
+            )
+            # numpy warns here and coming versions
+            # will eventually raise
+            # for ragged arrays if you don't explicitly set
+            # dtype=object
+            # It is time consuming to detect ragged arrays here
+            # and it is expected to be a relatively rare situation
+            # so fallback to object if the regular dtype fail
+            return np.array(column_data, dtype=dtype)
+    except:
+        # Not clear which error to catch here. This will only be clarified
+        # once numpy actually starts to raise here.
+        return np.array(column_data, dtype=object)
+
+
+class _NonUniformColumnError(Exception):
+    pass
+
+
+class _ColumnBuffer:
+    """
+    Preallocated buffer that a column of a parameter tree is read into
+    chunk by chunk. Numeric and complex columns are stored in a one
+    dimensional array and array columns in an array with one more
+    dimension than the arrays stored in the column. Text columns are
+    collected and converted once all rows have been read since the
+    length of the longest string is not known in advance.
+    """
+
+    def __init__(self, paramspec: ParamSpecBase, n_rows: int):
+        self.paramspec = paramspec
+        self.n_rows = n_rows
+        self.data: Optional[np.ndarray] = None
+        self.text: List[Any] = []
+        if paramspec.type == 'numeric':
+            self.data = np.empty(n_rows, dtype=np.float64)
+        elif paramspec.type == 'complex':
+            self.data = np.empty(n_rows, dtype=np.complex128)
+
+    def fill(self, start: int, values: Tuple[Any, ...]) -> None:
+        stop = start + len(values)
+        paramtype = self.paramspec.type
+        if paramtype == 'text':
+            self.text.extend(values)
+        elif paramtype == 'array':
+            self._fill_arrays(start, stop, values)
+        else:
+            assert self.data is not None
+            if paramtype == 'complex' and None in values:
+                raise _NonUniformColumnError()
+            try:
+                self.data[start:stop] = values
+            except (ValueError, TypeError):
+                raise _NonUniformColumnError()
+
+    def _fill_arrays(self, start: int, stop: int,
+                     values: Tuple[Any, ...]) -> None:
         try:
-            if paramspec.type == "numeric":
-                # there is no reliable way to
-                # tell the difference between a float and and int loaded
-                # from sqlite numeric columns so always fall back to float
-                dtype: Optional[type] = np.float64
-            else:
-                dtype = None
-            with warnings.catch_warnings():
-                warnings.filterwarnings(
-                    "ignore",
-                    category=VisibleDeprecationWarning,
-                    message="Creating an ndarray from ragged nested sequences"
-                )
-                # numpy warns here and coming versions
-                # will eventually raise
-                # for ragged arrays if you don't explicitly set
-                # dtype=object
-                # It is time consuming to detect ragged arrays here
-                # and it is expected to be a relatively rare situation
-                # so fallback to object if the regular dtype fail
-                param_data[paramspec.name] = np.array(column_data, dtype=dtype)
-        except:
-            # Not clear which error to catch here. This will only be clarified
-            # once numpy actually starts to raise here.
-            param_data[paramspec.name] = np.array(column_data, dtype=object)
+            shapes = {value.shape for value in values}
+            dtypes = {value.dtype for value in values}
+        except AttributeError:
+            raise _NonUniformColumnError()
+        if len(shapes) != 1:
+            raise _NonUniformColumnError()
+        shape = shapes.pop()
+        if self.data is None:
+            self.data = np.empty((self.n_rows,) + shape,
+                                 dtype=np.result_type(*dtypes))
+        elif self.data.shape[1:] != shape:
+            raise _NonUniformColumnError()
+        dtype = np.result_type(self.data.dtype, *dtypes)
+        if dtype != self.data.dtype:
+            self.data = self.data.astype(dtype)
+        self.data[start:stop] = values
+
+    def to_array(self) -> np.ndarray:
+        if self.paramspec.type == 'text':
+            return _column_data_to_array(self.paramspec, self.text)
+        assert self.data is not None
+        return self.data
+
+
+def _get_columns_for_one_param_tree(
+        conn: ConnectionPlus,
+        table_name: str,
+        paramspecs: Sequence[ParamSpecBase],
+        start: Optional[int],
+        end: Optional[int],
+        chunk_size: int = 10000,
+        rowid_range: Optional[Tuple[int, int]] = None
+) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    Load the data of a parameter tree column by column. The number of rows
+    is counted first such that the data can be read with ``fetchmany``
+    into preallocated numpy arrays chunk by chunk instead of materializing
+    all rows as python objects. Scalar parameters in a tree that also
+    contains array parameters are expanded to the shape of the first
+    array parameter by broadcasting. If a ``rowid_range`` is given only
+    rows with a rowid in that (inclusive) range are considered and
+    ``start`` and ``end`` are relative to the first of those rows.
+
+    Raises:
+        _NonUniformColumnError: if the data of a column does not fit into
+            a regular numpy array of the type of the parameter. In that case
+            the data has to be loaded row by row.
+    """
+    output_param = paramspecs[0].name
+    columns = [ps.name for ps in paramspecs]
+    offset, limit = _get_offset_limit_for_range(start, end)
+    where = _get_where_for_one_param_tree(output_param, rowid_range)
+
+    count_sql = f"""
+                SELECT COUNT(*)
+                FROM "{table_name}"
+                WHERE {where}
+                """
+    n_total = one(atomic_transaction(conn, count_sql), 0)
+    n_rows = max(n_total - offset, 0)
+    if limit >= 0:
+        n_rows = min(n_rows, limit)
+
+    if n_rows == 0:
+        return {}, 0
+
+    # Rows may be added while reading an ongoing run, so the number of rows
+    # read is limited to the number counted above.
+    sql = f"""
+          SELECT {','.join(columns)}
+          FROM "{table_name}"
+          WHERE {where}
+          LIMIT {n_rows} OFFSET {offset}
+          """
+    buffers = [_ColumnBuffer(ps, n_rows) for ps in paramspecs]
+
+    cursor = conn.cursor()
+    # plain tuples are significantly cheaper to create than sqlite3.Row
+    cursor.row_factory = None
+    cursor.execute(sql)
+    row = 0
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        for buffer, values in zip(buffers, zip(*chunk)):
+            buffer.fill(row, values)
+        row += len(chunk)
+
+    if row != n_rows:
+        # this can only happen if rows were deleted while reading
+        raise _NonUniformColumnError()
+
+    param_data = {buffer.paramspec.name: buffer.to_array()
+                  for buffer in buffers}
+    _broadcast_to_array_shape(param_data, paramspecs)
     return param_data, n_rows
 
 
+def _broadcast_to_array_shape(param_data: Dict[str, np.ndarray],
+                              paramspecs: Sequence[ParamSpecBase]) -> None:
+    """
+    Expand the numeric, complex and text parameters in a tree that also
+    contains array parameters to the shape of the first array parameter.
+    This is the columnar equivalent of :func:`_expand_data_to_arrays`.
+    """
+    types = [param.type for param in paramspecs]
+    if 'array' not in types:
+        return
+    array_data = param_data[paramspecs[types.index('array')].name]
+    for paramspec in paramspecs:
+        if paramspec.type == 'array':
+            continue
+        column = param_data[paramspec.name]
+        expanded = np.empty(array_data.shape, dtype=column.dtype)
+        expanded[...] = column.reshape(
+            column.shape + (1,) * (array_data.ndim - 1))
+        param_data[paramspec.name] = expanded
+
+
 def _expand_data_to_arrays(data: List[List[Any]], paramspecs: Sequence[ParamSpecBase]) -> None:
     types = [param.type for param in paramspecs]
     # if we have array type parameters expand all other parameters
@@ -335,22 +641,29 @@ def _expand_data_to_arrays(data: List[List[Any]], paramspecs: Sequence[ParamSpec
                                             dtype=np.dtype(f'U{strlen}'))
 
 
-def _get_data_for_one_param_tree(conn: ConnectionPlus, table_name: str,
-                                 interdeps: InterDependencies_, output_param: str,
-                                 start: Optional[int], end: Optional[int]) \
-        -> Tuple[List[List[Any]], List[ParamSpecBase], int]:
+def _get_paramspecs_for_one_param_tree(
+        interdeps: InterDependencies_,
+        output_param: str) -> List[ParamSpecBase]:
     output_param_spec = interdeps._id_to_paramspec[output_param]
     # find all the dependencies of this param
-
     dependency_params = list(interdeps.dependencies.get(output_param_spec, ()))
-    dependency_names = [param.name for param in dependency_params]
-    paramspecs = [output_param_spec] + dependency_params
+    return [output_param_spec] + dependency_params
+
+
+def _get_data_for_one_param_tree(conn: ConnectionPlus, table_name: str,
+                                 interdeps: InterDependencies_, output_param: str,
+                                 start: Optional[int], end: Optional[int],
+                                 rowid_range: Optional[Tuple[int, int]] = None) \
+        -> Tuple[List[List[Any]], List[ParamSpecBase], int]:
+    paramspecs = _get_paramspecs_for_one_param_tree(interdeps, output_param)
+    dependency_names = [param.name for param in paramspecs[1:]]
     res = get_parameter_tree_values(conn,
                                     table_name,
                                     output_param,
                                     *dependency_names,
                                     start=start,
-                                    end=end)
+                                    end=end,
+                                    rowid_range=rowid_range)
     n_rows = len(res)
     return res, paramspecs, n_rows
 
@@ -381,12 +694,43 @@ def get_values(conn: ConnectionPlus,
     return res
 
 
+def _get_offset_limit_for_range(start: Optional[int],
+                                end: Optional[int]) -> Tuple[int, int]:
+    """
+    Convert a (1-indexed, inclusive) range of results to the OFFSET and
+    LIMIT of an SQL query. A limit of -1 means no limit.
+    """
+    offset = max((start - 1), 0) if start is not None else 0
+    limit = max((end - offset), 0) if end is not None else -1
+
+    if start is not None and end is not None and start > end:
+        limit = 0
+    return offset, limit
+
+
+def _get_where_for_one_param_tree(
+        toplevel_param_name: str,
+        rowid_range: Optional[Tuple[int, int]]) -> str:
+    """
+    The WHERE clause selecting the rows of a parameter tree, optionally
+    restricted to an (inclusive) range of rowids. Restricting the rowids
+    lets sqlite seek directly to the rows of interest rather than scanning
+    the whole table.
+    """
+    where = f"{toplevel_param_name} IS NOT NULL"
+    if rowid_range is not None:
+        where += f" AND rowid BETWEEN {rowid_range[0]} AND {rowid_range[1]}"
+    return where
+
+
 def get_parameter_tree_values(conn: ConnectionPlus,
                               result_table_name: str,
                               toplevel_param_name: str,
                               *other_param_names: str,
                               start: Optional[int] = None,
-                              end: Optional[int] = None) -> List[List[Any]]:
+                              end: Optional[int] = None,
+                              rowid_range: Optional[Tuple[int, int]] = None
+                              ) -> List[List[Any]]:
     """
     Get the values of one or more columns from a data table. The rows
     retrieved are the rows where the 'toplevel_param_name' column has
@@ -406,17 +750,16 @@ def get_parameter_tree_values(conn: ConnectionPlus,
         end: The (1-indexed) result to include as the last result to be
             returned. None is equivalent to "all the rest". If start > end,
             nothing is returned.
+        rowid_range: If given, only the rows with a rowid in this
+            (inclusive) range are considered. ``start`` and ``end`` are
+            then relative to the first of these rows.
 
     Returns:
         A list of list. The outer list index is row number, the inner list
         index is parameter value (first toplevel_param, then other_param_names)
     """
 
-    offset = max((start - 1), 0) if start is not None else 0
-    limit = max((end - offset), 0) if end is not None else -1
-
-    if start is not None and end is not None and start > end:
-        limit = 0
+    offset, limit = _get_offset_limit_for_range(start, end)
 
     # Note: if we use placeholders for the SELECT part, then we get rows
     # back that have "?" as all their keys, making further data extraction
@@ -427,10 +770,12 @@ def get_parameter_tree_values(conn: ConnectionPlus,
     columns = [toplevel_param_name] + list(other_param_names)
     columns_for_select = ','.join(columns)
 
+    where = _get_where_for_one_param_tree(toplevel_param_name, rowid_range)
+
     sql_subquery = f"""
                    (SELECT {columns_for_select}
                     FROM "{result_table_name}"
-                    WHERE {toplevel_param_name} IS NOT NULL)
+                    WHERE {where})
                    """
     sql = f"""
           SELECT {columns_for_select}
@@ -1561,6 +1906,52 @@ def get_run_description(conn: ConnectionPlus, run_id: int) -> str:
                             "run_id", run_id)
 
 
+def _chunks(run_ids: Sequence[int]) -> Iterator[Sequence[int]]:
+    # keep the number of bound variables of a query within the limit
+    chunk_size = int(SQLiteSettings.limits['MAX_VARIABLE_NUMBER'])
+    for start in range(0, len(run_ids), chunk_size):
+        yield run_ids[start:start + chunk_size]
+
+
+def get_run_rows(conn: ConnectionPlus,
+                 run_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Get the rows of the runs table of the specified runs, without the
+    snapshot, along with the name and sample name of their experiments as
+    "exp_name" and "sample_name". The runs are looked up with one query per
+    chunk of run ids rather than one query per run and column.
+
+    Args:
+        conn: database connection
+        run_ids: the ids of the runs to look up
+
+    Returns:
+        A dictionary from run id to the row of the run. Runs that do not
+        exist are left out.
+    """
+    columns = ", ".join(f"runs.{column}"
+                        for column in _LOADED_RUNS_TABLE_COLUMNS)
+    rows: Dict[int, Dict[str, Any]] = {}
+    cursor = conn.cursor()
+    for chunk in _chunks(run_ids):
+        placeholders = ",".join("?" * len(chunk))
+        query = (f"SELECT {{}}, experiments.name AS exp_name, "
+                 f"experiments.sample_name AS sample_name "
+                 f"FROM runs JOIN experiments "
+                 f"ON runs.exp_id = experiments.exp_id "
+                 f"WHERE runs.run_id IN ({placeholders})")
+        try:
+            cursor.execute(query.format(columns), chunk)
+        except sqlite3.OperationalError as e:
+            # databases of earlier versions lack some of the columns
+            if "no such column" not in str(e):
+                raise
+            cursor.execute(query.format("runs.*"), chunk)
+        for row in cursor:
+            rows[row['run_id']] = dict(row)
+    return rows
+
+
 def get_parent_dataset_links(conn: ConnectionPlus, run_id: int) -> str:
     """
     Return the (JSON string) of the parent-child dataset links for the
@@ -1590,7 +1981,8 @@ def get_parent_dataset_links(conn: ConnectionPlus, run_id: int) -> str:
 def get_metadata(conn: ConnectionPlus, tag: str, table_name: str) -> str:
     """ Get metadata under the tag from table
     """
-    return select_one_where(conn, "runs", tag,
+    table = "runs_with_metadata" if _has_run_metadata_table(conn) else "runs"
+    return select_one_where(conn, table, tag,
                             "result_table_name", table_name)
 
 
@@ -1600,6 +1992,44 @@ def get_metadata_from_run_id(
     """
     Get all metadata associated with the specified run
     """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT tag, value FROM run_metadata "
+                       "WHERE run_id = ? ORDER BY rowid", (run_id,))
+    except sqlite3.OperationalError as e:
+        # databases before version 11 have one runs column per tag
+        if "no such table: run_metadata" not in str(e):
+            raise
+        return _get_metadata_from_runs_columns(conn, run_id)
+    return {row['tag']: row['value'] for row in cursor}
+
+
+def get_metadata_from_run_ids(
+        conn: ConnectionPlus, run_ids: Sequence[int]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Get all metadata associated with each of the specified runs, with one
+    query per chunk of run ids
+    """
+    metadata: Dict[int, Dict[str, Any]] = {run_id: {} for run_id in run_ids}
+    if not _has_run_metadata_table(conn):
+        # databases before version 11 have one runs column per tag
+        return {run_id: _get_metadata_from_runs_columns(conn, run_id)
+                for run_id in metadata}
+    cursor = conn.cursor()
+    for chunk in _chunks(run_ids):
+        placeholders = ",".join("?" * len(chunk))
+        cursor.execute(f"SELECT run_id, tag, value FROM run_metadata "
+                       f"WHERE run_id IN ({placeholders}) ORDER BY rowid",
+                       chunk)
+        for row in cursor:
+            metadata[row['run_id']][row['tag']] = row['value']
+    return metadata
+
+
+def _get_metadata_from_runs_columns(
+        conn: ConnectionPlus, run_id: int
+) -> Dict[str, Any]:
     non_metadata = RUNS_TABLE_COLUMNS
 
     metadata = {}
@@ -1628,6 +2058,91 @@ def get_metadata_from_run_id(
     return metadata
 
 
+def _has_run_metadata_table(conn: ConnectionPlus) -> bool:
+    """
+    Does the database store metadata in the run_metadata table (version 11
+    and later) rather than in columns of the runs table? The answer is
+    looked up once per connection.
+    """
+    if conn.has_run_metadata_table is None:
+        conn.has_run_metadata_table = get_user_version(conn) >= 11
+    return conn.has_run_metadata_table
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def update_runs_with_metadata_view(conn: ConnectionPlus) -> None:
+    """
+    Recreate the runs_with_metadata view. The view holds the columns of the
+    runs table and one column per metadata tag, i.e. the layout of the runs
+    table before version 11. This keeps queries written against that layout
+    working. The view must be recreated whenever metadata with a new tag is
+    added.
+
+    Tags which only differ in case from a column of the runs table or
+    from another tag are left out since the names of the columns of a view
+    must be unique ignoring case.
+    """
+    cursor = conn.cursor()
+    tags = [row['tag'] for row in cursor.execute(
+        "SELECT DISTINCT tag FROM run_metadata ORDER BY tag")]
+    run_columns = [row['name'] for row in cursor.execute(
+        "PRAGMA table_info(runs)")]
+
+    # metadata columns of the runs table of earlier versions are superseded
+    # by the tags they have been copied to
+    tag_names = {tag.lower() for tag in tags}
+    run_columns = [column for column in run_columns
+                   if column in RUNS_TABLE_COLUMNS
+                   or column.lower() not in tag_names]
+    columns = [f"runs.{_quote_identifier(column)}" for column in run_columns]
+    taken = {column.lower() for column in run_columns}
+    for tag in tags:
+        if tag.lower() in taken:
+            continue
+        taken.add(tag.lower())
+        columns.append(f"(SELECT value FROM run_metadata "
+                       f"WHERE run_metadata.run_id = runs.run_id "
+                       f"AND run_metadata.tag = {_quote_literal(tag)}) "
+                       f"AS {_quote_identifier(tag)}")
+
+    with atomic(conn) as conn:
+        transaction(conn, "DROP VIEW IF EXISTS runs_with_metadata")
+        transaction(conn, f"CREATE VIEW runs_with_metadata AS "
+                          f"SELECT {', '.join(columns)} FROM runs")
+
+
+def _add_run_metadata(conn: ConnectionPlus, run_id: int,
+                      metadata: Mapping[str, Any]) -> None:
+    """
+    Add or update the metadata of a run in the run_metadata table and
+    recreate the runs_with_metadata view if any of the tags is new.
+    """
+    new_tag = False
+    with atomic(conn) as conn:
+        cursor = conn.cursor()
+        for tag, value in metadata.items():
+            cursor.execute("UPDATE run_metadata SET value = ? "
+                           "WHERE run_id = ? AND tag = ?",
+                           (value, run_id, tag))
+            if cursor.rowcount > 0:
+                continue
+            if not new_tag:
+                cursor.execute("SELECT 1 FROM run_metadata "
+                               "WHERE tag = ? LIMIT 1", (tag,))
+                new_tag = cursor.fetchone() is None
+            cursor.execute("INSERT INTO run_metadata (run_id, tag, value) "
+                           "VALUES (?, ?, ?)", (run_id, tag, value))
+        if new_tag:
+            update_runs_with_metadata_view(conn)
+
+
 def insert_meta_data(conn: ConnectionPlus, row_id: int, table_name: str,
                      metadata: Mapping[str, Any]) -> None:
     """
@@ -1640,13 +2155,17 @@ def insert_meta_data(conn: ConnectionPlus, row_id: int, table_name: str,
         - table_name: the table to add to, defaults to runs
         - metadata: the metadata to add
     """
+    _validate_metadata(metadata)
+    for key in metadata.keys():
+        insert_column(conn, table_name, key)
+    update_meta_data(conn, row_id, table_name, metadata)
+
+
+def _validate_metadata(metadata: Mapping[str, Any]) -> None:
     for tag, val in metadata.items():
         if val is None:
             raise ValueError(f'Tag {tag} has value None. '
                              ' That is not a valid metadata value!')
-    for key in metadata.keys():
-        insert_column(conn, table_name, key)
-    update_meta_data(conn, row_id, table_name, metadata)
 
 
 def update_meta_data(conn: ConnectionPlus, row_id: int, table_name: str,
@@ -1671,12 +2190,29 @@ def add_meta_data(conn: ConnectionPlus,
     Add metadata data (updates if exists, create otherwise).
     Note that None is not a valid metadata value.
 
+    Metadata of runs is stored in the run_metadata table, except for tags
+    that are standard columns of the runs table (such as 'snapshot') which
+    are stored in those columns. For databases before version 11 and other
+    tables a column is added per tag.
+
     Args:
         - conn: the connection to the sqlite database
         - row_id: the row to add the metadata at
         - metadata: the metadata to add
         - table_name: the table to add to, defaults to runs
     """
+    if table_name == "runs" and _has_run_metadata_table(conn):
+        _validate_metadata(metadata)
+        run_columns = {tag: value for tag, value in metadata.items()
+                       if tag in RUNS_TABLE_COLUMNS}
+        tags = {tag: value for tag, value in metadata.items()
+                if tag not in RUNS_TABLE_COLUMNS}
+        with atomic(conn) as conn:
+            if run_columns:
+                update_meta_data(conn, row_id, table_name, run_columns)
+            if tags:
+                _add_run_metadata(conn, row_id, tags)
+        return
     try:
         insert_meta_data(conn, row_id, table_name, metadata)
     except sqlite3.OperationalError as e:
@@ -1836,3 +2372,86 @@ def load_new_data_for_rundescriber(
         new_data_dict[meas_parameter] = new_data
         updated_read_status[meas_parameter] = start + n_rows_read - 1
     return new_data_dict, updated_read_status
+
+
+def _load_new_data_for_rundescriber_by_rowid(
+        conn: ConnectionPlus,
+        table_name: str,
+        rundescriber: RunDescriber,
+        read_status: Mapping[str, int],
+) -> Tuple[Dict[str, Dict[str, np.ndarray]], Dict[str, int]]:
+    """
+    Like :func:`load_new_data_for_rundescriber` but ``read_status`` holds
+    the rowid of the last row read rather than the number of rows read. The
+    rows are selected by rowid such that only the rows added since the last
+    read are touched, independent of how many rows were read before.
+
+    Args:
+        conn: The connection to the sqlite database
+        table_name: The name of the table the data is stored in
+        rundescriber: The rundescriber that describes the run
+        read_status: Mapping from dependent parameter name to the rowid of
+          the last row read from the db previously.
+
+    Returns:
+        new data and an updated rowid of the last row read.
+
+    """
+
+    parameters = tuple(ps.name for ps in
+                       rundescriber.interdeps.non_dependencies)
+    updated_read_status: Dict[str, int] = dict(read_status)
+    new_data_dict: Dict[str, Dict[str, np.ndarray]] = {}
+
+    # All parameter trees are read up to the same row such that the data
+    # of the trees is consistent even if rows are added while reading.
+    # MAX(rowid) is looked up at the end of the table b-tree so it is cheap.
+    max_rowid_sql = f'SELECT MAX(rowid) FROM "{table_name}"'
+    last_rowid = one(atomic_transaction(conn, max_rowid_sql), 0)
+    if last_rowid is None:
+        return new_data_dict, updated_read_status
+
+    for meas_parameter in parameters:
+
+        first_rowid = read_status.get(meas_parameter, 0) + 1
+        if first_rowid > last_rowid:
+            continue
+        new_data, _ = get_parameter_data_for_one_paramtree(
+            conn,
+            table_name,
+            rundescriber=rundescriber,
+            output_param=meas_parameter,
+            start=None,
+            end=None,
+            rowid_range=(first_rowid, last_rowid)
+        )
+        new_data_dict[meas_parameter] = new_data
+        updated_read_status[meas_parameter] = last_rowid
+    return new_data_dict, updated_read_status
+
+
+def create_parameter_tree_indices(conn: ConnectionPlus,
+                                  table_name: str,
+                                  interdeps: InterDependencies_) -> None:
+    """
+    Create a partial index of the rows of each parameter tree of a run,
+    i.e. of the rows where the dependent parameter is not NULL. For runs
+    where the results of several parameter trees are interleaved this lets
+    sqlite count and skip the rows of one tree without scanning the rows
+    of the others. The indices are ordered by rowid, so the order in which
+    the rows are returned is not changed.
+
+    Args:
+        conn: The connection to the sqlite database
+        table_name: The name of the results table of the run
+        interdeps: The interdependencies of the run
+    """
+    with atomic(conn) as conn:
+        for paramspec in interdeps.non_dependencies:
+            index_name = f"{table_name}_{paramspec.name}_not_null"
+            sql = f"""
+                  CREATE INDEX IF NOT EXISTS "{index_name}"
+                  ON "{table_name}" (id)
+                  WHERE {paramspec.name} IS NOT NULL
+                  """
+            transaction(conn, sql)
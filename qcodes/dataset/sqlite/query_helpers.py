@@ -2,6 +2,7 @@
 This module provides a number of convenient general-purpose functions that
 are useful for building more database-specific queries out of them.
 """
+import functools
 import itertools
 import sqlite3
 from distutils.version import LooseVersion
@@ -11,6 +12,7 @@ from typing import List, Any, Union, Dict, Tuple, Optional, Sequence
 import numpy as np
 from numpy import ndarray
 
+import qcodes
 from qcodes.dataset.sqlite.connection import ConnectionPlus, \
     atomic_transaction, transaction, atomic
 from qcodes.dataset.sqlite.settings import SQLiteSettings
@@ -149,6 +151,68 @@ def insert_values(conn: ConnectionPlus,
     return c.lastrowid
 
 
+@functools.lru_cache(maxsize=None)
+def _get_max_variable_number() -> int:
+    """
+    The maximal number of values that can be inserted with a single
+    compound INSERT statement for the version of SQLite in use.
+    """
+    # Version check cf.
+    # "https://stackoverflow.com/questions/9527851/sqlite-error-
+    #  too-many-terms-in-compound-select"
+    version = SQLiteSettings.settings['VERSION']
+
+    # According to the SQLite changelog, the version number
+    # to check against below
+    # ought to be 3.7.11, but that fails on Travis
+    if LooseVersion(str(version)) <= LooseVersion('3.8.2'):
+        max_var = SQLiteSettings.limits['MAX_COMPOUND_SELECT']
+    else:
+        max_var = SQLiteSettings.limits['MAX_VARIABLE_NUMBER']
+    return int(max_var)
+
+
+# A compound statement for the maximal number of variables is about 100 kB
+# of text, so the cache is bounded by the total length of the statements as
+# well as by their number.
+_MAX_CACHED_INSERT_STATEMENTS = 256
+_MAX_CACHED_INSERT_STATEMENTS_LENGTH = 2 ** 20
+
+
+def _get_insert_statement(conn: ConnectionPlus,
+                          formatted_name: str,
+                          columns: Sequence[str],
+                          n_rows: int) -> str:
+    """
+    Get the statement inserting ``n_rows`` rows of values into the given
+    columns of a table. The statements are cached on the connection such
+    that the SQL text is only built once per table, columns and number of
+    rows. Passing the exact same text also lets sqlite3 reuse its compiled
+    statement.
+    """
+    cache = conn.insert_statement_cache
+    key = (formatted_name, tuple(columns), n_rows)
+    statement = cache.get(key)
+    if statement is None:
+        _columns = ",".join(columns)
+        _values = "(" + ",".join(["?"] * len(columns)) + ")"
+        _values_x_params = ",".join([_values] * n_rows)
+        statement = f"""INSERT INTO "{formatted_name}"
+                        ({_columns})
+                        VALUES
+                        {_values_x_params}
+                     """
+        # statements are only added on a cache miss, so summing up the
+        # length of the cached statements here is cheap
+        cached_length = sum(len(cached) for cached in cache.values())
+        if (len(cache) >= _MAX_CACHED_INSERT_STATEMENTS
+                or cached_length + len(statement)
+                > _MAX_CACHED_INSERT_STATEMENTS_LENGTH):
+            cache.clear()
+        cache[key] = statement
+    return statement
+
+
 def insert_many_values(conn: ConnectionPlus,
                        formatted_name: str,
                        columns: Sequence[str],
@@ -157,6 +221,12 @@ def insert_many_values(conn: ConnectionPlus,
     """
     Inserts many values for the specified columns.
 
+    By default the rows are inserted in chunks with compound
+    ``INSERT ... VALUES (?,?),(?,?),...`` statements holding as many values
+    as SQLite allows. If ``dataset.insert_method`` is set to
+    ``executemany`` in the config, the rows are instead passed to
+    ``cursor.executemany`` with a single row statement.
+
     Example input:
     columns: ['xparam', 'yparam']
     values: [[x1, y1], [x2, y2], [x3, y3]]
@@ -172,25 +242,18 @@ def insert_many_values(conn: ConnectionPlus,
     no_of_rows = len(lengths)
     no_of_columns = lengths[0]
 
+    if qcodes.config.dataset.insert_method == 'executemany':
+        query = _get_insert_statement(conn, formatted_name, columns, 1)
+        with atomic(conn) as conn:
+            c = conn.cursor()
+            c.execute(query, values[0])
+            return_value = c.lastrowid
+            c.executemany(query, values[1:])
+        return return_value
+
     # The TOTAL number of inserted values in one query
     # must be less than the SQLITE_MAX_VARIABLE_NUMBER
-
-    # Version check cf.
-    # "https://stackoverflow.com/questions/9527851/sqlite-error-
-    #  too-many-terms-in-compound-select"
-    version = SQLiteSettings.settings['VERSION']
-
-    # According to the SQLite changelog, the version number
-    # to check against below
-    # ought to be 3.7.11, but that fails on Travis
-    if LooseVersion(str(version)) <= LooseVersion('3.8.2'):
-        max_var = SQLiteSettings.limits['MAX_COMPOUND_SELECT']
-    else:
-        max_var = SQLiteSettings.limits['MAX_VARIABLE_NUMBER']
-    rows_per_transaction = int(int(max_var)/no_of_columns)
-
-    _columns = ",".join(columns)
-    _values = "(" + ",".join(["?"] * len(values[0])) + ")"
+    rows_per_transaction = int(_get_max_variable_number()/no_of_columns)
 
     a, b = divmod(no_of_rows, rows_per_transaction)
     chunks = a*[rows_per_transaction] + [b]
@@ -202,13 +265,8 @@ def insert_many_values(conn: ConnectionPlus,
 
     with atomic(conn) as conn:
         for ii, chunk in enumerate(chunks):
-            _values_x_params = ",".join([_values] * chunk)
-
-            query = f"""INSERT INTO "{formatted_name}"
-                        ({_columns})
-                        VALUES
-                        {_values_x_params}
-                     """
+            query = _get_insert_statement(conn, formatted_name, columns,
+                                          chunk)
             stop += chunk
             # we need to make values a flat list from a list of list
             flattened_values = list(
@@ -223,6 +281,38 @@ def insert_many_values(conn: ConnectionPlus,
     return return_value
 
 
+def insert_many_columns(conn: ConnectionPlus,
+                        formatted_name: str,
+                        columns: Sequence[str],
+                        values: Sequence[ndarray],
+                        ) -> None:
+    """
+    Inserts many values for the specified columns where the values are
+    given column wise as one dimensional numpy arrays of equal length.
+    This avoids building an intermediate python object per row; the
+    rows are handed to ``executemany`` as an iterator over the columns.
+
+    Example input:
+    columns: ['xparam', 'yparam']
+    values: [np.array([x1, x2, x3]), np.array([y1, y2, y3])]
+
+    NOTE this need to be committed before closing the connection.
+    """
+    lengths = [len(val) for val in values]
+    if len(set(lengths)) > 1:
+        raise ValueError('Wrong input format for values. Must specify the '
+                         'same number of values for all columns. Received'
+                         f' lengths {lengths}.')
+
+    query = _get_insert_statement(conn, formatted_name, columns, 1)
+    # tolist converts to python scalars in C which is significantly faster
+    # than letting sqlite3 look up the adapter for each numpy scalar
+    rows = zip(*(column.tolist() for column in values))
+
+    with atomic(conn) as conn:
+        conn.cursor().executemany(query, rows)
+
+
 @deprecate('Unused private method to be removed in a future version')
 def modify_values(conn: ConnectionPlus,
                   formatted_name: str,
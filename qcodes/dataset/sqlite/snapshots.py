@@ -0,0 +1,235 @@
+"""
+Content-addressed storage of the snapshots of runs.
+
+The snapshots of consecutive runs are mostly identical. Instead of storing
+the JSON of every snapshot in the snapshot column of the runs table, the
+store keeps every distinct snapshot once in the snapshot_blobs table, keyed
+by the SHA-256 hash of its JSON and compressed with one of the array codecs.
+The run_snapshots table maps every run to the hash of its snapshot.
+
+With deltas, a snapshot that differs from the previously stored one is
+stored as a JSON patch (RFC 6902) against the last snapshot that was stored
+whole, such that reading a snapshot takes at most one patch to apply. A
+snapshot is stored whole again once a given number of patches refer to the
+same snapshot or the patch would not be smaller than the snapshot. A patch
+is only stored if applying it reproduces the JSON of the snapshot exactly.
+
+The tables are added by the upgrade of the database to version 12. Note
+that QCoDeS versions without the store do not see the snapshots of runs
+stored in it.
+"""
+import hashlib
+import json
+import sqlite3
+import warnings
+from typing import Any, Dict, List, Optional, Union
+
+from qcodes.dataset.sqlite.connection import (ConnectionPlus, atomic,
+                                              transaction)
+from qcodes.dataset.sqlite.database import (_ARRAY_CODECS,
+                                            _ARRAY_CODECS_AVAILABLE,
+                                            _compress, _decompress)
+
+SNAPSHOT_STORAGE_MODES = ('inline', 'deduplicated', 'delta')
+
+_JSONPatch = List[Dict[str, Any]]
+
+
+def store_snapshot(conn: ConnectionPlus,
+                   run_id: int,
+                   snapshot: str,
+                   delta: bool = False,
+                   compression: str = 'zlib',
+                   max_deltas: int = 100) -> None:
+    """
+    Store the snapshot of a run in the snapshot store, replacing a snapshot
+    the run already has.
+
+    Args:
+        conn: connection to the database
+        run_id: id of the run
+        snapshot: the JSON of the snapshot
+        delta: whether the snapshot may be stored as a patch against the
+            last snapshot stored whole
+        compression: name of the array codec to compress the snapshot with.
+            If the codec is not installed, zlib is used instead.
+        max_deltas: the maximal number of snapshots stored as patches
+            against the same snapshot
+    """
+    digest = hashlib.sha256(snapshot.encode('utf-8')).hexdigest()
+    codec = _get_codec(compression)
+    with atomic(conn) as conn:
+        known = transaction(conn,
+                            "SELECT 1 FROM snapshot_blobs WHERE hash = ?",
+                            digest).fetchone()
+        if known is None:
+            base_hash: Optional[str] = None
+            n_delta = 0
+            data = snapshot
+            if delta:
+                last = transaction(
+                    conn,
+                    "SELECT snapshot_blobs.hash, snapshot_blobs.base_hash, "
+                    "snapshot_blobs.n_delta "
+                    "FROM run_snapshots JOIN snapshot_blobs "
+                    "ON run_snapshots.hash = snapshot_blobs.hash "
+                    "ORDER BY run_snapshots.run_id DESC LIMIT 1").fetchone()
+                if last is not None and last['n_delta'] < max_deltas:
+                    base = last['base_hash'] or last['hash']
+                    patch = _make_patch(_read_blob(conn, base), snapshot)
+                    if patch is not None:
+                        base_hash = base
+                        n_delta = last['n_delta'] + 1
+                        data = patch
+            transaction(conn,
+                        "INSERT INTO snapshot_blobs "
+                        "(hash, base_hash, n_delta, codec, data) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        digest, base_hash, n_delta, codec,
+                        sqlite3.Binary(_compress(data.encode('utf-8'),
+                                                 codec)))
+        transaction(conn,
+                    "INSERT OR REPLACE INTO run_snapshots (run_id, hash) "
+                    "VALUES (?, ?)", run_id, digest)
+        transaction(conn, "UPDATE runs SET snapshot = NULL WHERE run_id = ?",
+                    run_id)
+
+
+def get_stored_snapshot(conn: ConnectionPlus, run_id: int) -> Optional[str]:
+    """
+    Get the JSON of the snapshot of a run from the snapshot store, or None
+    if the run has no snapshot in the store.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT snapshot_blobs.base_hash, "
+                       "snapshot_blobs.codec, snapshot_blobs.data "
+                       "FROM run_snapshots JOIN snapshot_blobs "
+                       "ON run_snapshots.hash = snapshot_blobs.hash "
+                       "WHERE run_snapshots.run_id = ?", (run_id,))
+    except sqlite3.OperationalError as e:
+        # databases before version 12 have no snapshot store
+        if "no such table: run_snapshots" not in str(e):
+            raise
+        return None
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    text = _decompress(row['data'], row['codec']).decode('utf-8')
+    if row['base_hash'] is None:
+        return text
+    base = json.loads(_read_blob(conn, row['base_hash']))
+    return json.dumps(_apply_patch(base, json.loads(text)))
+
+
+def _get_codec(compression: str) -> int:
+    try:
+        codec = _ARRAY_CODECS[compression]
+    except KeyError:
+        raise RuntimeError(f"Invalid snapshot compression {compression}. "
+                           f"Valid codecs are {list(_ARRAY_CODECS)}")
+    if not _ARRAY_CODECS_AVAILABLE[codec]:
+        warnings.warn(f"Snapshot compression codec {compression} is not "
+                      f"available, falling back to zlib.")
+        codec = _ARRAY_CODECS['zlib']
+    return codec
+
+
+def _read_blob(conn: ConnectionPlus, digest: str) -> str:
+    # only used for snapshots stored whole
+    cursor = conn.cursor()
+    cursor.execute("SELECT codec, data FROM snapshot_blobs WHERE hash = ?",
+                   (digest,))
+    row = cursor.fetchone()
+    if row is None:
+        raise RuntimeError(f"Snapshot {digest} is missing from the snapshot "
+                           f"store")
+    return _decompress(row['data'], row['codec']).decode('utf-8')
+
+
+def _make_patch(base_snapshot: str, snapshot: str) -> Optional[str]:
+    """
+    Make the JSON of a patch that turns the base snapshot into the given
+    snapshot. Returns None if the patch would not be smaller than the
+    snapshot or if applying it does not reproduce the JSON of the snapshot
+    exactly, e.g. since it was not made by ``json.dumps`` with default
+    arguments.
+    """
+    try:
+        new = json.loads(snapshot)
+    except ValueError:
+        return None
+    base = json.loads(base_snapshot)
+    ops = _diff(base, new, '')
+    patch = json.dumps(ops)
+    if len(patch) >= len(snapshot):
+        return None
+    # the values of the operations are parsed JSON already, hence the
+    # operations can be applied without parsing the patch
+    if json.dumps(_apply_patch(base, ops)) != snapshot:
+        return None
+    return patch
+
+
+def _escape(key: str) -> str:
+    return key.replace('~', '~0').replace('/', '~1')
+
+
+def _equal(old: Any, new: Any) -> bool:
+    # Nested values such as 1 and 1.0 compare equal although their JSON
+    # differs, the patch is then rejected when it is verified.
+    return type(old) is type(new) and old == new
+
+
+def _diff(old: Any, new: Any, path: str) -> _JSONPatch:
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: _JSONPatch = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'remove', 'path': f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({'op': 'add', 'path': f"{path}/{_escape(key)}",
+                            'value': value})
+            elif not _equal(old[key], value):
+                ops.extend(_diff(old[key], value, f"{path}/{_escape(key)}"))
+        return ops
+    if (isinstance(old, list) and isinstance(new, list)
+            and len(old) == len(new)):
+        ops = []
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            if not _equal(old_item, new_item):
+                ops.extend(_diff(old_item, new_item, f"{path}/{index}"))
+        return ops
+    if _equal(old, new):
+        return []
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+
+def _apply_patch(document: Any, patch: _JSONPatch) -> Any:
+    """
+    Apply the add, remove and replace operations of a JSON patch, as made
+    by ``_diff``, in place. Returns the patched document, which is a new
+    object if the whole document is replaced.
+    """
+    for op in patch:
+        if op['path'] == '':
+            document = op['value']
+            continue
+        container = document
+        tokens = op['path'].split('/')
+        for index, token in enumerate(tokens[1:], 1):
+            if isinstance(container, list):
+                key: Union[str, int] = int(token)
+            elif '~' in token:
+                key = token.replace('~1', '/').replace('~0', '~')
+            else:
+                key = token
+            if index == len(tokens) - 1:
+                if op['op'] == 'remove':
+                    del container[key]
+                else:
+                    container[key] = op['value']
+            else:
+                container = container[key]
+    return document
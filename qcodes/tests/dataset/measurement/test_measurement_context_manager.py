@@ -461,8 +461,8 @@ def test_subscriptions(experiment, DAC, DMM):
             datasaver.add_result((DAC.ch1, dac_val), (DMM.v1, dmm_val))
 
             # Ensure that data is flushed to the database despite the write
-            # period, so that the database triggers are executed, which in turn
-            # add data to the queues within the subscribers
+            # period, so that the results are written and in turn published
+            # to the queues within the subscribers
             datasaver.flush_data_to_database()
 
             # In order to make this test deterministic, we need to ensure that
@@ -471,11 +471,9 @@ def test_subscriptions(experiment, DAC, DMM):
             # subscriber constructor) has been updated by the corresponding
             # subscriber's callback function. At the moment, there is no robust
             # way to ensure this. The reason is that the subscribers have
-            # internal queue which is populated via a trigger call from the SQL
-            # database, hence from this "main" thread it is difficult to say
-            # whether the queue is empty because the subscriber callbacks have
-            # already been executed or because the triggers of the SQL database
-            # has not been executed yet.
+            # internal queue which is processed in a separate thread, hence
+            # from this "main" thread it is difficult to say whether the
+            # subscriber callbacks have already been executed.
             #
             # In order to overcome this problem, a special decorator is used to
             # wrap the assertions. This is going to ensure that some time is
@@ -7,9 +7,17 @@ import pytest
 from hypothesis import HealthCheck, given, settings
 from string import ascii_uppercase
 
+import qcodes as qc
+from qcodes.dataset.data_set import new_data_set
+from qcodes.dataset.data_set_cache import (
+    _append_to_buffer, load_new_data_from_db_and_append)
+from qcodes.dataset.descriptions.dependencies import InterDependencies_
+from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 from qcodes.dataset.measurements import Measurement
+from qcodes.dataset.sqlite.connection import atomic_transaction
 from qcodes.instrument.parameter import expand_setpoints_helper
 from qcodes.dataset.descriptions.detect_shapes import detect_shape_of_measurement
+from qcodes.tests.common import reset_config_on_exit
 
 
 @pytest.mark.parametrize("bg_writing", [True, False])
@@ -601,6 +609,104 @@ def test_cache_2d_shape(experiment,
                                            clip=cache_size == "too_large")
 
 
+
+@pytest.mark.usefixtures("experiment")
+@pytest.mark.parametrize("index_parameter_trees", [True, False])
+def test_cache_interleaved_trees_reads_by_rowid(index_parameter_trees):
+    with reset_config_on_exit():
+        qc.config.dataset.index_parameter_trees = index_parameter_trees
+        dataset = new_data_set("dataset")
+        xparam = ParamSpecBase("x", 'numeric')
+        yparam = ParamSpecBase("y", 'numeric')
+        zparam = ParamSpecBase("z", 'numeric')
+        idps = InterDependencies_(
+            dependencies={yparam: (xparam,), zparam: (xparam,)})
+        dataset.set_interdependencies(idps)
+        dataset.mark_started()
+
+        indices = atomic_transaction(
+            dataset.conn,
+            "SELECT name FROM sqlite_master WHERE type='index' "
+            "AND tbl_name=?", dataset.table_name).fetchall()
+        assert len(indices) == (2 if index_parameter_trees else 0)
+
+        for i in range(3):
+            dataset.add_results([{'x': 2 * i, 'y': 2 * i},
+                                 {'x': 2 * i + 1, 'z': -2 * i - 1}])
+            cache_data = dataset.cache.data()
+            _assert_parameter_data_is_identical(
+                dataset.get_parameter_data(), cache_data)
+            assert dataset.cache._read_status == {'y': 2 * i + 2,
+                                                  'z': 2 * i + 2}
+        dataset.mark_completed()
+        dataset.conn.close()
+
+
+@pytest.mark.usefixtures("experiment")
+def test_load_new_data_from_db_and_append_counts_rows():
+    dataset = new_data_set("dataset")
+    xparam = ParamSpecBase("x", 'numeric')
+    yparam = ParamSpecBase("y", 'numeric')
+    zparam = ParamSpecBase("z", 'numeric')
+    idps = InterDependencies_(
+        dependencies={yparam: (xparam,), zparam: (xparam,)})
+    dataset.set_interdependencies(idps)
+    dataset.mark_started()
+
+    write_status = {}
+    read_status = {}
+    data = {}
+    for i in range(3):
+        dataset.add_results([{'x': 2 * i, 'y': 2 * i},
+                             {'x': 2 * i + 1, 'z': -2 * i - 1}])
+        write_status, read_status, data = load_new_data_from_db_and_append(
+            dataset.conn, dataset.table_name, dataset.description,
+            write_status, read_status, data)
+        # the read status is the number of rows read per parameter tree
+        assert read_status == {'y': i + 1, 'z': i + 1}
+        _assert_parameter_data_is_identical(dataset.get_parameter_data(),
+                                            data)
+    dataset.mark_completed()
+
+
+def test_append_to_buffer_reuses_buffer():
+    values = np.arange(3.)
+    buffer = None
+    reallocations = 0
+    for i in range(100):
+        new_values = np.arange(3.) + 3 * (i + 1)
+        old_buffer = buffer
+        values, buffer = _append_to_buffer(values, new_values, buffer)
+        if buffer is not old_buffer:
+            reallocations += 1
+        else:
+            assert np.shares_memory(values, old_buffer)
+    assert_array_equal(values, np.arange(303.))
+    assert reallocations <= 6
+
+
+def test_append_to_buffer_keeps_views_handed_out():
+    values, buffer = _append_to_buffer(np.arange(2.), np.arange(2., 4.),
+                                       None)
+    old_values = values
+    values, new_buffer = _append_to_buffer(values, np.arange(4., 6.), buffer)
+    assert new_buffer is buffer
+    assert_array_equal(old_values, np.arange(4.))
+    assert_array_equal(values, np.arange(6.))
+
+
+def test_append_to_buffer_widens_strings():
+    values, buffer = _append_to_buffer(np.array(['a']), np.array(['bb']),
+                                       None)
+    assert buffer.dtype == np.dtype('U2')
+    values, buffer = _append_to_buffer(values, np.array(['ccc']), buffer)
+    assert buffer.dtype == np.dtype('U4')
+    values, new_buffer = _append_to_buffer(values, np.array(['dddd']),
+                                           buffer)
+    assert new_buffer is buffer
+    assert_array_equal(values, np.array(['a', 'bb', 'ccc', 'dddd']))
+
+
 def _assert_completed_cache_is_as_expected(
         cache_data_trees,
         param_data_trees,
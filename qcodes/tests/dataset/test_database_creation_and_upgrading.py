@@ -1,9 +1,12 @@
 import json
 import logging
 import os
+import sqlite3
 from contextlib import contextmanager
 from copy import deepcopy
+from unittest.mock import patch
 
+import numpy as np
 import pytest
 
 import qcodes as qc
@@ -18,6 +21,7 @@ from qcodes.dataset.descriptions.versioning.v0 import InterDependencies
 from qcodes.dataset.guids import parse_guid
 from qcodes.dataset.sqlite.connection import ConnectionPlus, atomic_transaction
 from qcodes.dataset.sqlite.database import (
+    _ARRAY_ADAPTERS, _ARRAY_CODECS, _adapt_array_binary, _adapt_float,
     connect, get_db_version_and_newest_available_version, initialise_database,
     initialise_or_create_database_at)
 # pylint: disable=unused-import
@@ -33,10 +37,20 @@ from qcodes.dataset.sqlite.db_upgrades import (_latest_available_version,
                                                perform_db_upgrade_6_to_7,
                                                perform_db_upgrade_7_to_8,
                                                perform_db_upgrade_8_to_9,
+                                               perform_db_upgrade_9_to_10,
+                                               perform_db_upgrade_10_to_11,
+                                               perform_db_upgrade_11_to_12,
                                                set_user_version)
-from qcodes.dataset.sqlite.queries import get_run_description, update_GUIDs
+from qcodes.dataset.guids import generate_guid
+from qcodes.dataset.sqlite.queries import (add_meta_data, create_run,
+                                           get_metadata,
+                                           get_metadata_from_run_id,
+                                           get_run_description,
+                                           new_experiment as
+                                           new_experiment_in_db,
+                                           update_GUIDs)
 from qcodes.dataset.sqlite.query_helpers import is_column_in_table, one
-from qcodes.tests.common import error_caused_by
+from qcodes.tests.common import error_caused_by, reset_config_on_exit
 from qcodes.tests.dataset.conftest import temporarily_copied_DB
 
 fixturepath = os.sep.join(qcodes.tests.dataset.__file__.split(os.sep)[:-1])
@@ -77,7 +91,9 @@ def test_tables_exist(empty_temp_db, version):
                    version=version)
     cursor = conn.execute("select sql from sqlite_master"
                           " where type = 'table'")
-    expected_tables = ['experiments', 'runs', 'layouts', 'dependencies']
+    # the empty_temp_db fixture creates a database of the latest version
+    expected_tables = ['experiments', 'runs', 'layouts', 'dependencies',
+                       'run_metadata', 'snapshot_blobs', 'run_snapshots']
     rows = [row for row in cursor]
     assert len(rows) == len(expected_tables)
     for row, expected_table in zip(rows, expected_tables):
@@ -893,7 +909,7 @@ def test_cannot_connect_to_newer_db():
 
 
 def test_latest_available_version():
-    assert _latest_available_version() == 9
+    assert _latest_available_version() == 12
 
 
 @pytest.mark.parametrize('version', VERSIONS)
@@ -939,3 +955,136 @@ def test_perform_actual_upgrade_8_to_9(db_file):
 
         c = atomic_transaction(conn, index_query)
         assert len(c.fetchall()) == 3
+
+
+def test_perform_upgrade_9_to_10(tmp_path):
+    dbname = str(tmp_path / 'version9.db')
+    conn = connect(dbname, version=9)
+    try:
+        assert get_user_version(conn) == 9
+
+        index_query = "PRAGMA index_list(runs)"
+
+        c = atomic_transaction(conn, index_query)
+        assert len(c.fetchall()) == 3
+
+        perform_db_upgrade_9_to_10(conn)
+
+        assert get_user_version(conn) == 10
+        c = atomic_transaction(conn, index_query)
+        index_names = [row['name'] for row in c.fetchall()]
+        assert len(index_names) == 4
+        assert 'IX_runs_captured_counter' in index_names
+    finally:
+        conn.close()
+
+
+def test_perform_upgrade_10_to_11(tmp_path):
+    dbname = str(tmp_path / 'version10.db')
+    conn = connect(dbname, version=10)
+    try:
+        exp_id = new_experiment_in_db(conn, 'exp', 'sample')
+        _, run_id_1, _ = create_run(conn, exp_id, 'run', generate_guid(),
+                                    metadata={'tag': 1, 'other': 'a'})
+        _, run_id_2, table_name_2 = create_run(conn, exp_id, 'run',
+                                               generate_guid(),
+                                               metadata={'tag': 2})
+        assert is_column_in_table(conn, 'runs', 'tag')
+
+        perform_db_upgrade_10_to_11(conn)
+
+        assert get_user_version(conn) == 11
+        rows = atomic_transaction(
+            conn, "SELECT run_id, tag, value FROM run_metadata "
+                  "ORDER BY run_id, tag").fetchall()
+        assert [tuple(row) for row in rows] == [(run_id_1, 'other', 'a'),
+                                                (run_id_1, 'tag', 1),
+                                                (run_id_2, 'tag', 2)]
+        assert get_metadata_from_run_id(conn, run_id_1) == {'tag': 1,
+                                                            'other': 'a'}
+        assert get_metadata_from_run_id(conn, run_id_2) == {'tag': 2}
+
+        # new tags no longer add columns to the runs table but are
+        # available from the view with the layout of the runs table
+        add_meta_data(conn, run_id_2, {'new_tag': 3.5, 'tag': 4})
+        assert not is_column_in_table(conn, 'runs', 'new_tag')
+        assert get_metadata_from_run_id(conn, run_id_2) == {'tag': 4,
+                                                            'new_tag': 3.5}
+        assert get_metadata(conn, 'new_tag', table_name_2) == 3.5
+        assert get_metadata(conn, 'tag', table_name_2) == 4
+        row = atomic_transaction(
+            conn, "SELECT tag, other, new_tag FROM runs_with_metadata "
+                  "WHERE run_id = ?", run_id_1).fetchone()
+        assert tuple(row) == (1, 'a', None)
+    finally:
+        conn.close()
+
+
+def test_perform_upgrade_11_to_12(tmp_path):
+    dbname = str(tmp_path / 'version11.db')
+    conn = connect(dbname, version=11)
+    try:
+        assert not _is_table_in_db(conn, 'snapshot_blobs')
+        assert not _is_table_in_db(conn, 'run_snapshots')
+
+        perform_db_upgrade_11_to_12(conn)
+
+        assert get_user_version(conn) == 12
+        assert _is_table_in_db(conn, 'snapshot_blobs')
+        assert _is_table_in_db(conn, 'run_snapshots')
+    finally:
+        conn.close()
+
+
+def _is_table_in_db(conn, table_name):
+    cursor = atomic_transaction(
+        conn, "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+        table_name)
+    return cursor.fetchone() is not None
+
+
+def test_connect_skips_initialisation_of_current_db(tmp_path):
+    dbname = str(tmp_path / 'current.db')
+    connect(dbname).close()
+
+    with patch('qcodes.dataset.sqlite.database.init_db') as init_db, \
+            patch('qcodes.dataset.sqlite.database.perform_db_upgrade'
+                  ) as upgrade:
+        conn = connect(dbname)
+        conn.close()
+        init_db.assert_not_called()
+        upgrade.assert_not_called()
+
+        # an empty file still has to be initialised
+        conn = connect(str(tmp_path / 'new.db'))
+        conn.close()
+        init_db.assert_called_once()
+        upgrade.assert_called_once()
+
+
+def test_connect_registers_array_adapter_for_current_config(tmp_path):
+    # the registered adapters are inspected rather than patching
+    # sqlite3.register_adapter, since the static adapters are only
+    # registered once per process and must not be registered with a mock
+    dbname = str(tmp_path / 'current.db')
+    array_key = (np.ndarray, sqlite3.PrepareProtocol)
+    with reset_config_on_exit():
+        qc.config.dataset.array_compression = 'zlib'
+        connect(dbname).close()
+        adapter = sqlite3.adapters[array_key]
+        assert adapter.func is _adapt_array_binary
+        assert adapter.keywords == {'codec': _ARRAY_CODECS['zlib']}
+        assert sqlite3.adapters[(np.float64,
+                                 sqlite3.PrepareProtocol)] is _adapt_float
+
+        # nothing changed so nothing is registered again
+        connect(dbname).close()
+        assert sqlite3.adapters[array_key] is adapter
+
+        # the array adapter follows the config
+        qc.config.dataset.array_compression = 'none'
+        connect(dbname).close()
+        assert sqlite3.adapters[array_key] is \
+            _ARRAY_ADAPTERS[qc.config.dataset.array_format]
+    # restore the array adapter of the default config
+    connect(dbname).close()
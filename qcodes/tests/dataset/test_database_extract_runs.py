@@ -4,7 +4,9 @@ import re
 import os
 from pathlib import Path
 import random
+import sqlite3
 import uuid
+from unittest.mock import patch
 
 import pytest
 import numpy as np
@@ -18,13 +20,17 @@ from qcodes.dataset.data_set import (DataSet, load_by_guid, load_by_counter,
                                      generate_dataset_table)
 from qcodes.dataset.sqlite.database import get_db_version_and_newest_available_version
 from qcodes.dataset.sqlite.connection import path_to_dbfile
-from qcodes.dataset.database_extract_runs import extract_runs_into_db
+from qcodes.dataset.sqlite.database import connect
+from qcodes.dataset.database_extract_runs import (extract_runs_into_db,
+                                                  merge_databases)
 from qcodes.dataset.sqlite.queries import get_experiments
 from qcodes.tests.common import error_caused_by
 from qcodes.dataset.measurements import Measurement
 from qcodes import Station
 from qcodes.tests.instrument_mocks import DummyInstrument
 from qcodes.dataset.linked_datasets.links import Link
+from qcodes.dataset.descriptions.dependencies import InterDependencies_
+from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 
 
 @contextmanager
@@ -749,6 +755,53 @@ def test_integration_station_and_measurement(two_empty_temp_db_connections,
     assert datasaver.dataset.the_same_dataset_as(target_ds)
 
 
+@pytest.mark.parametrize('attach', [True, False])
+def test_extraction_of_several_runs(two_empty_temp_db_connections,
+                                    some_interdeps, attach, capsys):
+    """
+    Test that the results are copied both by SQLite from the attached source
+    DB and in batches if the source DB can not be attached
+    """
+    source_conn, target_conn = two_empty_temp_db_connections
+
+    source_path = path_to_dbfile(source_conn)
+    target_path = path_to_dbfile(target_conn)
+
+    source_exp = Experiment(conn=source_conn)
+    source_datasets = [DataSet(conn=source_conn, exp_id=source_exp.exp_id)
+                       for _ in range(3)]
+    for i, ds in enumerate(source_datasets):
+        ds.set_interdependencies(some_interdeps[1])
+        ds.mark_started()
+        ds.add_results([{name: float(i * value)
+                         for name in some_interdeps[1].names}
+                        for value in range(20)])
+        ds.mark_completed()
+
+    run_ids = [ds.run_id for ds in source_datasets]
+    if attach:
+        extract_runs_into_db(source_path, target_path, *run_ids,
+                             show_progress=True)
+    else:
+        with patch('qcodes.dataset.database_extract_runs._attach_source_db',
+                   return_value=None), \
+                patch('qcodes.dataset.database_extract_runs._COPY_BATCH_SIZE',
+                      7):
+            extract_runs_into_db(source_path, target_path, *run_ids,
+                                 show_progress=True)
+    assert 'Extracting runs' in capsys.readouterr().out
+
+    for source_ds in source_datasets:
+        target_ds = load_by_guid(source_ds.guid, conn=target_conn)
+        assert source_ds.the_same_dataset_as(target_ds)
+        source_data = source_ds.get_parameter_data()
+        target_data = target_ds.get_parameter_data()
+        for outkey, outval in source_data.items():
+            for inkey, inval in outval.items():
+                np.testing.assert_array_equal(inval,
+                                              target_data[outkey][inkey])
+
+
 def test_atomicity(two_empty_temp_db_connections, some_interdeps):
     """
     Test the atomicity of the transaction by extracting and inserting two
@@ -828,3 +881,123 @@ def test_column_mismatch(two_empty_temp_db_connections, some_interdeps, inst):
     target_copied_ds = DataSet(conn=target_conn, run_id=2)
 
     assert target_copied_ds.the_same_dataset_as(source_ds)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_merge_databases(two_empty_temp_db_connections, some_interdeps,
+                         tmp_path, workers):
+    """
+    Test that the runs of several DBs are merged into one and that runs
+    present in more than one DB are only inserted once
+    """
+    source_conn, other_source_conn = two_empty_temp_db_connections
+    source_path = path_to_dbfile(source_conn)
+    other_source_path = path_to_dbfile(other_source_conn)
+    target_path = str(tmp_path / 'merged.db')
+
+    source_datasets = []
+    for conn in (source_conn, other_source_conn):
+        exp = Experiment(conn=conn, name='merge_exp', sample_name='sample')
+        for i in range(2):
+            ds = DataSet(conn=conn, exp_id=exp.exp_id)
+            ds.set_interdependencies(some_interdeps[1])
+            ds.mark_started()
+            ds.add_results([{name: float(i * value)
+                             for name in some_interdeps[1].names}
+                            for value in range(5)])
+            ds.mark_completed()
+            source_datasets.append(ds)
+    incomplete_ds = DataSet(conn=source_conn, exp_id=1)
+    incomplete_ds.set_interdependencies(some_interdeps[1])
+    incomplete_ds.mark_started()
+
+    # a run that is contained in both source DBs
+    extract_runs_into_db(source_path, other_source_path,
+                         source_datasets[0].run_id)
+
+    with pytest.warns(UserWarning, match='Skipping the incomplete run'):
+        merge_databases([source_path, other_source_path], target_path,
+                        workers=workers, chunk_rows=2)
+
+    target_conn = connect(target_path)
+    try:
+        # the experiments differ by their start time
+        assert len(get_experiments(target_conn)) == 2
+        target_guids = [row['guid'] for row in
+                        target_conn.execute('SELECT guid FROM runs')]
+        assert sorted(target_guids) == sorted(ds.guid
+                                              for ds in source_datasets)
+        for source_ds in source_datasets:
+            target_ds = load_by_guid(source_ds.guid, conn=target_conn)
+            assert source_ds.the_same_dataset_as(target_ds)
+            assert target_ds.captured_run_id == source_ds.captured_run_id
+            assert target_ds.captured_counter == source_ds.captured_counter
+            source_data = source_ds.get_parameter_data()
+            target_data = target_ds.get_parameter_data()
+            for outkey, outval in source_data.items():
+                for inkey, inval in outval.items():
+                    np.testing.assert_array_equal(inval,
+                                                  target_data[outkey][inkey])
+
+        # merging again is a NOOP
+        with raise_if_file_changed(target_path):
+            merge_databases([source_path, other_source_path], target_path,
+                            workers=workers)
+    finally:
+        target_conn.close()
+
+
+def test_merge_databases_copies_results_unchanged(
+        two_empty_temp_db_connections, tmp_path):
+    """
+    Test that the results are copied byte for byte, in particular that NaN
+    in numeric and array columns survives the merge
+    """
+    source_conn, _ = two_empty_temp_db_connections
+    source_path = path_to_dbfile(source_conn)
+    target_path = str(tmp_path / 'merged.db')
+
+    x = ParamSpecBase('x', 'numeric')
+    y = ParamSpecBase('y', 'numeric')
+    z = ParamSpecBase('z', 'array')
+    interdeps = InterDependencies_(dependencies={y: (x,), z: (x,)})
+
+    exp = Experiment(conn=source_conn, name='merge_exp',
+                     sample_name='sample')
+    source_ds = DataSet(conn=source_conn, exp_id=exp.exp_id)
+    source_ds.set_interdependencies(interdeps)
+    source_ds.mark_started()
+    source_ds.add_results([{'x': np.float64(value),
+                            'y': np.float64(np.nan if value == 1 else value),
+                            'z': np.array([value, np.nan])}
+                           for value in range(3)])
+    source_ds.mark_completed()
+
+    merge_databases([source_path], target_path)
+
+    target_conn = connect(target_path)
+    try:
+        target_ds = load_by_guid(source_ds.guid, conn=target_conn)
+        target_data = target_ds.get_parameter_data()
+        assert np.isnan(target_data['y']['y'][1])
+        assert np.isnan(target_data['z']['z']).sum() == 3
+        np.testing.assert_array_equal(target_data['y']['y'],
+                                      [0.0, np.nan, 2.0])
+
+        # the raw values, e.g. NaN stored as 'nan' and the array blobs, are
+        # the same in both DBs
+        query = 'SELECT x, y, z FROM "{}" ORDER BY id'
+        raw_source = sqlite3.connect(source_path)
+        raw_target = sqlite3.connect(target_path)
+        try:
+            source_rows = raw_source.execute(
+                query.format(source_ds.table_name)).fetchall()
+            target_rows = raw_target.execute(
+                query.format(target_ds.table_name)).fetchall()
+        finally:
+            raw_source.close()
+            raw_target.close()
+        assert source_rows[1][1] == 'nan'
+        assert target_rows == source_rows
+    finally:
+        target_conn.close()
@@ -1,13 +1,18 @@
 import re
+from queue import Queue
 
 import pytest
 import numpy as np
 from hypothesis import given, strategies as hst
 
 import qcodes as qc
+from qcodes.dataset.data_set import (_get_batch_from_queue,
+                                     _shutdown_writer_processes)
 from qcodes.dataset.measurements import DataSaver
 from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 from qcodes.dataset.descriptions.dependencies import InterDependencies_
+from qcodes.dataset.sqlite.database import initialise_or_create_database_at
+from qcodes.tests.common import reset_config_on_exit
 
 CALLBACK_COUNT = 0
 CALLBACK_RUN_ID = None
@@ -128,3 +133,334 @@ def test_saving_numeric_values_as_text(numeric_type, bg_writing):
     finally:
         data_saver.dataset.mark_completed()
         data_saver.dataset.conn.close()
+
+
+@pytest.mark.usefixtures("experiment")
+@pytest.mark.parametrize("bg_writing", [True, False, "process"])
+def test_numeric_arrays_and_scalars_keep_order(bg_writing):
+    """
+    Test that array valued numeric results, which are written column wise,
+    and scalar results for the same parameter tree end up in the database
+    in the order they were added
+    """
+    x = ParamSpecBase("x", "numeric")
+    y = ParamSpecBase("y", "numeric")
+    z = ParamSpecBase("z", "numeric")
+    idps = InterDependencies_(dependencies={y: (x,)}, standalones=(z,))
+
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started(start_bg_writer=bg_writing)
+
+    data_saver = DataSaver(
+        dataset=test_set, write_period=0, interdeps=idps)
+
+    data_saver.add_result(("x", 0), ("y", 10))
+    data_saver.add_result(("x", np.arange(1, 4)), ("y", np.arange(11, 14)))
+    data_saver.add_result(("x", 4), ("y", 14))
+    # scalar setpoints are replicated
+    data_saver.add_result(("x", 5), ("y", np.array([15, 15])))
+    data_saver.add_result(("z", np.array([1.5, 2.5])))
+
+    data_saver.flush_data_to_database(block=True)
+    test_set.mark_completed()
+
+    data = test_set.get_parameter_data()
+    np.testing.assert_array_equal(data["y"]["x"],
+                                  np.array([0, 1, 2, 3, 4, 5, 5]))
+    np.testing.assert_array_equal(data["y"]["y"],
+                                  np.array([10, 11, 12, 13, 14, 15, 15]))
+    np.testing.assert_array_equal(data["z"]["z"], np.array([1.5, 2.5]))
+    assert data_saver._dataset._results == []
+    test_set.conn.close()
+
+
+@pytest.mark.usefixtures("experiment")
+def test_result_plan_reused_until_parameters_change():
+    x = ParamSpecBase("x", "numeric")
+    y = ParamSpecBase("y", "numeric")
+    z = ParamSpecBase("z", "text")
+    idps = InterDependencies_(dependencies={y: (x,)}, standalones=(z,))
+
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started()
+
+    data_saver = DataSaver(
+        dataset=test_set, write_period=0, interdeps=idps)
+
+    data_saver.add_result(("x", 0), ("y", 10))
+    plan = data_saver._result_plan
+    assert plan is not None
+    data_saver.add_result(("x", 1), ("y", 11))
+    assert data_saver._result_plan is plan
+
+    # the values are still validated with every result
+    with pytest.raises(ValueError, match="Incompatible shapes"):
+        data_saver.add_result(("x", np.arange(2)), ("y", np.arange(3)))
+    with pytest.raises(ValueError, match='is of type "numeric"'):
+        data_saver.add_result(("x", 2), ("y", "twelve"))
+    assert data_saver._result_plan is plan
+
+    data_saver.add_result(("z", "a"))
+    assert data_saver._result_plan is not plan
+
+    with pytest.raises(ValueError, match="some required parameters are "
+                                         "missing"):
+        data_saver.add_result(("y", 12))
+    with pytest.raises(ValueError, match="no such parameter registered"):
+        data_saver.add_result(("x", 2), ("w", 12))
+
+    data_saver.add_result(("x", 2), ("y", 12))
+    data_saver.flush_data_to_database()
+    test_set.mark_completed()
+
+    data = test_set.get_parameter_data()
+    np.testing.assert_array_equal(data["y"]["x"], np.array([0, 1, 2]))
+    np.testing.assert_array_equal(data["y"]["y"], np.array([10, 11, 12]))
+    np.testing.assert_array_equal(data["z"]["z"], np.array(["a"]))
+    test_set.conn.close()
+
+
+@pytest.mark.usefixtures("experiment")
+@pytest.mark.parametrize("bg_writing", [True, False])
+def test_numeric_arrays_with_nan(bg_writing):
+    """
+    Test that NaN in array valued numeric results, which are written
+    column wise, is stored as 'nan' and read back as NaN
+    """
+    x = ParamSpecBase("x", "numeric")
+    y = ParamSpecBase("y", "numeric")
+    idps = InterDependencies_(dependencies={y: (x,)})
+
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started(start_bg_writer=bg_writing)
+
+    data_saver = DataSaver(
+        dataset=test_set, write_period=0, interdeps=idps)
+
+    data_saver.add_result(("x", np.arange(3.0)),
+                          ("y", np.array([1.5, np.nan, 2.5])))
+
+    data_saver.flush_data_to_database(block=True)
+    test_set.mark_completed()
+
+    # sqlite stores a float NaN as NULL
+    stored = test_set.conn.execute(
+        f'SELECT typeof(y), CAST(y AS TEXT) FROM "{test_set.table_name}" '
+        f'ORDER BY id').fetchall()
+    assert [tuple(row) for row in stored] == [("real", "1.5"),
+                                              ("text", "nan"),
+                                              ("real", "2.5")]
+    data = test_set.get_parameter_data()
+    np.testing.assert_array_equal(data["y"]["y"],
+                                  np.array([1.5, np.nan, 2.5]))
+    test_set.conn.close()
+
+
+@pytest.mark.usefixtures("experiment")
+@pytest.mark.parametrize("bg_writing", [True, False, "process"])
+def test_add_results_block(bg_writing):
+    x = ParamSpecBase("x", "numeric")
+    y = ParamSpecBase("y", "numeric")
+    z = ParamSpecBase("z", "complex")
+    a = ParamSpecBase("a", "array")
+    idps = InterDependencies_(dependencies={y: (x,)}, standalones=(z, a))
+
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started(start_bg_writer=bg_writing)
+
+    data_saver = DataSaver(
+        dataset=test_set, write_period=0, interdeps=idps)
+
+    data_saver.add_result(("x", 0), ("y", 10))
+    data_saver.add_results_block({"x": np.arange(1, 4),
+                                  "y": np.arange(11, 14),
+                                  "z": np.array([1j, 2j])})
+    # scalar setpoints are used for every point
+    data_saver.add_results_block({"x": 4, "y": np.array([14, 15])})
+
+    with pytest.raises(ValueError, match="Incompatible shapes"):
+        data_saver.add_results_block({"x": np.arange(2),
+                                      "y": np.arange(3)})
+    with pytest.raises(ValueError, match="some required parameters are "
+                                         "missing"):
+        data_saver.add_results_block({"y": np.arange(3)})
+    with pytest.raises(ValueError, match='is of type "numeric"'):
+        data_saver.add_results_block({"x": np.arange(2),
+                                      "y": np.array(["a", "b"])})
+    with pytest.raises(ValueError, match="use add_result instead"):
+        data_saver.add_results_block({"a": np.ones((2, 3))})
+
+    data_saver.flush_data_to_database(block=True)
+    test_set.mark_completed()
+
+    data = test_set.get_parameter_data()
+    np.testing.assert_array_equal(data["y"]["x"],
+                                  np.array([0, 1, 2, 3, 4, 4]))
+    np.testing.assert_array_equal(data["y"]["y"],
+                                  np.array([10, 11, 12, 13, 14, 15]))
+    np.testing.assert_array_equal(data["z"]["z"], np.array([1j, 2j]))
+    assert data_saver._dataset._results == []
+    test_set.conn.close()
+
+
+@pytest.mark.usefixtures("experiment")
+@pytest.mark.parametrize("bg_writing, message",
+                         [(True, "background writer failed"),
+                          ("process", "background writer process failed")])
+def test_background_writer_errors_are_raised(bg_writing, message):
+    x = ParamSpecBase("x", "numeric")
+    y = ParamSpecBase("y", "numeric")
+    idps = InterDependencies_(dependencies={y: (x,)})
+
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started(start_bg_writer=bg_writing)
+
+    test_set.add_results([{"x": 0, "y": 1}])
+    # more failing results than fit in the queue must not block
+    for _ in range(qc.config.dataset.write_queue_size + 1):
+        test_set.add_results([{"x": 1, "not_a_column": 2}])
+
+    with pytest.raises(RuntimeError, match=message):
+        test_set.mark_completed()
+    # the dataset is finalized and the results added before the error
+    # were written
+    assert test_set._writer_status.write_in_background is None
+    np.testing.assert_array_equal(test_set.get_parameter_data()["y"]["y"],
+                                  np.array([1]))
+    test_set.conn.close()
+
+
+@pytest.mark.usefixtures("experiment")
+def test_writer_process_is_kept_and_uses_current_config():
+    """
+    Test that the writer process is reused for consecutive runs and writes
+    with the config of the measurement process at the start of each run
+    """
+    x = ParamSpecBase("x", "numeric")
+    y = ParamSpecBase("y", "array")
+    idps = InterDependencies_(dependencies={y: (x,)})
+
+    writers = []
+    raw_arrays = []
+    with reset_config_on_exit():
+        for array_format in ("binary", "npy"):
+            qc.config.dataset.array_format = array_format
+            test_set = qc.new_data_set("test-dataset")
+            test_set.set_interdependencies(idps)
+            test_set.mark_started(start_bg_writer="process")
+            test_set.add_results([{"x": 0, "y": np.arange(3.0)}])
+            test_set.mark_completed()
+            writers.append(test_set._writer_status.bg_writer)
+            raw_arrays.append(test_set.conn.execute(
+                f'SELECT CAST(y AS BLOB) FROM "{test_set.table_name}"'
+            ).fetchall()[0][0])
+            test_set.conn.close()
+
+    assert writers[0] is writers[1]
+    assert writers[0].process.is_alive()
+    assert raw_arrays[0][:4] == b'QCAR'
+    assert raw_arrays[1][:6] == b'\x93NUMPY'
+
+    _shutdown_writer_processes()
+    assert not writers[0].process.is_alive()
+    assert not writers[0].is_alive()
+    assert test_set._writer_status.bg_writer is None
+
+
+def test_writer_process_of_other_database_is_shut_down(tmp_path):
+    x = ParamSpecBase("x", "numeric")
+    idps = InterDependencies_(standalones=(x,))
+
+    writers = []
+    with reset_config_on_exit():
+        for name in ("first.db", "second.db"):
+            initialise_or_create_database_at(str(tmp_path / name))
+            qc.new_experiment("test", "test")
+            test_set = qc.new_data_set("test-dataset")
+            test_set.set_interdependencies(idps)
+            test_set.mark_started(start_bg_writer="process")
+            test_set.add_results([{"x": 1}])
+            test_set.mark_completed()
+            writers.append(test_set._writer_status.bg_writer)
+            test_set.conn.close()
+
+    assert writers[0] is not writers[1]
+    assert not writers[0].process.is_alive()
+    assert writers[1].process.is_alive()
+    _shutdown_writer_processes()
+    assert not writers[1].process.is_alive()
+
+
+@pytest.mark.usefixtures("experiment")
+def test_invalid_bg_writer_raises():
+    test_set = qc.new_data_set("test-dataset")
+    with pytest.raises(ValueError, match="Invalid value for start_bg_writer"):
+        test_set.mark_started(start_bg_writer="thread")
+    test_set.conn.close()
+
+
+def test_get_batch_from_queue_stops_at_control_items():
+    queue = Queue()
+    items = [{'keys': ['x'], 'values': [[i]], 'table_name': 'table'}
+             for i in range(3)]
+    for item in items[:2]:
+        queue.put(item)
+    queue.put({'keys': 'finalize', 'values': 1})
+    queue.put(items[2])
+
+    assert _get_batch_from_queue(queue) == (
+        items[:2], {'keys': 'finalize', 'values': 1})
+    assert _get_batch_from_queue(queue) == ([items[2]], None)
+
+
+@pytest.mark.usefixtures("empty_temp_db")
+@pytest.mark.parametrize("bg_writing", [True, "process"])
+def test_bounded_write_queue(bg_writing):
+    with reset_config_on_exit():
+        qc.config.dataset.write_queue_size = 2
+        qc.new_experiment("test", "test")
+        x = ParamSpecBase("x", "numeric")
+        y = ParamSpecBase("y", "numeric")
+        idps = InterDependencies_(dependencies={y: (x,)})
+
+        test_set = qc.new_data_set("test-dataset")
+        test_set.set_interdependencies(idps)
+        test_set.mark_started(start_bg_writer=bg_writing)
+        assert test_set._writer_status.data_write_queue.maxsize == 2
+
+        data_saver = DataSaver(
+            dataset=test_set, write_period=0, interdeps=idps)
+        for i in range(100):
+            data_saver.add_result(("x", i), ("y", 2 * i))
+        test_set.mark_completed()
+
+        data = test_set.get_parameter_data()
+        np.testing.assert_array_equal(data["y"]["x"], np.arange(100))
+        np.testing.assert_array_equal(data["y"]["y"], 2 * np.arange(100))
+        test_set.conn.close()
+    _shutdown_writer_processes()
+
+
+@pytest.mark.usefixtures("experiment")
+@pytest.mark.parametrize("bg_writing", [True, "process"])
+def test_write_queue_size_is_read_at_start_of_run(bg_writing):
+    x = ParamSpecBase("x", "numeric")
+    idps = InterDependencies_(standalones=(x,))
+    with reset_config_on_exit():
+        for write_queue_size in (2, 5):
+            qc.config.dataset.write_queue_size = write_queue_size
+            test_set = qc.new_data_set("test-dataset")
+            test_set.set_interdependencies(idps)
+            test_set.mark_started(start_bg_writer=bg_writing)
+            assert (test_set._writer_status.data_write_queue.maxsize
+                    == write_queue_size)
+            test_set.add_results([{"x": i} for i in range(10)])
+            test_set.mark_completed()
+            assert test_set.number_of_results == 10
+            test_set.conn.close()
+    _shutdown_writer_processes()
@@ -1262,6 +1262,75 @@ def limit_data_to_start_end(start, end, input_names, expected_names,
     return start, end
 
 
+@pytest.mark.parametrize("chunk_rows", [1, 7, 1000, 5000])
+def test_iter_parameter_data(scalar_dataset, chunk_rows):
+    ds = scalar_dataset
+    expected = ds.get_parameter_data()
+
+    chunks = list(ds.iter_parameter_data(chunk_rows=chunk_rows))
+
+    assert len(chunks) == -(-1000 // chunk_rows)
+    for chunk in chunks:
+        assert list(chunk.keys()) == ['param_3']
+        assert all(len(values) <= chunk_rows
+                   for values in chunk['param_3'].values())
+    for name, values in expected['param_3'].items():
+        np.testing.assert_array_equal(
+            np.concatenate([chunk['param_3'][name] for chunk in chunks]),
+            values)
+
+
+def test_iter_parameter_data_array_in_scalar(array_in_scalar_dataset):
+    ds = array_in_scalar_dataset
+    expected = ds.get_parameter_data()
+
+    chunks = list(ds.iter_parameter_data(chunk_rows=4))
+
+    assert [len(chunk['array_setpoint_param']['scalarparam'])
+            for chunk in chunks] == [4, 4, 1]
+    for name, values in expected['array_setpoint_param'].items():
+        np.testing.assert_array_equal(
+            np.concatenate([chunk['array_setpoint_param'][name]
+                            for chunk in chunks]),
+            values)
+
+
+@pytest.mark.usefixtures('experiment')
+def test_iter_parameter_data_interleaved_trees():
+    """
+    Test that the chunks of parameter trees stored in interleaved rows
+    contain consecutive results of each tree
+    """
+    dataset = new_data_set("dataset")
+    xparam = ParamSpecBase("x", 'numeric')
+    yparam = ParamSpecBase("y", 'numeric')
+    idps = InterDependencies_(standalones=(xparam, yparam))
+    dataset.set_interdependencies(idps)
+
+    dataset.mark_started()
+    results = [{'x': x} if x % 3 else {'y': x} for x in range(10)]
+    dataset.add_results(results)
+    dataset.mark_completed()
+
+    chunks = list(dataset.iter_parameter_data(chunk_rows=2))
+
+    assert [list(chunk.keys()) for chunk in chunks] == [['x', 'y'],
+                                                        ['x', 'y'],
+                                                        ['x']]
+    np.testing.assert_array_equal(
+        np.concatenate([chunk['x']['x'] for chunk in chunks]),
+        [1, 2, 4, 5, 7, 8])
+    np.testing.assert_array_equal(
+        np.concatenate([chunk['y']['y'] for chunk in chunks
+                        if 'y' in chunk]),
+        [0, 3, 6, 9])
+
+
+def test_iter_parameter_data_invalid_chunk_rows(scalar_dataset):
+    with pytest.raises(ValueError, match="chunk_rows"):
+        next(scalar_dataset.iter_parameter_data(chunk_rows=0))
+
+
 @pytest.mark.usefixtures('experiment')
 def test_write_data_to_text_file_save(tmp_path_factory):
     dataset = new_data_set("dataset")
@@ -1329,6 +1398,39 @@ def test_write_data_to_text_file_save_single_file(tmp_path_factory):
         assert f.readlines() == ['0.0\t1.0\t2.0\n']
 
 
+@pytest.mark.usefixtures('experiment')
+@pytest.mark.parametrize("single_file", [False, True])
+def test_write_data_to_text_file_in_chunks(tmp_path, single_file):
+    dataset = new_data_set("dataset")
+    xparam = ParamSpecBase("x", 'numeric')
+    yparam = ParamSpecBase("y", 'numeric')
+    zparam = ParamSpecBase("z", 'numeric')
+    idps = InterDependencies_(
+        dependencies={yparam: (xparam,), zparam: (xparam,)})
+    dataset.set_interdependencies(idps)
+
+    dataset.mark_started()
+    results = [{'x': x, 'y': 2 * x, 'z': 3 * x} for x in range(10)]
+    dataset.add_results(results)
+    dataset.mark_completed()
+
+    full_path = tmp_path / "full"
+    chunked_path = tmp_path / "chunked"
+    full_path.mkdir()
+    chunked_path.mkdir()
+    dataset.write_data_to_text_file(path=str(full_path),
+                                    single_file=single_file,
+                                    single_file_name='yz')
+    dataset.write_data_to_text_file(path=str(chunked_path),
+                                    single_file=single_file,
+                                    single_file_name='yz',
+                                    chunk_rows=3)
+    assert sorted(os.listdir(chunked_path)) == sorted(os.listdir(full_path))
+    for filename in os.listdir(full_path):
+        assert ((chunked_path / filename).read_text()
+                == (full_path / filename).read_text())
+
+
 @pytest.mark.usefixtures('experiment')
 def test_write_data_to_text_file_length_exception(tmp_path):
     dataset = new_data_set("dataset")
@@ -1385,3 +1487,134 @@ def test_same_setpoint_warning_for_df_and_xarray(different_setpoint_dataset):
 
     with pytest.warns(UserWarning, match=warning_mesage):
         different_setpoint_dataset.to_xarray_dataset()
+
+
+@pytest.mark.usefixtures('experiment')
+@pytest.mark.parametrize('y_values', [[3, 2, 1, 0], [0, 1, 2, 2]])
+def test_gridded_xarray_matches_pandas_conversion(y_values):
+    dataset = new_data_set("dataset")
+    xparam = ParamSpecBase("x", 'numeric')
+    yparam = ParamSpecBase("y", 'numeric')
+    zparam = ParamSpecBase("z", 'numeric')
+    idps = InterDependencies_(dependencies={zparam: (xparam, yparam)})
+    dataset.set_interdependencies(idps, shapes={'z': (3, 4)})
+
+    dataset.mark_started()
+    results = [{'x': x, 'y': y, 'z': 10 * x + j}
+               for x in (0.5, 0.25, 1.5) for j, y in enumerate(y_values)]
+    dataset.add_results(results)
+    dataset.mark_completed()
+
+    datadict = dataset.get_parameter_data()
+    gridded = dataset._data_to_gridded_xarray_dataarray('z', datadict['z'])
+    if len(set(y_values)) < len(y_values):
+        # duplicate setpoints do not form a grid and are left to the
+        # conversion via pandas, which depending on the version of xarray
+        # may not support them either
+        assert gridded is None
+        return
+
+    index = dataset._generate_pandas_index(datadict['z'])
+    expected = dataset._data_to_dataframe(
+        datadict['z'], index).to_xarray()['z']
+    assert gridded is not None
+    assert gridded.dims == ('x', 'y')
+    assert gridded.identical(expected)
+
+    xr_dataset = dataset.to_xarray_dataset()
+    assert xr_dataset['z'].attrs['unit'] == zparam.unit
+    np.testing.assert_array_equal(xr_dataset['z'].values, expected.values)
+
+
+@pytest.mark.usefixtures('experiment')
+@pytest.mark.parametrize('export_format', ['netcdf', 'hdf5'])
+@pytest.mark.parametrize('memory_map', [True, False])
+def test_export_and_load(tmp_path, export_format, memory_map):
+    dataset = new_data_set("dataset")
+    xparam = ParamSpecBase("x", 'numeric')
+    yparam = ParamSpecBase("y", 'numeric', unit='V')
+    cparam = ParamSpecBase("c", 'complex')
+    tparam = ParamSpecBase("t", 'text')
+    aparam = ParamSpecBase("a", 'array')
+    idps = InterDependencies_(
+        dependencies={yparam: (xparam,), cparam: (xparam,),
+                      aparam: (tparam,)})
+    dataset.set_interdependencies(idps, shapes={'y': (10,)})
+
+    dataset.mark_started()
+    dataset.add_results([{'x': x, 'y': 2 * x, 'c': x + 1j}
+                         for x in range(10)])
+    dataset.add_results([{'t': f'text_{i}', 'a': np.arange(3) + i}
+                         for i in range(4)])
+    dataset.add_metadata('sample_temperature', 0.01)
+    dataset.mark_completed()
+
+    path = dataset.export(export_format, str(tmp_path), chunk_rows=3)
+    extension = {'netcdf': 'nc', 'hdf5': 'h5'}[export_format]
+    assert path == os.path.join(
+        str(tmp_path),
+        f"qcodes_{dataset.captured_run_id}_{dataset.guid}.{extension}")
+
+    loaded = qc.dataset.load_from_hdf5(path, memory_map=memory_map)
+    assert loaded.guid == dataset.guid
+    assert loaded.run_id == dataset.run_id
+    assert loaded.exp_name == dataset.exp_name
+    assert loaded.description == dataset.description
+    assert loaded.snapshot == dataset.snapshot
+    assert loaded.metadata == dataset.metadata
+
+    expected = dataset.get_parameter_data()
+    data = loaded.get_parameter_data()
+    assert data.keys() == expected.keys()
+    for tree, tree_data in expected.items():
+        assert data[tree].keys() == tree_data.keys()
+        for name, values in tree_data.items():
+            assert data[tree][name].shape == values.shape
+            np.testing.assert_array_equal(data[tree][name], values)
+    assert isinstance(data['y']['y'], np.memmap) == memory_map
+    assert isinstance(data['a']['t'], np.ndarray)
+
+
+@pytest.mark.usefixtures('experiment')
+def test_export_unknown_format_raises(tmp_path):
+    dataset = new_data_set("dataset")
+    with pytest.raises(ValueError, match='Unknown export format'):
+        dataset.export('csv', str(tmp_path / 'run.csv'))
+
+
+@pytest.mark.usefixtures('experiment')
+def test_export_to_netcdf_opens_with_xarray(tmp_path):
+    xr = pytest.importorskip('xarray')
+    pytest.importorskip('netCDF4')
+    dataset = new_data_set("dataset")
+    xparam = ParamSpecBase("x", 'numeric')
+    cparam = ParamSpecBase("c", 'complex', unit='V')
+    tparam = ParamSpecBase("t", 'text')
+    aparam = ParamSpecBase("a", 'array')
+    idps = InterDependencies_(
+        dependencies={cparam: (xparam,), aparam: (tparam,)})
+    dataset.set_interdependencies(idps)
+
+    dataset.mark_started()
+    dataset.add_results([{'x': x, 'c': x + 1j * (x + 1)} for x in range(5)])
+    dataset.add_results([{'t': f'text_{i}', 'a': np.arange(3) + i}
+                         for i in range(4)])
+    dataset.mark_completed()
+
+    path = dataset.export('netcdf', str(tmp_path / 'run.nc'))
+
+    with xr.open_dataset(path, group='c', engine='netcdf4') as c_tree:
+        np.testing.assert_array_equal(c_tree['x'].values, np.arange(5))
+        np.testing.assert_array_equal(
+            c_tree['c_real'].values + 1j * c_tree['c_imag'].values,
+            np.arange(5) + 1j * (np.arange(5) + 1))
+        assert c_tree['c_real'].dims == ('c_index',)
+        assert c_tree['c_real'].attrs['unit'] == 'V'
+    with xr.open_dataset(path, group='a', engine='netcdf4') as a_tree:
+        # the setpoints of array parameters are expanded to their shape
+        assert a_tree['t'].dims == ('a_index', 'a_dim_1')
+        assert list(a_tree['t'].values[:, 0]) == [f'text_{i}'
+                                                 for i in range(4)]
+        assert a_tree['a'].dims == ('a_index', 'a_dim_1')
+        np.testing.assert_array_equal(a_tree['a'].values,
+                                      np.arange(3) + np.arange(4)[:, None])
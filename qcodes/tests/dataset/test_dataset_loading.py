@@ -1,19 +1,29 @@
+import os
+import sqlite3
 import time
 from math import floor
+from threading import Thread
 
 import pytest
 
+import qcodes as qc
+
 from qcodes.dataset.data_set import (DataSet,
                                      new_data_set,
                                      load_by_guid,
                                      load_by_id,
                                      load_by_counter,
-                                     load_by_run_spec)
+                                     load_by_run_spec,
+                                     load_many)
 from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 from qcodes.dataset.descriptions.dependencies import InterDependencies_
 from qcodes.dataset.data_export import get_data_by_id
+from qcodes.dataset.sqlite.database import (
+    close_pooled_read_connections, get_pooled_read_connection,
+    initialise_or_create_database_at)
 from qcodes.dataset.sqlite.queries import get_guids_from_run_spec
 from qcodes.dataset.experiment_container import new_experiment
+from qcodes.tests.common import error_caused_by, reset_config_on_exit
 
 
 @pytest.mark.usefixtures("experiment")
@@ -221,6 +231,36 @@ def test_load_by_guid(some_interdeps):
     assert loaded_ds.the_same_dataset_as(ds)
 
 
+@pytest.mark.usefixtures('experiment')
+def test_load_many(some_interdeps):
+    datasets = []
+    for i in range(3):
+        ds = DataSet(metadata={'index': i})
+        ds.set_interdependencies(some_interdeps[1])
+        ds.mark_started()
+        ds.add_results([{'ps1': i, 'ps2': 2 * i}])
+        datasets.append(ds)
+    datasets[0].mark_completed()
+    pristine_ds = new_data_set("pristine")
+    datasets.append(pristine_ds)
+
+    run_ids = [ds.run_id for ds in reversed(datasets)]
+    loaded_datasets = load_many(run_ids)
+
+    assert [ds.run_id for ds in loaded_datasets] == run_ids
+    for loaded_ds, ds in zip(loaded_datasets, reversed(datasets)):
+        assert loaded_ds.the_same_dataset_as(ds)
+        assert loaded_ds.completed == ds.completed
+        assert loaded_ds.pristine == ds.pristine
+    assert loaded_datasets[-1].metadata == {'index': 0}
+
+    non_existing_run_id = pristine_ds.run_id + 1
+    with pytest.raises(ValueError, match=rf"Runs with run_ids "
+                                         rf"\[{non_existing_run_id}\] do "
+                                         rf"not exist in the database"):
+        load_many([pristine_ds.run_id, non_existing_run_id])
+
+
 def test_load_by_run_spec(empty_temp_db, some_interdeps):
 
     def create_ds_with_exp_id(exp_id):
@@ -316,3 +356,78 @@ def test_load_by_run_spec(empty_temp_db, some_interdeps):
     empty_guid_list = get_guids_from_run_spec(conn=conn,
                                               experiment_name='nosuchexp')
     assert empty_guid_list == []
+
+
+@pytest.mark.usefixtures("experiment")
+def test_load_with_pooled_read_connections():
+    ds = new_data_set("test-dataset")
+    ds.set_interdependencies(
+        InterDependencies_(standalones=(ParamSpecBase('x', 'numeric'),)))
+    ds.mark_started()
+    ds.add_results([{'x': 1.0}])
+    ds.mark_completed()
+
+    with reset_config_on_exit():
+        qc.config.dataset.pooled_read_connections = True
+
+        loaded_ds = load_by_id(ds.run_id)
+        assert loaded_ds.the_same_dataset_as(ds)
+        assert loaded_ds.get_parameter_data()['x']['x'] == [1.0]
+        # the connection is reused
+        assert load_by_guid(ds.guid).conn is loaded_ds.conn
+        assert load_by_run_spec(captured_run_id=ds.captured_run_id
+                                ).conn is loaded_ds.conn
+
+        # the pooled connections are read-only
+        with pytest.raises(RuntimeError) as excinfo:
+            loaded_ds.add_metadata('some_tag', 1)
+        assert error_caused_by(excinfo, 'readonly database')
+
+        # but other threads get their own connection
+        other_conns = []
+
+        def load_in_thread():
+            other_ds = load_by_id(ds.run_id)
+            assert other_ds.get_parameter_data()['x']['x'] == [1.0]
+            other_conns.append(other_ds.conn)
+            close_pooled_read_connections()
+
+        thread = Thread(target=load_in_thread)
+        thread.start()
+        thread.join()
+        assert len(other_conns) == 1
+        assert other_conns[0] is not loaded_ds.conn
+
+        # closing the connection of one dataset does not close it for the
+        # other datasets sharing it
+        other_ds = load_by_guid(ds.guid)
+        loaded_ds.conn.close()
+        assert other_ds.get_parameter_data()['x']['x'] == [1.0]
+        assert load_by_id(ds.run_id).conn is loaded_ds.conn
+
+        # but closing the pooled connections does
+        close_pooled_read_connections()
+        with pytest.raises(sqlite3.ProgrammingError):
+            loaded_ds.conn.execute("SELECT 1")
+        assert load_by_id(ds.run_id).conn is not loaded_ds.conn
+        close_pooled_read_connections()
+
+
+def test_pooled_read_connection_of_replaced_db_file(tmp_path):
+    db_path = str(tmp_path / 'pooled.db')
+    with reset_config_on_exit():
+        initialise_or_create_database_at(db_path)
+    try:
+        conn = get_pooled_read_connection(db_path)
+        assert get_pooled_read_connection(db_path) is conn
+
+        os.replace(db_path, str(tmp_path / 'moved.db'))
+        with reset_config_on_exit():
+            initialise_or_create_database_at(db_path)
+        new_conn = get_pooled_read_connection(db_path)
+        assert new_conn is not conn
+        # the connection to the replaced file has been closed
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    finally:
+        close_pooled_read_connections(db_path)
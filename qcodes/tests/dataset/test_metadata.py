@@ -1,5 +1,8 @@
 import pytest
 
+from qcodes.dataset.sqlite.connection import atomic_transaction
+from qcodes.dataset.sqlite.queries import get_metadata_from_run_id
+from qcodes.dataset.sqlite.query_helpers import is_column_in_table
 from qcodes.tests.common import error_caused_by
 
 
@@ -13,3 +16,19 @@ def test_get_nonexisting_metadata(dataset):
     with pytest.raises(RuntimeError) as excinfo:
         _ = dataset.get_metadata('something')
     assert error_caused_by(excinfo, "no such column: something")
+
+
+def test_metadata_not_stored_in_runs_columns(dataset):
+    dataset.add_metadata('something', 123)
+    dataset.add_metadata('something', 456)
+    dataset.add_metadata('snapshot', '{}')
+
+    assert not is_column_in_table(dataset.conn, 'runs', 'something')
+    rows = atomic_transaction(
+        dataset.conn, "SELECT tag, value FROM run_metadata WHERE run_id = ?",
+        dataset.run_id).fetchall()
+    assert [tuple(row) for row in rows] == [('something', 456)]
+    # the snapshot is a column of the runs table
+    assert dataset.get_metadata('snapshot') == '{}'
+    assert get_metadata_from_run_id(dataset.conn, dataset.run_id) == {
+        'something': 456}
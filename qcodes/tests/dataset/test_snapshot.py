@@ -3,10 +3,14 @@ import json
 import numpy
 import pytest
 
+import qcodes as qc
+from qcodes.dataset.data_set import load_by_id
+from qcodes.dataset.sqlite.connection import atomic_transaction
 from qcodes.instrument.parameter import ManualParameter
 from qcodes.tests.instrument_mocks import DummyInstrument
 from qcodes.dataset.measurements import Measurement
 from qcodes.station import Station
+from qcodes.tests.common import reset_config_on_exit
 
 # pylint: disable=unused-import
 from qcodes.tests.test_station import set_default_station_to_none
@@ -107,3 +111,40 @@ def test_snapshot_creation_for_types_not_supported_by_builtin_json(experiment):
 
     assert False is snapshot['station']['parameters']['p_np_bool']['value']
     assert False is snapshot['station']['parameters']['p_np_bool']['raw_value']
+
+
+@pytest.mark.parametrize("storage", ('deduplicated', 'delta'))
+@pytest.mark.usefixtures('set_default_station_to_none')
+def test_snapshot_store(experiment, dac, storage):
+    station = Station(dac)
+    measurement = Measurement(experiment, station)
+    measurement.register_parameter(dac.ch1)
+
+    datasets = []
+    with reset_config_on_exit():
+        qc.config.dataset.snapshot_storage = storage
+        for voltage in (0, 0, 1, 2):
+            dac.ch1.set(voltage)
+            with measurement.run() as data_saver:
+                data_saver.add_result((dac.ch1, voltage))
+            datasets.append(data_saver.dataset)
+
+    for dataset in datasets:
+        loaded_ds = load_by_id(dataset.run_id)
+        snapshot = loaded_ds.snapshot
+        assert snapshot is not None
+        assert loaded_ds.snapshot_raw == json.dumps(snapshot)
+        assert loaded_ds.get_metadata('snapshot') == loaded_ds.snapshot_raw
+        value = snapshot['station']['instruments']['dummy_dac'][
+            'parameters']['ch1']['value']
+        assert value == dataset.get_parameter_data()['dummy_dac_ch1'][
+            'dummy_dac_ch1'][0]
+
+    # nothing is stored in the snapshot column of the runs table
+    inline = atomic_transaction(
+        experiment.conn,
+        "SELECT COUNT(*) FROM runs WHERE snapshot IS NOT NULL").fetchone()[0]
+    assert inline == 0
+    n_blobs = atomic_transaction(
+        experiment.conn, "SELECT COUNT(*) FROM snapshot_blobs").fetchone()[0]
+    assert 1 <= n_blobs <= len(datasets)
@@ -3,6 +3,7 @@
 # functions here
 from sqlite3 import OperationalError
 from contextlib import contextmanager
+from functools import partial
 import time
 
 import pytest
@@ -12,15 +13,18 @@ import unicodedata
 import numpy as np
 from unittest.mock import patch
 
+import qcodes as qc
+
 from qcodes.dataset.descriptions.param_spec import ParamSpec
 from qcodes.dataset.descriptions.rundescriber import RunDescriber
 from qcodes.dataset.descriptions.dependencies import InterDependencies_
 import qcodes.dataset.descriptions.versioning.serialization as serial
 from qcodes.dataset.sqlite.connection import path_to_dbfile
 from qcodes.dataset.sqlite.database import get_DB_location
+from qcodes.dataset.experiment_container import new_experiment
 from qcodes.dataset.guids import generate_guid
 from qcodes.dataset.data_set import DataSet
-from qcodes.tests.common import error_caused_by
+from qcodes.tests.common import error_caused_by, reset_config_on_exit
 
 from .helper_functions import verify_data_dict
 
@@ -93,6 +97,54 @@ def test_insert_many_values_raises(experiment):
                                     values=[[1], [1, 3]])
 
 
+
+@pytest.mark.parametrize("insert_method", ["compound", "executemany"])
+def test_insert_many_values(experiment, insert_method):
+    conn = experiment.conn
+    mut_conn.transaction(conn, 'CREATE TABLE "some_table" (id INTEGER '
+                               'PRIMARY KEY, x, y)')
+    values = [[i, 2 * i] for i in range(10)]
+
+    with reset_config_on_exit():
+        qc.config.dataset.insert_method = insert_method
+        with patch.object(mut_help, '_get_max_variable_number',
+                          return_value=6):
+            mut_help.insert_many_values(conn, 'some_table', ['x', 'y'],
+                                        values)
+            mut_help.insert_many_values(conn, 'some_table', ['x', 'y'],
+                                        values)
+
+    rows = mut_conn.atomic_transaction(
+        conn, 'SELECT x, y FROM "some_table"').fetchall()
+    assert [list(row) for row in rows] == values + values
+    if insert_method == "compound":
+        # 3 rows per statement and a remainder of 1 row
+        expected_keys = {('some_table', ('x', 'y'), 3),
+                         ('some_table', ('x', 'y'), 1)}
+    else:
+        expected_keys = {('some_table', ('x', 'y'), 1)}
+    assert set(conn.insert_statement_cache.keys()) == expected_keys
+
+
+def test_insert_statement_cache_is_bounded_by_length(experiment):
+    conn = experiment.conn
+    lengths = [len(mut_help._get_insert_statement(conn, 'some_table',
+                                                  ['x', 'y'], n_rows))
+               for n_rows in (1, 2, 3)]
+    conn.insert_statement_cache.clear()
+
+    with patch.object(mut_help, '_MAX_CACHED_INSERT_STATEMENTS_LENGTH',
+                      sum(lengths) - 1):
+        for n_rows in (1, 2):
+            mut_help._get_insert_statement(conn, 'some_table', ['x', 'y'],
+                                           n_rows)
+        assert len(conn.insert_statement_cache) == 2
+        # the cache is cleared rather than exceeding the limit
+        mut_help._get_insert_statement(conn, 'some_table', ['x', 'y'], 3)
+        assert set(conn.insert_statement_cache.keys()) == {
+            ('some_table', ('x', 'y'), 3)}
+
+
 def test_get_metadata_raises(experiment):
     with pytest.raises(RuntimeError) as excinfo:
         mut_queries.get_metadata(experiment.conn, 'something', 'results')
@@ -277,6 +329,40 @@ def test_get_parameter_data_independent_parameters(
                      expected_shapes, expected_values)
 
 
+@pytest.mark.parametrize("chunk_size", [1, 7, 10000])
+@pytest.mark.parametrize("start,end", [(None, None), (3, None), (2, 5)])
+def test_get_columns_for_one_param_tree(array_in_scalar_dataset, chunk_size,
+                                        start, end):
+    ds = array_in_scalar_dataset
+    paramspecs = mut_queries._get_paramspecs_for_one_param_tree(
+        ds.description.interdeps, 'array_setpoint_param')
+
+    data, n_rows = mut_queries._get_columns_for_one_param_tree(
+        ds.conn, ds.table_name, paramspecs, start, end, chunk_size=chunk_size)
+
+    rows, _, n_rows_expected = mut_queries._get_data_for_one_param_tree(
+        ds.conn, ds.table_name, ds.description.interdeps,
+        'array_setpoint_param', start, end)
+    mut_queries._expand_data_to_arrays(rows, paramspecs)
+    assert n_rows == n_rows_expected
+    assert set(data.keys()) == {ps.name for ps in paramspecs}
+    for i, paramspec in enumerate(paramspecs):
+        expected = np.array([row[i] for row in rows])
+        assert data[paramspec.name].dtype == expected.dtype
+        np.testing.assert_array_equal(data[paramspec.name], expected)
+
+
+def test_get_columns_for_one_param_tree_varlen_raises(
+        varlen_array_in_scalar_dataset):
+    ds = varlen_array_in_scalar_dataset
+    paramspecs = mut_queries._get_paramspecs_for_one_param_tree(
+        ds.description.interdeps, 'array_setpoint_param')
+
+    with pytest.raises(mut_queries._NonUniformColumnError):
+        mut_queries._get_columns_for_one_param_tree(
+            ds.conn, ds.table_name, paramspecs, None, None)
+
+
 def test_is_run_id_in_db(empty_temp_db):
     conn = mut_db.connect(get_DB_location())
     mut_queries.new_experiment(conn, 'test_exp', 'no_sample')
@@ -371,3 +457,106 @@ def test_set_run_timestamp(experiment):
                                 "been set"))
 
     ds.conn.close()
+
+
+@pytest.mark.parametrize("array", [np.arange(10, dtype=np.float64),
+                                   np.arange(12, dtype=np.int32).reshape(3, 4),
+                                   np.arange(12).reshape(3, 4).T,
+                                   np.array([1 + 1j, 2 - 3j]),
+                                   np.array(['a', 'bcd']),
+                                   np.array([], dtype=np.float64),
+                                   np.array(1.5)])
+@pytest.mark.parametrize("adapter", [mut_db._adapt_array,
+                                     mut_db._adapt_array_binary,
+                                     partial(mut_db._adapt_array_binary,
+                                             codec=1)])
+def test_array_adapt_convert_roundtrip(array, adapter):
+    blob = adapter(array)
+    converted = mut_db._convert_array(bytes(blob))
+    assert converted.dtype == array.dtype
+    assert converted.shape == array.shape
+    np.testing.assert_array_equal(converted, array)
+
+
+def test_binary_array_format_header():
+    array = np.arange(6, dtype='<f8').reshape(2, 3)
+    blob = bytes(mut_db._adapt_array_binary(array))
+    header_len = 8 + len('<f8') + 2 * 8
+    assert blob[:4] == b'QCAR'
+    assert len(blob) == header_len + array.nbytes
+    assert blob[header_len:] == array.tobytes()
+
+
+def test_binary_array_format_unknown_version_raises():
+    blob = bytearray(mut_db._adapt_array_binary(np.arange(3.)))
+    blob[4] = 255
+    with pytest.raises(RuntimeError, match="binary format version 255"):
+        mut_db._convert_array(bytes(blob))
+
+
+@pytest.mark.usefixtures("empty_temp_db")
+@pytest.mark.parametrize("array_format", ["npy", "binary"])
+def test_array_format_from_config(array_format):
+    with reset_config_on_exit():
+        qc.config.dataset.array_format = array_format
+        new_experiment('test', sample_name='test')
+        x = ParamSpec('x', 'array')
+        y = ParamSpec('y', 'array', depends_on=['x'])
+        ds = DataSet(specs=[x, y])
+        ds.mark_started()
+        ds.add_results([{'x': np.arange(5.), 'y': np.arange(5.)**2}])
+        ds.mark_completed()
+
+        raw = mut_conn.atomic_transaction(
+            ds.conn, f'SELECT CAST(y AS BLOB) FROM "{ds.table_name}"'
+        ).fetchall()[0][0]
+        if array_format == "npy":
+            assert raw[:6] == b'\x93NUMPY'
+        else:
+            assert raw[:4] == b'QCAR'
+
+        data = ds.get_parameter_data()
+        np.testing.assert_array_equal(data['y']['y'], np.arange(5.)[None]**2)
+        ds.conn.close()
+
+
+@pytest.mark.usefixtures("empty_temp_db")
+@pytest.mark.parametrize("compression", ["zlib", "zstd", "lz4"])
+def test_array_compression_from_config(compression):
+    codec = mut_db._ARRAY_CODECS[compression]
+    if not mut_db._ARRAY_CODECS_AVAILABLE[codec]:
+        codec = mut_db._ARRAY_CODECS["zlib"]
+    with reset_config_on_exit():
+        qc.config.dataset.array_compression = compression
+        new_experiment('test', sample_name='test')
+        x = ParamSpec('x', 'array')
+        y = ParamSpec('y', 'array', depends_on=['x'])
+        ds = DataSet(specs=[x, y])
+        ds.mark_started()
+        ds.add_results([{'x': np.zeros(1000), 'y': np.ones(1000)}])
+        ds.mark_completed()
+
+        raw = mut_conn.atomic_transaction(
+            ds.conn, f'SELECT CAST(y AS BLOB) FROM "{ds.table_name}"'
+        ).fetchall()[0][0]
+        assert raw[:4] == b'QCAR'
+        assert raw[5] == codec
+        assert len(raw) < np.ones(1000).nbytes
+
+        data = ds.get_parameter_data()
+        np.testing.assert_array_equal(data['y']['y'], np.ones((1, 1000)))
+        ds.conn.close()
+
+
+def test_unavailable_codec_raises_on_read():
+    blob = bytearray(mut_db._adapt_array_binary(np.arange(3.)))
+    blob[5] = 200
+    with pytest.raises(RuntimeError, match="codec 200"):
+        mut_db._convert_array(bytes(blob))
+
+
+def test_invalid_array_format_raises(tmp_path):
+    with reset_config_on_exit():
+        qc.config.dataset.array_format = "foo"
+        with pytest.raises(RuntimeError, match="Invalid array_format foo"):
+            mut_db.connect(str(tmp_path / 'db.db'))
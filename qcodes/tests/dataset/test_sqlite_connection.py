@@ -1,12 +1,16 @@
 import re
 import sqlite3
+from unittest.mock import patch
 
 import pytest
 
+import qcodes as qc
+
 from qcodes.dataset.sqlite.connection import ConnectionPlus, \
     make_connection_plus_from, atomic, atomic_transaction
-from qcodes.dataset.sqlite.database import connect
-from qcodes.tests.common import error_caused_by
+from qcodes.dataset.sqlite.database import (checkpoint_wal_if_due, connect,
+                                            set_journal_mode)
+from qcodes.tests.common import error_caused_by, reset_config_on_exit
 
 
 def sqlite_conn_in_transaction(conn: sqlite3.Connection):
@@ -330,3 +334,66 @@ def test_connect():
     assert False is conn.atomic_in_progress
 
     assert sqlite3.Row is conn.row_factory
+
+
+def _pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def test_connect_applies_sqlite_profile(tmp_path):
+    path = str(tmp_path / 'profiled.db')
+    with reset_config_on_exit():
+        qc.config.dataset.sqlite_profile = 'acquisition'
+        profile = qc.config.dataset.sqlite_profiles.acquisition
+
+        conn = connect(path)
+        assert _pragma(conn, 'page_size') == profile['page_size']
+        assert _pragma(conn, 'cache_size') == profile['cache_size']
+        assert _pragma(conn, 'temp_store') == 2  # MEMORY
+        # synchronous is only changed in WAL mode
+        assert _pragma(conn, 'journal_mode') != 'wal'
+        set_journal_mode(conn, 'WAL')
+        assert _pragma(conn, 'synchronous') == 1  # NORMAL
+        conn.close()
+
+        conn = connect(path)
+        assert _pragma(conn, 'synchronous') == 1  # NORMAL
+        assert _pragma(conn, 'journal_size_limit') == \
+            profile['journal_size_limit']
+        conn.close()
+
+        qc.config.dataset.sqlite_profile = 'not_a_profile'
+        with pytest.raises(RuntimeError, match='Invalid sqlite_profile'):
+            connect(path)
+
+
+def test_checkpoint_wal_if_due(tmp_path):
+    conn = connect(str(tmp_path / 'wal.db'))
+    set_journal_mode(conn, 'WAL')
+    with reset_config_on_exit():
+        qc.config.dataset.sqlite_profiles.default = {
+            'wal_checkpoint_interval': 10, 'wal_checkpoint_mode': 'TRUNCATE'}
+        with patch('qcodes.dataset.sqlite.database.time.monotonic',
+                   side_effect=[100, 105, 111]):
+            # the first call starts the interval
+            checkpoint_wal_if_due(conn)
+            assert conn.last_wal_checkpoint == 100
+            checkpoint_wal_if_due(conn)
+            assert conn.last_wal_checkpoint == 100
+            checkpoint_wal_if_due(conn)
+            assert conn.last_wal_checkpoint == 111
+    conn.close()
+
+
+@pytest.mark.parametrize('setting, value', [
+    ('wal_checkpoint_mode', 'PASSIVE); DROP TABLE runs; --'),
+    ('wal_checkpoint_interval', '10'),
+    ('wal_checkpoint_interval', -1),
+    ('synchronous', 'SOMETIMES'),
+    ('cache_size', 1.5),
+    ('not_a_pragma', 1)])
+def test_invalid_sqlite_profile_raises(tmp_path, setting, value):
+    with reset_config_on_exit():
+        qc.config.dataset.sqlite_profiles.default = {setting: value}
+        with pytest.raises(RuntimeError, match='Invalid'):
+            connect(str(tmp_path / 'profiled.db'))
@@ -2,6 +2,7 @@
 from typing import List, Tuple, Dict, Union, Any
 from numbers import Number
 
+import numpy as np
 import pytest
 from numpy import ndarray
 import logging
@@ -211,3 +212,89 @@ def test_subscription_from_config_wrong_name(dataset):
         assert 'test_subscriber' not in qcodes.config.subscription.subscribers
         with pytest.raises(RuntimeError):
             sub_id_c = dataset.subscribe_from_config('test_subscriber')
+
+
+@pytest.mark.parametrize("bg_writer", [False, True])
+def test_subscription_published_by_writer(dataset, bg_writer):
+    xparam = ParamSpecBase(name='x', paramtype='numeric')
+    yparam = ParamSpecBase(name='y', paramtype='numeric')
+    zparam = ParamSpecBase(name='z', paramtype='numeric')
+    idps = InterDependencies_(dependencies={yparam: (xparam,)},
+                              standalones=(zparam,))
+    dataset.set_interdependencies(idps)
+    dataset.mark_started(start_bg_writer=bg_writer)
+
+    rows = {}
+    blocks = {}
+
+    def collect(results, length, state):
+        state.setdefault('results', []).extend(results)
+        state['length'] = length
+
+    dataset.subscribe(collect, state=rows)
+    dataset.subscribe(collect, state=blocks, columnar=True)
+
+    # no triggers are used to notify the subscribers
+    get_triggers_sql = "SELECT * FROM sqlite_master WHERE TYPE = 'trigger';"
+    assert atomic_transaction(dataset.conn, get_triggers_sql).fetchall() == []
+
+    xs = np.arange(5.)
+    dataset._add_result_columns({'x': xs, 'y': -xs**2})
+    dataset.add_results([{'z': 1.5}])
+    dataset.mark_completed()
+
+    @retry_until_does_not_throw(
+        exception_class_to_expect=AssertionError, delay=0.1, tries=20)
+    def assert_expected_state():
+        assert rows['length'] == 6
+        assert blocks['length'] == 6
+        names = [ps.name for ps in dataset.get_parameters()]
+        assert [dict(zip(names, row)) for row in rows['results']] == (
+            [{'x': x, 'y': -x**2, 'z': None} for x in xs]
+            + [{'x': None, 'y': None, 'z': 1.5}])
+        assert len(blocks['results']) == 2
+        np.testing.assert_array_equal(blocks['results'][0]['x'], xs)
+        np.testing.assert_array_equal(blocks['results'][0]['y'], -xs**2)
+        np.testing.assert_array_equal(blocks['results'][1]['z'], [1.5])
+
+    assert_expected_state()
+
+
+def test_subscriber_callbacks_coalesced(dataset):
+    xparam = ParamSpecBase(name='x', paramtype='numeric')
+    yparam = ParamSpecBase(name='y', paramtype='numeric')
+    idps = InterDependencies_(dependencies={yparam: (xparam,)})
+    dataset.set_interdependencies(idps)
+    dataset.mark_started()
+
+    def count_results(results, length, state):
+        state.append(len(results))
+
+    n_results = []
+    sub_id = dataset.subscribe(count_results, state=n_results,
+                               max_callback_rate=0.5)
+    subscriber = dataset.subscribers[sub_id]
+
+    dataset.add_results([{'x': 0, 'y': 0}])
+
+    @retry_until_does_not_throw(
+        exception_class_to_expect=AssertionError, delay=0.1, tries=20)
+    def assert_first_callback():
+        assert n_results == [1]
+
+    assert_first_callback()
+
+    # the results added within two seconds of the first callback are
+    # passed to the callback at once, completing the dataset does not
+    # wait for the two seconds to pass
+    for x in range(1, 6):
+        dataset.add_results([{'x': x, 'y': -x}])
+    dataset.mark_completed()
+
+    assert n_results == [1, 5]
+    assert not subscriber.is_alive()
+    assert subscriber.stats.n_callbacks == 2
+    assert subscriber.stats.n_results == 6
+    assert subscriber.stats.max_queue_length == 5
+    assert subscriber.stats.queue_length == 0
+    assert subscriber.stats.max_latency >= subscriber.stats.last_latency > 0